@@ -0,0 +1,139 @@
+"""
+📦 Album Assembler - Сборка альбомов из отдельных сообщений без фиксированной паузы
+Адаптивное ожидание по наблюдаемым интервалам между частями альбома
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Telegram ограничивает альбом 10 медиа — дальше ждать нечего
+ALBUM_MAX_ITEMS = 10
+
+
+class AlbumAssembler:
+    """
+    Буфер альбомов по grouped_id
+    
+    Части альбома приходят отдельными событиями почти одновременно. Пауза
+    после очередной части не фиксированная: это factor × EWMA интервала
+    между частями (в пределах min_delay..max_delay). Пока статистики нет,
+    используется max_delay. Альбом из 10 медиа отдается сразу.
+    
+    on_member вызывается для каждой части сразу по приходу (предзагрузка),
+    on_complete — с собранным альбомом, отсортированным по ID.
+    """
+    
+    def __init__(
+        self,
+        on_complete: Callable[[list], Awaitable[None]],
+        on_member: Optional[Callable[[object], None]] = None,
+        gate: Optional[asyncio.Event] = None,
+        min_delay: float = 0.3,
+        max_delay: float = 2.0,
+        factor: float = 3.0,
+        alpha: float = 0.2
+    ):
+        self.on_complete = on_complete
+        self.on_member = on_member
+        self.gate = gate  # flush откладывается, пока событие не установлено
+        self.min_delay = min_delay
+        self.max_delay = max(min_delay, max_delay)
+        self.factor = factor
+        self.alpha = alpha
+        
+        self.groups: Dict[int, list] = {}
+        self._timers: Dict[int, asyncio.Task] = {}
+        self._last_arrival: Dict[int, float] = {}
+        self.gap_ewma: Optional[float] = None
+    
+    @property
+    def delay(self) -> float:
+        """Текущая пауза до flush после последней части альбома"""
+        if self.gap_ewma is None:
+            return self.max_delay
+        return min(self.max_delay, max(self.min_delay, self.factor * self.gap_ewma))
+    
+    def add(self, msg):
+        """Новая часть альбома из события"""
+        group_id = msg.grouped_id
+        now = time.monotonic()
+        
+        previous = self._last_arrival.get(group_id)
+        if previous is not None:
+            self._observe_gap(now - previous)
+        self._last_arrival[group_id] = now
+        
+        self.groups.setdefault(group_id, []).append(msg)
+        
+        # Скачивание/обработку части можно начинать, не дожидаясь остальных
+        if self.on_member is not None:
+            try:
+                self.on_member(msg)
+            except Exception as e:
+                logger.warning(f"⚠️ Предзагрузка части альбома {msg.id} не запущена: {e}")
+        
+        if len(self.groups[group_id]) >= ALBUM_MAX_ITEMS:
+            self._schedule(group_id, 0.0)
+        else:
+            self._schedule(group_id, self.delay)
+    
+    def merge(self, group_id: int, messages: list) -> bool:
+        """
+        Дописывает в собираемый альбом части из другого источника (истории)
+        
+        Returns:
+            True, если альбом сейчас собирается и части добавлены
+        """
+        if group_id not in self.groups:
+            return False
+        known = {m.id for m in self.groups[group_id]}
+        self.groups[group_id].extend(m for m in messages if m.id not in known)
+        return True
+    
+    def _observe_gap(self, gap: float):
+        if self.gap_ewma is None:
+            self.gap_ewma = gap
+        else:
+            self.gap_ewma = self.alpha * gap + (1 - self.alpha) * self.gap_ewma
+    
+    def _schedule(self, group_id: int, delay: float):
+        timer = self._timers.get(group_id)
+        if timer is not None:
+            timer.cancel()
+        self._timers[group_id] = asyncio.create_task(self._flush_after(group_id, delay))
+    
+    async def _flush_after(self, group_id: int, delay: float):
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Пока gate закрыт (догонялка), в группу еще могут дописать начало альбома из истории
+            if self.gate is not None:
+                await self.gate.wait()
+        except asyncio.CancelledError:
+            # Таймер был отменен (пришло еще сообщение в группу)
+            return
+        
+        if self._timers.get(group_id) is asyncio.current_task():
+            self._timers.pop(group_id, None)
+        msgs = self.groups.pop(group_id, None)
+        self._last_arrival.pop(group_id, None)
+        if not msgs:
+            return
+        
+        # Сортируем по ID для правильного порядка
+        msgs.sort(key=lambda m: m.id)
+        logger.info(f"📦 Flush группы {group_id}: собрано {len(msgs)} сообщений (пауза {delay:.2f}с)")
+        try:
+            await self.on_complete(msgs)
+        except Exception as e:
+            logger.error(f"❌ Ошибка при flush группы {group_id}: {e}", exc_info=True)
+    
+    def cancel_all(self):
+        """Отмена всех таймеров (при остановке)"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
@@ -0,0 +1,118 @@
+"""
+⏱️ Микробенчмарк замены ссылок: прежняя схема (inpaint и PIL-конвертация всего кадра на каждую ссылку)
+против одной маски, inpaint только вокруг ссылок и наложения готовых спрайтов текста
+
+Запуск из корня проекта:
+    python benchmarks/inpaint.py
+    python benchmarks/inpaint.py --size 4000x3000 --links 1 4 8 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_processor import get_image_processor  # noqa: E402
+
+FONT_PATHS = [
+    '/System/Library/Fonts/Helvetica.ttc',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    'C:\\Windows\\Fonts\\arial.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf'
+]
+
+
+def legacy_add_text(img: np.ndarray, text: str, x: int, y: int, height: int) -> np.ndarray:
+    """Прежний _add_text_to_image: загрузка шрифта с диска, PIL-конвертация кадра и 9 вызовов draw.text"""
+    pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    draw = ImageDraw.Draw(pil_img)
+    font = None
+    for font_path in FONT_PATHS:
+        try:
+            font = ImageFont.truetype(font_path, max(12, int(height * 0.7)))
+            break
+        except OSError:
+            continue
+    font = font or ImageFont.load_default()
+    for offset_x in [-1, 0, 1]:
+        for offset_y in [-1, 0, 1]:
+            draw.text((x + offset_x, y + offset_y), text, fill=(0, 0, 0), font=font)
+    draw.text((x, y), text, fill=(255, 255, 255), font=font)
+    return cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+
+
+def legacy_replace(img: np.ndarray, links: list, new_link: str) -> np.ndarray:
+    """Прежний _replace_links_in_image: полная маска, inpaint и PIL-проход на каждую ссылку"""
+    result_img = img.copy()
+    for link in links:
+        x, y, w, h = link['x'], link['y'], link['w'], link['h']
+        padding = 5
+        x = max(0, x - padding)
+        y = max(0, y - padding)
+        w = w + 2 * padding
+        h = h + 2 * padding
+        mask = np.zeros(result_img.shape[:2], np.uint8)
+        cv2.rectangle(mask, (x, y), (x + w, y + h), 255, -1)
+        result_img = cv2.inpaint(result_img, mask, 3, cv2.INPAINT_TELEA)
+        result_img = legacy_add_text(result_img, new_link, x, y, h)
+    return result_img
+
+
+def test_image(width: int, height: int, count: int, seed: int = 0):
+    """Фото-подобный фон (градиент + шум) и count строк-ссылок"""
+    rnd = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    img = np.clip(gradient * 0.6 + rnd.normal(80, 25, (height, width, 3)), 0, 255).astype(np.uint8)
+    
+    links = []
+    for i in range(count):
+        x, y = int(width * 0.1), int(height * (i + 1) / (count + 1))
+        cv2.putText(img, 't.me/nasvyazi', (x, y + 40), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (255, 255, 255), 3)
+        links.append({'text': 't.me/nasvyazi', 'x': x, 'y': y, 'w': 380, 'h': 50})
+    return img, links
+
+
+def bench(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default='2560x1440', help='Размер изображения, ШxВ')
+    parser.add_argument('--links', type=int, nargs='+', default=[1, 4], help='Число ссылок на изображении')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    processor = get_image_processor()
+    new_link = processor.new_link
+    
+    print(f"{'size':>11} {'links':>5} {'legacy, ms':>11} {'roi, ms':>9} {'speedup':>8} {'max diff':>9}")
+    for count in args.links:
+        img, links = test_image(width, height, count)
+        legacy_s = bench(lambda: legacy_replace(img, links, new_link), args.repeat)
+        roi_s = bench(lambda: processor._replace_links_in_image(img, links, new_link), args.repeat)
+        
+        # Inpaint совпадает (Telea меняет только пиксели маски); разница — сглаживание текста
+        diff = cv2.absdiff(
+            legacy_replace(img, links, new_link),
+            processor._replace_links_in_image(img, links, new_link)
+        ).max()
+        print(f"{width}x{height:<6} {count:>5} {legacy_s * 1000:>11.1f} {roi_s * 1000:>9.1f} "
+              f"{legacy_s / max(roi_s, 1e-9):>7.1f}x {int(diff):>9}")
+
+
+if __name__ == '__main__':
+    main()
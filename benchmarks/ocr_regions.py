@@ -0,0 +1,157 @@
+"""
+⏱️ Бенчмарк OCR: весь кадр, OCR только областей с текстом и двухпроходный OCR (OCR_STRATEGY)
+
+Запуск из корня проекта:
+    python benchmarks/ocr_regions.py screenshots/*.png
+    python benchmarks/ocr_regions.py --synthetic 20
+    python benchmarks/ocr_regions.py --synthetic 20 --blank 20  (картинки без ссылок)
+
+Для каждого изображения замеряется время _find_links_in_image в каждом режиме.
+Полнота (recall) режимов regions и two_pass считается относительно найденного по всему кадру,
+а для синтетических картинок — относительно реально нарисованных ссылок.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from image_processor import get_image_processor  # noqa: E402
+
+FONT_PATHS = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+    '/System/Library/Fonts/Helvetica.ttc',
+    'C:\\Windows\\Fonts\\arial.ttf',
+]
+
+WORDS = ['сервис', 'доступ', 'обновление', 'интернет', 'настройка', 'подключение', 'status', 'online', 'network']
+
+
+def _font(size: int):
+    for path in FONT_PATHS:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def synthetic_screenshot(
+    seed: int,
+    link: str,
+    with_links: bool = True,
+    width: int = 2560,
+    height: int = 1440
+) -> Tuple[np.ndarray, int]:
+    """Скриншот-подобная картинка: фон, блоки, строки текста и 1-2 ссылки (или без них). Возвращает (BGR, число ссылок)"""
+    rnd = random.Random(seed)
+    img = Image.new('RGB', (width, height), tuple(rnd.randint(200, 255) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    
+    for _ in range(rnd.randint(2, 5)):
+        x, y = rnd.randint(0, width - 400), rnd.randint(0, height - 300)
+        draw.rectangle((x, y, x + rnd.randint(200, 800), y + rnd.randint(100, 400)), fill=tuple(rnd.randint(120, 230) for _ in range(3)))
+    
+    links = rnd.randint(1, 2) if with_links else 0
+    rows = rnd.sample(range(2, height // 80 - 1), rnd.randint(6, 12) + links)
+    for i, row in enumerate(rows):
+        size = rnd.randint(28, 48)
+        text = link if i < links else ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 6)))
+        draw.text((rnd.randint(40, width // 2), row * 80), text, fill=(20, 20, 20), font=_font(size))
+    
+    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR), links
+
+
+def _overlaps(a: dict, b: dict) -> bool:
+    return a['x'] < b['x'] + b['w'] and b['x'] < a['x'] + a['w'] and a['y'] < b['y'] + b['h'] and b['y'] < a['y'] + a['h']
+
+
+STRATEGIES = ('full', 'regions', 'two_pass')
+
+
+def _timed(processor, img: np.ndarray, strategy: str) -> Tuple[float, list]:
+    started = time.perf_counter()
+    links = processor._find_links_in_image(img, strategy=strategy)
+    return time.perf_counter() - started, links
+
+
+def run(images: List[Tuple[str, np.ndarray, Optional[int]]]):
+    processor = get_image_processor()
+    times = {strategy: [] for strategy in STRATEGIES}
+    matched = {strategy: 0 for strategy in STRATEGIES}
+    drawn_found = {strategy: 0 for strategy in STRATEGIES}
+    reference = drawn_total = 0
+    
+    header = ''.join(f"{strategy + ', s':>13}" for strategy in STRATEGIES)
+    print(f"{'image':<32} {'size':>11}{header}   links {'/'.join(s[0] for s in STRATEGIES)}")
+    for name, img, expected in images:
+        results = {strategy: _timed(processor, img, strategy) for strategy in STRATEGIES}
+        full_links = results['full'][1]
+        reference += len(full_links)
+        if expected is not None:
+            drawn_total += expected
+        
+        for strategy, (seconds, links) in results.items():
+            times[strategy].append(seconds)
+            matched[strategy] += sum(1 for link in full_links if any(_overlaps(link, other) for other in links))
+            if expected is not None:
+                drawn_found[strategy] += min(expected, len(links))
+        
+        size = f"{img.shape[1]}x{img.shape[0]}"
+        columns = ''.join(f"{results[strategy][0]:>13.2f}" for strategy in STRATEGIES)
+        counts = '/'.join(str(len(results[strategy][1])) for strategy in STRATEGIES)
+        print(f"{name[:32]:<32} {size:>11}{columns}   {counts}")
+    
+    print()
+    full_median = statistics.median(times['full'])
+    for strategy in STRATEGIES:
+        median = statistics.median(times[strategy])
+        line = f"{strategy:<9} median {median:.2f}s (x{full_median / max(median, 1e-9):.1f})"
+        if reference and strategy != 'full':
+            line += f", recall vs full frame {matched[strategy]}/{reference}"
+        if drawn_total:
+            line += f", drawn links found {drawn_found[strategy]}/{drawn_total}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', nargs='*', help='Файлы изображений')
+    parser.add_argument('--synthetic', type=int, default=0, help='Сколько синтетических скриншотов со ссылками сгенерировать')
+    parser.add_argument('--blank', type=int, default=0, help='Сколько синтетических скриншотов без ссылок сгенерировать')
+    args = parser.parse_args()
+    
+    images = []
+    for path in args.images:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            print(f"⚠️ Не удалось прочитать {path}")
+            continue
+        images.append((os.path.basename(path), img, None))
+    
+    link = Config.OLD_LINK_PATTERN.split('|')[0].replace('\\', '')
+    for seed in range(args.synthetic):
+        img, expected = synthetic_screenshot(seed, link)
+        images.append((f"synthetic-{seed}", img, expected))
+    for seed in range(args.blank):
+        img, expected = synthetic_screenshot(1000 + seed, link, with_links=False)
+        images.append((f"blank-{seed}", img, expected))
+    
+    if not images:
+        parser.error("нужны изображения, --synthetic N или --blank N")
+    run(images)
+
+
+if __name__ == '__main__':
+    main()
@@ -21,11 +21,44 @@ class Config:
     SOURCE_CHANNEL = os.getenv('SOURCE_CHANNEL', '')
     TARGET_CHANNEL = os.getenv('TARGET_CHANNEL', '')
     
+    # 🧭 Несколько маршрутов в одном процессе (JSON или файл; иначе SOURCE_CHANNEL → TARGET_CHANNEL)
+    ROUTES = os.getenv('ROUTES', '')
+    ROUTES_FILE = os.getenv('ROUTES_FILE', '')
+    
     # 🧠 LLM Configuration (multi-provider with auto-fallback)
     LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'auto')  # auto, openai, deepseek, xai, google, cohere, huggingface
     LLM_MODEL = os.getenv('LLM_MODEL', 'auto')  # auto or specific model
     LLM_TEMPERATURE = float(os.getenv('LLM_TEMPERATURE', '0.7'))
     
+    # ⏱️ Хеджирование запросов: при медленном ответе параллельно спрашиваем следующего провайдера
+    LLM_HEDGING = os.getenv('LLM_HEDGING', 'false').lower() in ('1', 'true', 'yes')
+    LLM_HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', '0'))  # секунды; 0 = выученный перцентиль задержки
+    LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '90'))
+    LLM_HEDGE_DEFAULT_DELAY = float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', '5'))  # пока статистики мало
+    LLM_MAX_HEDGES = int(os.getenv('LLM_MAX_HEDGES', '1'))  # максимум дополнительных параллельных запросов
+    
+    # 🎚️ Уровни моделей по размеру поста: trivial (без LLM) → fast → strong
+    LLM_TIERING = os.getenv('LLM_TIERING', 'true').lower() in ('1', 'true', 'yes')
+    LLM_TRIVIAL_MAX_CHARS = int(os.getenv('LLM_TRIVIAL_MAX_CHARS', '80'))  # короче — без LLM, только замена ссылок
+    LLM_STRONG_MIN_CHARS = int(os.getenv('LLM_STRONG_MIN_CHARS', '1200'))  # от стольких символов — сильная модель
+    LLM_STRONG_MIN_LINKS = int(os.getenv('LLM_STRONG_MIN_LINKS', '3'))  # или от стольких ссылок
+    LLM_FAST_MAX_TOKENS = int(os.getenv('LLM_FAST_MAX_TOKENS', '600'))
+    LLM_STRONG_MAX_TOKENS = int(os.getenv('LLM_STRONG_MAX_TOKENS', '800'))
+    LLM_FAST_MODELS = os.getenv('LLM_FAST_MODELS', '')  # провайдер:модель через запятую, напр. groq:llama-3.1-8b-instant
+    LLM_STRONG_MODELS = os.getenv('LLM_STRONG_MODELS', '')  # пусто — без сильных моделей; напр. groq:llama-3.3-70b-versatile
+    
+    # 🩺 Маршрутизация по здоровью провайдеров и circuit breaker
+    PROVIDER_HEALTH_FILE = os.getenv('PROVIDER_HEALTH_FILE', 'temp/provider_health.json')
+    PROVIDER_HEALTH_ALPHA = float(os.getenv('PROVIDER_HEALTH_ALPHA', '0.3'))  # вес нового замера в EWMA
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '3'))  # ошибок подряд до отключения
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '300'))  # секунды до пробного запроса
+    
+    # 🧪 Проверка провайдеров при старте
+    LLM_PROBE_MODE = os.getenv('LLM_PROBE_MODE', 'eager')  # eager, background, lazy
+    LLM_PROBE_TIMEOUT = float(os.getenv('LLM_PROBE_TIMEOUT', '8'))  # общий дедлайн параллельных тестов
+    LLM_PROBE_CACHE_FILE = os.getenv('LLM_PROBE_CACHE_FILE', 'temp/provider_probe_cache.json')
+    LLM_PROBE_CACHE_TTL = float(os.getenv('LLM_PROBE_CACHE_TTL', '3600'))  # секунды; 0 = без кеша
+    
     # API Keys - БЕСПЛАТНЫЕ провайдеры (тестируются автоматически при запуске)
     GROQ_API_KEY = os.getenv('GROQ_API_KEY', '')  # Groq - БЕСПЛАТНО, быстро! groq.com
     GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY', '')  # Google Gemini - БЕСПЛАТНО 60 req/min
@@ -37,6 +70,23 @@ class Config:
     XAI_API_KEY = os.getenv('XAI_API_KEY', '')  # xAI Grok
     COHERE_API_KEY = os.getenv('COHERE_API_KEY', '')  # Cohere (модели устарели)
     
+    # 🗂️ Кеш переписывания (SQLite, повторы постов не тратят LLM)
+    REWRITE_CACHE_ENABLED = os.getenv('REWRITE_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    REWRITE_CACHE_PATH = os.getenv('REWRITE_CACHE_PATH', 'temp/rewrite_cache.sqlite3')
+    REWRITE_CACHE_TTL = float(os.getenv('REWRITE_CACHE_TTL', str(7 * 24 * 3600)))  # секунды
+    REWRITE_CACHE_MAX_ENTRIES = int(os.getenv('REWRITE_CACHE_MAX_ENTRIES', '5000'))
+    
+    # ✅ Локальная проверка результата переписывания (повторный вызов LLM — только при провале)
+    REWRITE_MIN_UNIQUENESS = float(os.getenv('REWRITE_MIN_UNIQUENESS', '30'))  # %, см. check_uniqueness
+    REWRITE_REPAIR = os.getenv('REWRITE_REPAIR', 'true').lower() in ('1', 'true', 'yes')  # точечная перегенерация
+    
+    # 🗃️ Индекс опубликованных постов (идемпотентность при реконнектах и рестартах)
+    MESSAGE_INDEX_PATH = os.getenv('MESSAGE_INDEX_PATH', 'temp/message_index.jsonl')
+    MESSAGE_INDEX_MAX_ENTRIES = int(os.getenv('MESSAGE_INDEX_MAX_ENTRIES', '50000'))
+    
+    # 📊 Метрики
+    METRICS_LOG_INTERVAL = float(os.getenv('METRICS_LOG_INTERVAL', '300'))  # секунды; 0 = не выводить
+    
     # 🔗 Брендинг
     YOUR_LINK = os.getenv('YOUR_LINK', 't.me/your_channel')
     YOUR_BRAND_NAME = os.getenv('YOUR_BRAND_NAME', 'Ваш VPN')
@@ -48,16 +98,77 @@ class Config:
     )
     
     # ⏱️ Настройки мониторинга
-    CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL', '60'))  # секунды
-    MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
+    CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL', '60'))  # секунды между проверками истории на пропуски; 0 = выкл
+    MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))  # повторов отправки после FloodWait/сетевой ошибки
+    
+    # ⏩ Догонялка: посты, пропущенные пока бот не работал
+    CATCHUP_ENABLED = os.getenv('CATCHUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    CATCHUP_PAGE_SIZE = int(os.getenv('CATCHUP_PAGE_SIZE', '100'))  # сообщений на страницу истории
+    CATCHUP_INITIAL_LIMIT = int(os.getenv('CATCHUP_INITIAL_LIMIT', '0'))  # первый запуск: сколько последних копировать
+    CATCHUP_MIN_AGE = float(os.getenv('CATCHUP_MIN_AGE', '30'))  # секунды; более свежие доставит event handler
+    
+    # 📦 Сборка альбомов: пауза после части = factor × средний интервал между частями (в пределах min..max)
+    ALBUM_DEBOUNCE_MIN = float(os.getenv('ALBUM_DEBOUNCE_MIN', '0.3'))  # секунды
+    ALBUM_DEBOUNCE_MAX = float(os.getenv('ALBUM_DEBOUNCE_MAX', '2.0'))  # секунды; пока интервалы не измерены
+    ALBUM_DEBOUNCE_FACTOR = float(os.getenv('ALBUM_DEBOUNCE_FACTOR', '3'))
+    ALBUM_PREFETCH = os.getenv('ALBUM_PREFETCH', 'true').lower() in ('1', 'true', 'yes')  # качать и обрабатывать части сразу
+    PREFETCH_MAX_ACTIVE = int(os.getenv('PREFETCH_MAX_ACTIVE', '8'))  # фоновых задач предзагрузки; сверх — части ждут пайплайн
     
     # 🔍 OCR настройки
     OCR_LANGUAGE = os.getenv('OCR_LANGUAGE', 'rus+eng')
+    OCR_BACKEND = os.getenv('OCR_BACKEND', 'auto')  # auto, tesserocr (в процессе), pytesseract (процесс на вызов)
+    OCR_STRATEGY = os.getenv('OCR_STRATEGY', 'two_pass')  # two_pass, regions (OCR только областей с текстом), full (весь кадр)
+    OCR_REGIONS_MAX_COVERAGE = float(os.getenv('OCR_REGIONS_MAX_COVERAGE', '0.5'))  # больше — OCR всего кадра
+    OCR_FAST_MAX_WIDTH = int(os.getenv('OCR_FAST_MAX_WIDTH', '1000'))  # two_pass: ширина копии для быстрого прохода
+    OCR_FAST_LANGUAGE = os.getenv('OCR_FAST_LANGUAGE', 'eng')  # two_pass: ссылки латиницей
+    OCR_FAST_MIN_CONFIDENCE = float(os.getenv('OCR_FAST_MIN_CONFIDENCE', '60'))  # ниже — похожее на ссылку слово проверяется
     OLD_LINK_PATTERN = os.getenv(
         'OLD_LINK_PATTERN',
         't.me/na_svyazi_helpdesk|t.me/nasvyazi'
     )
     
+    # 🧵 Пул обработки изображений (OCR + inpaint вне event loop)
+    IMAGE_EXECUTOR = os.getenv('IMAGE_EXECUTOR', 'process')  # process, thread, inline
+    IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '0')) or os.cpu_count() or 1  # 0 = по числу ядер
+    IMAGE_QUEUE_SIZE = int(os.getenv('IMAGE_QUEUE_SIZE', '0')) or IMAGE_WORKERS * 2  # задач в ожидании сверх воркеров
+    
+    # 🧬 Кеш обработанных изображений по перцептивному хешу
+    IMAGE_CACHE_ENABLED = os.getenv('IMAGE_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    IMAGE_HASH_MAX_DISTANCE = int(os.getenv('IMAGE_HASH_MAX_DISTANCE', '4'))  # бит из 64 (расстояние Хэмминга)
+    IMAGE_CACHE_MAX_ENTRIES = int(os.getenv('IMAGE_CACHE_MAX_ENTRIES', '1000'))
+    
+    # 💾 Кодирование обработанных изображений (формат и качество исходника)
+    IMAGE_MAX_SIDE = int(os.getenv('IMAGE_MAX_SIDE', '2560'))  # большая сторона, px (лимит фото Telegram); 0 = без ограничения
+    JPEG_DEFAULT_QUALITY = int(os.getenv('JPEG_DEFAULT_QUALITY', '87'))  # если качество исходника не определить
+    
+    # ⚡ Отправка неизмененных фото по ссылке на оригинал (без скачивания и загрузки)
+    SEND_BY_REFERENCE = os.getenv('SEND_BY_REFERENCE', 'true').lower() in ('1', 'true', 'yes')
+    OCR_PROBE_MAX_SIDE = int(os.getenv('OCR_PROBE_MAX_SIDE', '1280'))  # превью для проверки «нужен ли OCR», px
+    
+    # 📎 Кеш загрузок: фото грузится в Telegram один раз на все цели и повторы отправки
+    UPLOAD_CACHE_TTL = float(os.getenv('UPLOAD_CACHE_TTL', '3600'))  # секунд жизни хендла загрузки
+    UPLOAD_CACHE_MAX_ENTRIES = int(os.getenv('UPLOAD_CACHE_MAX_ENTRIES', '500'))
+    
+    # 🏭 Пайплайн обработки (ingest → download → rewrite → transform → publish)
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '32'))  # лимит очереди каждой стадии
+    PIPELINE_INGEST_WORKERS = int(os.getenv('PIPELINE_INGEST_WORKERS', '1'))
+    PIPELINE_DOWNLOAD_WORKERS = int(os.getenv('PIPELINE_DOWNLOAD_WORKERS', '4'))
+    PIPELINE_REWRITE_WORKERS = int(os.getenv('PIPELINE_REWRITE_WORKERS', '4'))
+    PIPELINE_TRANSFORM_WORKERS = int(os.getenv('PIPELINE_TRANSFORM_WORKERS', '0')) or IMAGE_WORKERS
+    PIPELINE_PUBLISH_WORKERS = int(os.getenv('PIPELINE_PUBLISH_WORKERS', '1'))  # 1 = строгий порядок публикаций
+    PIPELINE_DRAIN_TIMEOUT = float(os.getenv('PIPELINE_DRAIN_TIMEOUT', '30'))  # секунды на дообработку при остановке
+    DOWNLOAD_CONCURRENCY_PER_POST = int(os.getenv('DOWNLOAD_CONCURRENCY_PER_POST', '4'))  # параллельных скачиваний в одном альбоме
+    DOWNLOAD_CONCURRENCY = int(os.getenv('DOWNLOAD_CONCURRENCY', '8'))  # всего параллельных скачиваний (с предзагрузкой)
+    
+    # 🚦 Антифлуд публикаций (token bucket: темп в минуту + допустимая пачка подряд)
+    PUBLISH_MESSAGES_PER_MINUTE = float(os.getenv('PUBLISH_MESSAGES_PER_MINUTE', '20'))  # на целевой канал
+    PUBLISH_MESSAGE_BURST = float(os.getenv('PUBLISH_MESSAGE_BURST', '3'))
+    PUBLISH_ALBUMS_PER_MINUTE = float(os.getenv('PUBLISH_ALBUMS_PER_MINUTE', '6'))  # на целевой канал
+    PUBLISH_ALBUM_BURST = float(os.getenv('PUBLISH_ALBUM_BURST', '2'))
+    PUBLISH_GLOBAL_PER_MINUTE = float(os.getenv('PUBLISH_GLOBAL_PER_MINUTE', '30'))  # сообщений на аккаунт (альбом = N)
+    PUBLISH_GLOBAL_BURST = float(os.getenv('PUBLISH_GLOBAL_BURST', '10'))
+    PUBLISH_LANE_SIZE = int(os.getenv('PUBLISH_LANE_SIZE', '50'))  # постов в очереди одной цели (FloodWait паркует только ее)
+    
     # 📁 Пути
     TEMP_DIR = 'temp'
     PROCESSED_DIR = 'processed_images'
@@ -71,10 +182,14 @@ class Config:
             errors.append("❌ API_ID не установлен")
         if not cls.API_HASH:
             errors.append("❌ API_HASH не установлен")
-        if not cls.SOURCE_CHANNEL:
-            errors.append("❌ SOURCE_CHANNEL не установлен")
-        if not cls.TARGET_CHANNEL:
-            errors.append("❌ TARGET_CHANNEL не установлен")
+        # Каналы обязательны, только если не задана таблица маршрутов
+        if not cls.ROUTES and not cls.ROUTES_FILE:
+            if not cls.SOURCE_CHANNEL:
+                errors.append("❌ SOURCE_CHANNEL не установлен")
+            if not cls.TARGET_CHANNEL:
+                errors.append("❌ TARGET_CHANNEL не установлен")
+        elif cls.ROUTES_FILE and not cls.ROUTES and not os.path.exists(cls.ROUTES_FILE):
+            errors.append(f"❌ ROUTES_FILE не найден: {cls.ROUTES_FILE}")
             
         # LLM опционально - бот может работать без AI
         has_llm_key = any([
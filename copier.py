@@ -7,15 +7,35 @@ import asyncio
 import logging
 import sys
 import re
+import time
+from collections import OrderedDict
 from io import BytesIO
-from datetime import datetime
-from telethon import TelegramClient, events
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from telethon import TelegramClient, events, utils as telethon_utils
 from telethon.tl.types import InputChannel, MessageMediaPhoto
-from telethon.errors import FloodWaitError, SessionPasswordNeededError
+from telethon.errors import (
+    ChatForwardsRestrictedError,
+    FilePartMissingError,
+    FilePartsInvalidError,
+    FileReferenceExpiredError,
+    MediaEmptyError,
+    MediaInvalidError,
+    SessionPasswordNeededError,
+)
 
 from config import Config
-from llm_client import get_llm_client
+from llm_client import CAPTION_LIMIT, get_llm_client
 from image_processor import get_image_processor
+from pipeline import Pipeline, PostJob
+from metrics import get_metrics
+from message_index import MessageIndex
+from routes import Route, load_routes
+from publish_scheduler import ALBUM, MESSAGE, get_publish_scheduler
+from publish_lanes import PublishLanes
+from album_assembler import AlbumAssembler
+from upload_cache import UploadCache
+from utils import calculate_text_hash, image_filename
 
 # Настройка логирования с ротацией
 import os
@@ -41,6 +61,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Момент запуска процесса (для замера времени старта)
+PROCESS_STARTED_AT = time.monotonic()
+
+# Сколько предзагруженных частей альбомов (скачанных и обработанных) держать в памяти
+PREFETCH_MAX_ITEMS = 50
+_MISSING = object()  # предзагрузки не было
+
+# Telegram не принял фото по ссылке на оригинал — скачиваем и загружаем файлом
+REFERENCE_ERRORS = (ChatForwardsRestrictedError, FileReferenceExpiredError, MediaEmptyError, MediaInvalidError)
+
+# Telegram больше не хранит загруженные части файла — хендл из кеша загрузок истек
+UPLOAD_EXPIRED_ERRORS = (FilePartMissingError, FilePartsInvalidError)
+ORIGINAL = 'original'  # версия обработки для неизмененного фото (ключ кеша загрузок)
+
 
 class TelegramPostCopier:
     """Основной класс для копирования постов"""
@@ -62,12 +96,53 @@ class TelegramPostCopier:
         self.llm_client = get_llm_client()
         self.image_processor = get_image_processor()
         
-        self.source_entity = None
-        self.target_entity = None
-        self.groups = {}  # Буфер для группировки медиа по grouped_id
-        self.group_timers = {}  # Таймеры для flush групп
+        # Маршруты источник → цели (один обработчик на все источники, общие пулы)
+        try:
+            self.routes: List[Route] = load_routes()
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Ошибка в таблице маршрутов: {e}")
+            raise ValueError("Ошибка конфигурации маршрутов. Проверьте ROUTES/ROUTES_FILE")
+        self.sources: Dict[int, object] = {}  # chat_id → сущность исходного чата
+        self.routes_by_source: Dict[int, List[Route]] = {}
+        
         self.is_running = False
         
+        # Индекс уже опубликованных постов (защита от дублей при реконнектах и рестартах)
+        self.message_index = MessageIndex(Config.MESSAGE_INDEX_PATH, Config.MESSAGE_INDEX_MAX_ENTRIES)
+        self._in_progress = set()  # ключи постов, которые сейчас в пайплайне
+        
+        # Догонялка: пропущенные за время простоя посты и периодическое восстановление пропусков
+        self._catchup_done = asyncio.Event()  # живые посты ждут окончания догонялки (порядок публикаций)
+        self._catchup_lock = asyncio.Lock()
+        self._catchup_task = None
+        self._gap_task = None
+        self._live_min_id: Dict[int, int] = {}  # chat → первый ID из event handler'а (граница догонялки)
+        self._scanned_up_to: Dict[int, int] = {}  # chat → до какого ID история уже просмотрена
+        self._route_floor: Dict[Tuple[str, int], int] = {}  # (маршрут, chat) → ID, с которого копировать
+        
+        # Сборка альбомов с адаптивной паузой; части качаются и обрабатываются сразу по приходу
+        self.albums = AlbumAssembler(
+            on_complete=self._submit_to_routes,
+            on_member=self._prefetch_media if Config.ALBUM_PREFETCH else None,
+            gate=self._catchup_done,
+            min_delay=Config.ALBUM_DEBOUNCE_MIN,
+            max_delay=Config.ALBUM_DEBOUNCE_MAX,
+            factor=Config.ALBUM_DEBOUNCE_FACTOR
+        )
+        self._prefetched: OrderedDict = OrderedDict()  # (chat, msg_id[, link]) → Task
+        self._prefetch_active = set()  # незавершенные задачи предзагрузки (лимит PREFETCH_MAX_ACTIVE)
+        self._download_slots = asyncio.Semaphore(max(1, Config.DOWNLOAD_CONCURRENCY))
+        self._no_reference_sources = set()  # источники, фото которых Telegram не дает отправлять по ссылке
+        self.uploads = UploadCache(Config.UPLOAD_CACHE_TTL, Config.UPLOAD_CACHE_MAX_ENTRIES)
+        
+        # Стадийный пайплайн: обработчик событий только ставит посты в очередь
+        self.pipeline = self._build_pipeline()
+        self.publish_scheduler = get_publish_scheduler()
+        self.publish_lanes = PublishLanes(self.publish_scheduler, Config.MAX_RETRIES, Config.PUBLISH_LANE_SIZE)
+        self._publish_tasks = set()  # ожидание отправок по постам (_finish_publish)
+        self.metrics = get_metrics()
+        self._metrics_task = None
+        
         logger.info("🚀 TelegramPostCopier инициализирован")
     
     async def start(self):
@@ -83,14 +158,30 @@ class TelegramPostCopier:
             # Получение сущностей каналов
             await self._init_channels()
             
+            # Запуск воркеров пайплайна
+            await self.pipeline.start()
+            
+            if Config.METRICS_LOG_INTERVAL > 0:
+                self._metrics_task = asyncio.create_task(self._log_metrics_periodically())
+            
             # Регистрация event handler для новых сообщений
             self.client.add_event_handler(
                 self._new_message_handler,
-                events.NewMessage(chats=self.source_entity)
+                events.NewMessage(chats=list(self.sources.values()))
             )
             logger.info("📡 Event-based мониторинг зарегистрирован")
             
-            logger.info("✨ Система готова к работе!")
+            # Догонялка после регистрации обработчика: новые посты не теряются,
+            # а ждут, пока не будут поставлены в очередь пропущенные
+            if Config.CATCHUP_ENABLED:
+                self._catchup_task = asyncio.create_task(self._run_catch_up())
+            else:
+                self._catchup_done.set()
+            if Config.CATCHUP_ENABLED and Config.CHECK_INTERVAL > 0:
+                self._gap_task = asyncio.create_task(self._recover_gaps_periodically())
+            
+            startup_seconds = time.monotonic() - PROCESS_STARTED_AT
+            logger.info(f"✨ Система готова к работе! (старт за {startup_seconds:.1f}с)")
             
         except SessionPasswordNeededError:
             logger.error("❌ Требуется двухфакторная аутентификация. Запустите скрипт вручную для ввода пароля.")
@@ -100,17 +191,31 @@ class TelegramPostCopier:
             raise
     
     async def _init_channels(self):
-        """Инициализация каналов"""
+        """Инициализация каналов всех маршрутов (каждый канал запрашивается один раз)"""
         try:
-            # Исходный канал
-            logger.info(f"📡 Подключение к исходному каналу: {Config.SOURCE_CHANNEL}")
-            self.source_entity = await self.client.get_entity(Config.SOURCE_CHANNEL)
-            logger.info(f"✅ Исходный канал: {self.source_entity.title}")
+            entities = {}
+            
+            async def resolve(ref, kind: str):
+                if ref not in entities:
+                    logger.info(f"{'📡' if kind == 'source' else '📢'} Подключение к каналу: {ref}")
+                    entities[ref] = await self.client.get_entity(ref)
+                    logger.info(f"✅ {'Исходный' if kind == 'source' else 'Целевой'} канал: {entities[ref].title}")
+                return entities[ref]
             
-            # Целевой канал
-            logger.info(f"📢 Подключение к целевому каналу: {Config.TARGET_CHANNEL}")
-            self.target_entity = await self.client.get_entity(Config.TARGET_CHANNEL)
-            logger.info(f"✅ Целевой канал: {self.target_entity.title}")
+            for route in self.routes:
+                for ref in route.sources:
+                    entity = await resolve(ref, 'source')
+                    chat_id = telethon_utils.get_peer_id(entity)
+                    route.source_ids.append(chat_id)
+                    self.sources[chat_id] = entity
+                    self.routes_by_source.setdefault(chat_id, []).append(route)
+                for ref in route.targets:
+                    route.target_entities.append(await resolve(ref, 'target'))
+            
+            if len(self.routes) > 1:
+                logger.info(f"🧭 Маршрутов: {len(self.routes)}, источников: {len(self.sources)}")
+                for route in self.routes:
+                    logger.info(f"🧭   {route.name}: {route.sources} → {route.targets} (бренд: {route.branding.brand_name})")
             
         except Exception as e:
             logger.error(f"❌ Ошибка при инициализации каналов: {e}")
@@ -124,216 +229,710 @@ class TelegramPostCopier:
             
             logger.info(f"🔔 Новое сообщение ID {msg.id} (grouped_id: {group_id or 'None'})")
             
+            # Первый ID из событий — граница догонялки для этого чата
+            self._live_min_id.setdefault(msg.chat_id, msg.id)
+            
             if group_id:
-                # Сообщение является частью альбома
-                if group_id not in self.groups:
-                    self.groups[group_id] = []
-                
-                self.groups[group_id].append(msg)
-                
-                # Отменяем старый таймер если был
-                if group_id in self.group_timers:
-                    self.group_timers[group_id].cancel()
-                
-                # Создаем новый таймер для flush группы через 2 секунды
-                # (чтобы собрать все сообщения альбома)
-                timer = asyncio.create_task(self._flush_group_after_delay(group_id, delay=2.0))
-                self.group_timers[group_id] = timer
+                # Часть альбома: сборщик отдаст альбом после адаптивной паузы
+                # (или сразу на 10-м медиа), скачивание части начинается уже сейчас
+                self.albums.add(msg)
             else:
-                # Одиночное сообщение - обрабатываем сразу
-                await self._process_and_copy_group([msg])
-                await asyncio.sleep(2)  # Антифлуд
+                # Одиночное сообщение - сразу в пайплайн (ждем только если очередь заполнена
+                # или еще идет догонялка пропущенных постов)
+                await self._catchup_done.wait()
+                await self._submit_to_routes([msg])
             
         except Exception as e:
             logger.error(f"❌ Ошибка в обработчике события: {e}", exc_info=True)
     
-    async def _flush_group_after_delay(self, group_id, delay: float):
-        """Отложенная обработка группы (после сбора всех сообщений альбома)"""
+    def _prefetch_media(self, msg):
+        """
+        Предзагрузка части альбома до того, как альбом собран
+        
+        Скачивание (или проверка превью, см. _fetch_photo) и замена ссылок (для ссылки
+        каждого маршрута источника) идут в фоне; стадии download и transform забирают
+        готовый результат по ID сообщения. Предзагрузка идет в обход очередей пайплайна,
+        поэтому ограничена PREFETCH_MAX_ACTIVE задачами: сверх лимита часть просто
+        обработает пайплайн (с его backpressure).
+        """
+        if not (msg.photo or (msg.media and hasattr(msg.media, 'photo'))):
+            return
+        if (msg.chat_id, msg.id) in self._prefetched:
+            return
+        
+        # Уже опубликованное во всех маршрутах пайплайн все равно пропустит
+        routes = [
+            route for route in self.routes_by_source.get(msg.chat_id, [])
+            if self.message_index.lookup(route.index_scope(msg.chat_id), [msg]) is None
+        ]
+        if not routes:
+            return
+        
+        links = {route.branding.link for route in routes}
+        if len(self._prefetch_active) + 1 + len(links) > max(1, Config.PREFETCH_MAX_ACTIVE):
+            self.metrics.inc('prefetch_skipped')
+            return
+        
+        download = asyncio.create_task(self._fetch_photo(msg))
+        self._remember_prefetch((msg.chat_id, msg.id), download)
+        for link in links:
+            self._remember_prefetch(
+                (msg.chat_id, msg.id, link),
+                asyncio.create_task(self._prefetch_transform(download, link))
+            )
+    
+    async def _prefetch_transform(self, download: asyncio.Task, link: str):
+        photo, _ = await download
+        if photo is None:
+            return None  # фото уйдет по ссылке, обрабатывать нечего
+        return await self.image_processor.process_image_async(photo, new_link=link)
+    
+    def _remember_prefetch(self, key: tuple, task: asyncio.Task):
+        # Ошибку предзагрузки увидит стадия пайплайна (и повторит работу сама)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._prefetch_active.add(task)
+        task.add_done_callback(self._prefetch_active.discard)
+        self._prefetched[key] = task
+        while len(self._prefetched) > PREFETCH_MAX_ITEMS:
+            # Вытесненный результат уже никто не заберет — незавершенную работу отменяем
+            _, evicted = self._prefetched.popitem(last=False)
+            evicted.cancel()
+    
+    async def _take_prefetched(self, key: tuple):
+        """Результат предзагрузки или _MISSING, если ее не было (или она не удалась)"""
+        task = self._prefetched.get(key)
+        if task is None:
+            return _MISSING
         try:
-            await asyncio.sleep(delay)
-            
-            if group_id in self.groups:
-                msgs = self.groups.pop(group_id)
-                self.group_timers.pop(group_id, None)
-                
-                # Сортируем по ID для правильного порядка
-                msgs.sort(key=lambda m: m.id)
-                
-                logger.info(f"📦 Flush группы {group_id}: собрано {len(msgs)} сообщений")
-                
-                await self._process_and_copy_group(msgs)
-                await asyncio.sleep(2)  # Антифлуд
-                
+            # shield: отмена стадии не должна отменять общую для маршрутов задачу
+            result = await asyncio.shield(task)
         except asyncio.CancelledError:
-            # Таймер был отменен (пришло еще сообщение в группу)
-            pass
+            if not task.cancelled():
+                raise
+            # Предзагрузка вытеснена и отменена — работу сделает стадия
+            return _MISSING
         except Exception as e:
-            logger.error(f"❌ Ошибка при flush группы {group_id}: {e}", exc_info=True)
+            logger.warning(f"⚠️ Предзагрузка не удалась ({e}), повтор в пайплайне")
+            self._prefetched.pop(key, None)
+            return _MISSING
+        self.metrics.inc('prefetch_hits')
+        return result
+    
+    async def _submit_to_routes(self, messages: list):
+        """Постановка поста в пайплайн по каждому маршруту его источника"""
+        for route in self.routes_by_source.get(messages[0].chat_id, []):
+            await self.pipeline.submit(messages, route)
+    
+    async def _run_catch_up(self):
+        """Догонялка при старте: посты, опубликованные в источниках, пока бот не работал"""
+        try:
+            submitted = 0
+            for chat_id in self.sources:
+                # Ошибка одного источника не останавливает догонялку остальных;
+                # его стартовая точка будет определена при восстановлении пропусков
+                try:
+                    submitted += await self._catch_up(chat_id, upper_id_getter=lambda c=chat_id: self._live_min_id.get(c))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ Ошибка догонялки (чат {chat_id}): {e}", exc_info=True)
+            if submitted:
+                logger.info(f"⏩ Догонялка: поставлено в очередь {submitted} пропущенных постов")
+            else:
+                logger.info("⏩ Догонялка: пропущенных постов нет")
+        finally:
+            self._catchup_done.set()
+    
+    async def _recover_gaps_periodically(self):
+        """Раз в CHECK_INTERVAL проверяет историю на посты, не дошедшие через события"""
+        await self._catchup_done.wait()
+        while True:
+            await asyncio.sleep(Config.CHECK_INTERVAL)
+            for chat_id in self.sources:
+                try:
+                    submitted = await self._catch_up(chat_id, min_age=Config.CATCHUP_MIN_AGE)
+                    if submitted:
+                        logger.warning(f"🩹 Восстановление пропусков: найдено {submitted} постов, не пришедших через события")
+                        self.metrics.inc('posts_recovered', submitted)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ Ошибка восстановления пропусков (чат {chat_id}): {e}", exc_info=True)
     
-    async def _process_and_copy_group(self, messages: list):
+    async def _init_catch_up_floor(self, chat_id: int):
         """
-        Обработка и копирование группы сообщений (альбом или одиночное)
+        Стартовая точка догонялки для источника: последний опубликованный ID по каждому маршруту
+        
+        Маршрут без записей в индексе (первый запуск или новый маршрут) начинает
+        с последних CATCHUP_INITIAL_LIMIT сообщений.
+        """
+        initial_id = None
+        for route in self.routes_by_source[chat_id]:
+            floor = self.message_index.last_message_id(route.index_scope(chat_id))
+            if not floor:
+                if initial_id is None:
+                    initial_id = await self._initial_catch_up_id(chat_id)
+                floor = initial_id
+            self._route_floor[(route.name, chat_id)] = floor
+        
+        self._scanned_up_to[chat_id] = min(
+            self._route_floor[(route.name, chat_id)] for route in self.routes_by_source[chat_id]
+        )
+    
+    async def _initial_catch_up_id(self, chat_id: int) -> int:
+        """Стартовая точка при первом запуске (индекс пуст): последние CATCHUP_INITIAL_LIMIT сообщений"""
+        entity = self.sources[chat_id]
+        if Config.CATCHUP_INITIAL_LIMIT <= 0:
+            latest = await self.client.get_messages(entity, limit=1)
+            return latest[0].id if latest else 0
+        
+        history = await self.client.get_messages(entity, limit=Config.CATCHUP_INITIAL_LIMIT)
+        if not history:
+            return 0
+        logger.info(f"⏩ Первый запуск: будут скопированы последние {len(history)} сообщений из {getattr(entity, 'title', chat_id)}")
+        return min(m.id for m in history) - 1
+    
+    async def _catch_up(self, chat_id: int, upper_id_getter=None, min_age: float = 0.0) -> int:
+        """
+        Просмотр истории источника после _scanned_up_to и постановка постов в пайплайн
+        
+        Без стартовой точки (догонялка при старте не удалась) она сначала
+        определяется заново — история никогда не просматривается с начала канала.
         
         Args:
-            messages: List of Telethon Message objects (может быть 1 или несколько)
+            chat_id: Исходный чат
+            upper_id_getter: Граница (ID, с которого посты принадлежат event handler'у)
+            min_age: Не трогать сообщения моложе (секунды) — их еще может доставить событие
+        
+        Returns:
+            Количество поставленных в очередь задач
         """
-        try:
-            if not messages:
-                return
+        async with self._catchup_lock:
+            if chat_id not in self._scanned_up_to:
+                await self._init_catch_up_floor(chat_id)
             
-            first_msg = messages[0]
-            group_id = first_msg.grouped_id
-            
-            if len(messages) > 1:
-                logger.info(f"🔄 Обработка альбома ID {group_id} ({len(messages)} медиа)")
-            else:
-                logger.info(f"🔄 Обработка поста ID {first_msg.id}")
-            
-            # Текст обычно в первом сообщении
-            original_text = first_msg.text or ""
-            
-            # Проверка ссылок в тексте
-            has_links = bool(re.search(r'(t\.me/|https?://)', original_text))
+            submitted = 0
+            async for post in self._iter_history_posts(chat_id, upper_id_getter, min_age):
+                submitted += await self._submit_history_post(chat_id, post)
+                self._scanned_up_to[chat_id] = max(self._scanned_up_to[chat_id], post[-1].id)
+            return submitted
+    
+    async def _iter_history_posts(self, chat_id: int, upper_id_getter, min_age: float):
+        """
+        История страницами по CATCHUP_PAGE_SIZE (от старых к новым), сгруппированная в посты
+        
+        Альбом, разорванный границей страницы, собирается целиком: последняя группа
+        страницы отдается только после того, как следующая страница ее не продолжает.
+        """
+        cursor = self._scanned_up_to[chat_id]
+        pending: list = []
+        page_no = 0
+        
+        while True:
+            page = [
+                m async for m in self.client.iter_messages(
+                    self.sources[chat_id],
+                    limit=Config.CATCHUP_PAGE_SIZE,
+                    offset_id=cursor,
+                    reverse=True
+                )
+            ]
+            if not page:
+                break
+            page_no += 1
+            cursor = page[-1].id
+            if page_no > 1 and page_no % 10 == 0:
+                logger.info(f"⏩ Догонялка: просмотрено до ID {cursor}")
             
-            # Переписывание текста с помощью AI
-            if original_text:
-                logger.info("🧠 AI: Переписывание текста...")
-                rewritten_text = self.llm_client.rewrite_text(original_text, has_links)
+            for msg in page:
+                upper_id = upper_id_getter() if upper_id_getter else None
+                too_new = upper_id is not None and msg.id >= upper_id
+                too_young = min_age > 0 and (datetime.now(timezone.utc) - msg.date).total_seconds() < min_age
+                if too_new or too_young:
+                    # Дальше — зона event handler'а. Альбом, продолжающийся за границей:
+                    # при старте его конец уже собирает handler (допишем начало),
+                    # а свежий альбом оставляем до следующей проверки
+                    continues = bool(pending) and msg.grouped_id and msg.grouped_id == pending[0].grouped_id
+                    if pending and (too_new or not continues):
+                        yield pending
+                    return
                 
-                uniqueness = self.llm_client.check_uniqueness(original_text, rewritten_text)
-                logger.info(f"📊 Уникальность: {uniqueness:.1f}%")
+                if getattr(msg, 'action', None):
+                    continue  # служебные сообщения (закреп, смена названия...)
                 
-                # Если уникальность низкая, добавляем упоминание бренда
-                if uniqueness < 30:
-                    logger.info("🎯 Добавление упоминания бренда...")
-                    rewritten_text = self.llm_client.enhance_with_cta(rewritten_text)
-            else:
-                rewritten_text = ""
+                if pending and (not msg.grouped_id or msg.grouped_id != pending[0].grouped_id):
+                    yield pending
+                    pending = []
+                pending.append(msg)
             
-            # Telegram лимит для подписи к фото/альбому: 1024 символа
-            MAX_CAPTION_LENGTH = 1024
-            if len(rewritten_text) > MAX_CAPTION_LENGTH:
-                logger.warning(f"⚠️ Текст обрезан до {MAX_CAPTION_LENGTH} символов (было {len(rewritten_text)})")
-                rewritten_text = rewritten_text[:MAX_CAPTION_LENGTH-3] + "..."
+            if len(page) < Config.CATCHUP_PAGE_SIZE:
+                break
+        
+        if pending:
+            yield pending
+    
+    async def _submit_history_post(self, chat_id: int, messages: list) -> int:
+        """
+        Постановка поста из истории в пайплайн по маршрутам, для которых он еще
+        не опубликован и не в обработке
+        
+        Returns:
+            Количество поставленных в очередь задач
+        """
+        group_id = messages[0].grouped_id
+        if group_id and self.albums.merge(group_id, messages):
+            # Окончание альбома уже пришло через событие — дописываем начало из истории
+            return 0
+        
+        submitted = 0
+        for route in self.routes_by_source.get(chat_id, []):
+            if messages[-1].id <= self._route_floor[(route.name, chat_id)]:
+                continue
+            scope = route.index_scope(chat_id)
+            if self.message_index.lookup(scope, messages) is not None:
+                continue
+            if MessageIndex.post_key(scope, messages) in self._in_progress:
+                continue
+            await self.pipeline.submit(messages, route)
+            submitted += 1
+        return submitted
+    
+    async def _log_metrics_periodically(self):
+        """Периодический вывод метрик, глубины очередей пайплайна и маршрутизации LLM"""
+        while True:
+            await asyncio.sleep(Config.METRICS_LOG_INTERVAL)
+            self.metrics.log_summary()
+            logger.info(f"📊 Пайплайн: {self.pipeline.stats()}")
+            lanes = self.publish_lanes.stats()
+            if lanes:
+                logger.info(f"📊 Очереди отправки: {lanes}")
+            self._log_routing_state()
+    
+    def _log_routing_state(self):
+        """Порядок LLM провайдеров и их здоровье (EWMA задержки, ошибки, размыкатель)"""
+        routing = self.llm_client.get_routing_state()
+        if not routing['order']:
+            return
+        logger.info(f"🩺 Маршрутизация LLM: {' → '.join(routing['order'])}")
+        for name, state in routing['providers'].items():
+            logger.info(
+                f"🩺   {name}: {state['state']}, ожидание {state['expected_latency']}с, "
+                f"ошибки {state['error_rate']:.0%}, успехов {state['successes']}, ошибок {state['failures']}"
+            )
+    
+    def _build_pipeline(self) -> Pipeline:
+        """Сборка стадий: ingest → download → rewrite → transform → publish"""
+        queue_size = Config.PIPELINE_QUEUE_SIZE
+        return (
+            Pipeline(ordered=True, on_finish=self._on_job_finished)
+            .add_stage('ingest', self._stage_ingest, Config.PIPELINE_INGEST_WORKERS, queue_size)
+            .add_stage('download', self._stage_download, Config.PIPELINE_DOWNLOAD_WORKERS, queue_size)
+            .add_stage('rewrite', self._stage_rewrite, Config.PIPELINE_REWRITE_WORKERS, queue_size)
+            .add_stage('transform', self._stage_transform, Config.PIPELINE_TRANSFORM_WORKERS, queue_size)
+            .add_stage('publish', self._stage_publish, Config.PIPELINE_PUBLISH_WORKERS, queue_size)
+        )
+    
+    async def _stage_ingest(self, job: PostJob) -> Optional[PostJob]:
+        """Стадия ingest: разбор сообщений Telegram"""
+        # Уже опубликован или обрабатывается — не тратим скачивание и LLM повторно
+        scope = job.route.index_scope(job.first_msg.chat_id)
+        key = MessageIndex.post_key(scope, job.messages)
+        published = self.message_index.lookup(scope, job.messages)
+        if published is not None:
+            logger.info(f"⏭️ Пропуск: {job.describe()} уже опубликован (ID в целевом канале: {published['target_ids']})")
+            self.metrics.inc('posts_skipped_duplicate')
+            return None
+        if key in self._in_progress:
+            logger.info(f"⏭️ Пропуск: {job.describe()} уже в обработке")
+            self.metrics.inc('posts_skipped_duplicate')
+            return None
+        self._in_progress.add(key)
+        job.key = key
+        
+        if len(self.routes) > 1:
+            logger.info(f"🔄 Обработка: {job.describe()} (маршрут {job.route.name})")
+        else:
+            logger.info(f"🔄 Обработка: {job.describe()}")
+        
+        # Текст обычно в первом сообщении
+        job.original_text = job.first_msg.text or ""
+        
+        # Проверка ссылок в тексте
+        job.has_links = bool(re.search(r'(t\.me/|https?://)', job.original_text))
+        
+        photo_ids = [str(msg.photo.id) for msg in job.messages if msg.photo]
+        job.content_hash = calculate_text_hash(job.original_text + '|' + ','.join(photo_ids))
+        return job
+    
+    def _on_job_finished(self, job: PostJob):
+        """Пост покинул пайплайн (опубликован или отброшен) — снимаем отметку «в обработке»"""
+        if job.key:
+            self._in_progress.discard(job.key)
+    
+    async def _stage_download(self, job: PostJob) -> Optional[PostJob]:
+        """
+        Стадия download: параллельное скачивание изображений группы (или готовые из предзагрузки)
+        
+        Не больше DOWNLOAD_CONCURRENCY_PER_POST скачиваний на пост и DOWNLOAD_CONCURRENCY
+        всего; результат — в порядке ID сообщений. None вместо байтов — фото без
+        старых ссылок (по превью), оно будет отправлено по ссылке на оригинал.
+        """
+        photo_msgs = sorted(
+            (msg for msg in job.messages if msg.photo or (msg.media and hasattr(msg.media, 'photo'))),
+            key=lambda m: m.id
+        )
+        if not photo_msgs:
+            return job
+        
+        post_slots = asyncio.Semaphore(max(1, Config.DOWNLOAD_CONCURRENCY_PER_POST))
+        
+        async def fetch(msg) -> tuple:
+            fetched = await self._take_prefetched((msg.chat_id, msg.id))
+            if fetched is not _MISSING:
+                return fetched
+            async with post_slots:
+                return await self._fetch_photo(msg)
+        
+        started = time.monotonic()
+        fetched = await asyncio.gather(*(fetch(msg) for msg in photo_msgs))
+        job.photos = [photo for photo, _ in fetched]
+        job.photo_refs = [reference for _, reference in fetched]
+        job.photo_ids = [msg.id for msg in photo_msgs]
+        job.photo_sources = [msg.photo.id if msg.photo is not None else (msg.chat_id, msg.id) for msg in photo_msgs]
+        if len(photo_msgs) > 1:
+            logger.info(f"📥 Скачано {len(photo_msgs)} изображений за {time.monotonic() - started:.1f}с")
+        return job
+    
+    def _can_send_by_reference(self, msg) -> bool:
+        """Можно ли отправить фото ссылкой на оригинал (без скачивания и загрузки)"""
+        return (
+            Config.SEND_BY_REFERENCE
+            and msg.photo is not None
+            and not getattr(msg, 'noforwards', False)
+            and not getattr(self.sources.get(msg.chat_id), 'noforwards', False)
+            and msg.chat_id not in self._no_reference_sources
+        )
+    
+    def _probe_size(self, photo):
+        """Превью для проверки «нужен ли OCR»: самое крупное не больше OCR_PROBE_MAX_SIDE, если оно меньше оригинала"""
+        sides = [(max(getattr(size, 'w', 0), getattr(size, 'h', 0)), size) for size in photo.sizes]
+        largest = max((side for side, _ in sides), default=0)
+        candidates = [(side, size) for side, size in sides if 0 < side <= Config.OCR_PROBE_MAX_SIDE and side < largest]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda item: item[0])[1]
+    
+    async def _fetch_photo(self, msg) -> Tuple[Optional[bytes], Any]:
+        """
+        (оригинал фото, ссылка на оригинал) — решение об отправке по ссылке принимается здесь один раз
+        
+        Ссылка (Telegram Photo) — None, если отправка по ссылке запрещена. Байты — None,
+        если по превью старых ссылок нет: превью в несколько раз меньше оригинала,
+        и быстрого прохода OCR по нему достаточно, чтобы не качать большинство фото вовсе.
+        """
+        reference = msg.photo if self._can_send_by_reference(msg) else None
+        if reference is not None:
+            probe = self._probe_size(reference)
+            if probe is not None:
+                preview = await self._download_photo(msg, probe)
+                if not await self.image_processor.needs_processing_async(preview):
+                    logger.info(f"⚡ Фото из сообщения ID {msg.id} без старых ссылок — отправка по ссылке на оригинал")
+                    self.metrics.inc('photos_skipped_download')
+                    return None, reference
+        return await self._download_photo(msg), reference
+    
+    async def _download_photo(self, msg, thumb=None) -> bytes:
+        """Скачивание изображения сообщения или его превью (под общим лимитом DOWNLOAD_CONCURRENCY)"""
+        async with self._download_slots:
+            what = 'превью' if thumb is not None else 'изображения'
+            logger.info(f"📥 Скачивание {what} из сообщения ID {msg.id}...")
+            started = time.monotonic()
+            photo = await msg.download_media(bytes, thumb=thumb)
+            self.metrics.observe('download_seconds', time.monotonic() - started)
+            return photo
+    
+    async def _stage_rewrite(self, job: PostJob) -> Optional[PostJob]:
+        """Стадия rewrite: переписывание текста с помощью AI"""
+        original_text = job.original_text
+        
+        if original_text:
+            logger.info("🧠 AI: Переписывание текста...")
+            rewritten_text = await self.llm_client.arewrite_text(original_text, job.has_links, job.route.branding)
+            
+            # Проверки (ссылки, длина, уникальность) и повтор при провале — внутри arewrite_text
+            uniqueness = self.llm_client.check_uniqueness(original_text, rewritten_text)
+            logger.info(f"📊 Уникальность: {uniqueness:.1f}%")
+        else:
+            rewritten_text = ""
+        
+        # Telegram лимит для подписи к фото/альбому: 1024 символа
+        if len(rewritten_text) > CAPTION_LIMIT:
+            logger.warning(f"⚠️ Текст обрезан до {CAPTION_LIMIT} символов (было {len(rewritten_text)})")
+            rewritten_text = rewritten_text[:CAPTION_LIMIT-3] + "..."
+        
+        job.rewritten_text = rewritten_text
+        return job
+    
+    async def _stage_transform(self, job: PostJob) -> Optional[PostJob]:
+        """
+        Стадия transform: замена ссылок на изображениях
+        
+        Изображения альбома обрабатываются параллельно (число одновременных задач
+        ограничивает пул обработки изображений), порядок сохраняется. Неизмененное
+        фото отправляется ссылкой на оригинал (Telegram Photo), если это разрешено.
+        """
+        link = job.route.branding.link
+        
+        async def transform(msg_id: int, photo_bytes: Optional[bytes], reference) -> tuple:
+            if photo_bytes is None:
+                result = (reference, False)
+            else:
+                result = await self._take_prefetched((job.first_msg.chat_id, msg_id, link))
+                if result is _MISSING:
+                    result = await self.image_processor.process_image_async(photo_bytes, new_link=link)
             
-            # Сбор и обработка всех медиа из группы
-            media_list = []
-            for msg in messages:
-                if msg.photo or (msg.media and hasattr(msg.media, 'photo')):
-                    logger.info(f"🎨 Обработка изображения из сообщения ID {msg.id}...")
-                    
-                    # Скачиваем как bytes
-                    photo_bytes = await msg.download_media(bytes)
-                    
-                    # Обрабатываем (замена ссылок)
-                    processed_photo, was_modified = self.image_processor.process_image(photo_bytes)
-                    
-                    if was_modified:
-                        logger.info("✨ Изображение модифицировано (ссылки заменены)")
-                    
-                    media_list.append(processed_photo)
+            if not result[1] and reference is not None:
+                self.metrics.inc('photos_by_reference')
+                return reference, False
+            return result
+        
+        refs = job.photo_refs or [None] * len(job.photos)
+        results = await asyncio.gather(*(
+            transform(msg_id, photo_bytes, reference)
+            for msg_id, photo_bytes, reference in zip(job.photo_ids, job.photos, refs)
+        ))
+        version = f"{self.image_processor.signature}|{link}"
+        for source, (processed_photo, was_modified) in zip(job.photo_sources, results):
+            if was_modified:
+                logger.info("✨ Изображение модифицировано (ссылки заменены)")
             
-            # Отправка в зависимости от типа контента
-            if media_list:
-                if len(media_list) > 1:
-                    # Альбом (несколько изображений)
-                    await self._copy_media_album(media_list, rewritten_text)
-                else:
-                    # Одно изображение
-                    await self._copy_single_photo(media_list[0], rewritten_text)
-            elif rewritten_text:
-                # Только текст
-                await self._copy_text_message(rewritten_text)
+            job.media.append(processed_photo)
+            job.media_keys.append((source, version if was_modified else ORIGINAL))
+        return job
+    
+    async def _stage_publish(self, job: PostJob) -> Optional[PostJob]:
+        """
+        Стадия publish: постановка отправок в очереди целевых каналов маршрута
+        
+        Стадия не ждет самой отправки: FloodWait одной цели паркует только ее очередь,
+        а пайплайн и остальные маршруты продолжают работу. Итог фиксирует _finish_publish.
+        """
+        rewritten_text = job.rewritten_text
+        media_list = job.media
+        
+        # Отправка в зависимости от типа контента
+        if media_list and len(media_list) > 1:
+            # Альбом (несколько изображений)
+            kind, count = ALBUM, len(media_list)
+            send = lambda target: self._with_reference_fallback(
+                job, lambda: self._copy_media_album(target, media_list, rewritten_text, job.media_keys)
+            )
+        elif media_list:
+            # Одно изображение
+            kind, count = MESSAGE, 1
+            send = lambda target: self._with_reference_fallback(
+                job, lambda: self._copy_single_photo(target, media_list[0], rewritten_text, job.media_keys[0])
+            )
+        elif rewritten_text and len(rewritten_text.strip()) >= 3:
+            # Только текст
+            kind, count = MESSAGE, 1
+            send = lambda target: self._copy_text_message(target, rewritten_text)
+        else:
+            if rewritten_text:
+                logger.warning("⚠️ Текст слишком короткий, пропускаем")
             else:
                 logger.warning("⚠️ Нет контента для копирования")
-                return
+            # Пустой список ID — пост обработан, но публиковать было нечего
+            self._record_published(job)
+            return None
+        
+        futures = []
+        for target in job.route.target_entities:
+            futures.append(await self.publish_lanes.submit(
+                telethon_utils.get_peer_id(target),
+                lambda target=target: send(target),
+                kind=kind,
+                messages=count,
+                label=job.describe()
+            ))
+        
+        # Отметку «в обработке» снимет _finish_publish, когда отправки завершатся
+        key, job.key = job.key, None
+        task = asyncio.create_task(self._finish_publish(job, key, futures))
+        self._publish_tasks.add(task)
+        task.add_done_callback(self._publish_tasks.discard)
+        return job
+    
+    async def _finish_publish(self, job: PostJob, key: Optional[str], futures: list):
+        """Ожидание отправок во все цели и запись результата в индекс"""
+        try:
+            results = await asyncio.gather(*futures, return_exceptions=True)
             
-            if len(messages) > 1:
-                logger.info(f"✅ Альбом успешно скопирован ({len(messages)} медиа)")
-            else:
-                logger.info(f"✅ Пост ID {first_msg.id} успешно скопирован")
+            errors = []
+            for result in results:
+                if isinstance(result, BaseException):
+                    errors.append(result)
+                elif result is not None:
+                    sent_messages = result if isinstance(result, list) else [result]
+                    job.target_ids.extend(m.id for m in sent_messages)
             
-        except Exception as e:
-            logger.error(f"❌ Ошибка при обработке группы: {e}", exc_info=True)
+            # Запоминаем отправленное (повторная доставка этих сообщений будет пропущена).
+            # Если не ушло ни в одну цель — не записываем, пост можно будет повторить
+            if job.target_ids:
+                self._record_published(job)
+            
+            for error in errors:
+                if not isinstance(error, asyncio.CancelledError):
+                    logger.error(f"❌ Ошибка при отправке ({job.describe()}): {error}")
+            if errors:
+                self.metrics.inc('posts_failed')
+            
+            if job.target_ids:
+                elapsed = time.monotonic() - job.created_at
+                logger.info(f"✅ Успешно скопирован: {job.describe()} за {elapsed:.1f}с")
+                self.metrics.inc('posts_published')
+        finally:
+            if key:
+                self._in_progress.discard(key)
     
-    async def _copy_single_photo(self, photo_bytes: bytes, text: str):
-        """Копирование одного изображения с подписью"""
+    def _record_published(self, job: PostJob):
+        self.message_index.record(
+            job.route.index_scope(job.first_msg.chat_id), job.messages, job.target_ids, job.content_hash
+        )
+    
+    async def _with_reference_fallback(self, job: PostJob, send):
+        """
+        Отправка с откатом для фото по ссылке на оригинал
+        
+        Устаревший file reference: сообщения источника запрашиваются заново, свежие
+        ссылки (Telegram Photo) заменяются в job.media — чтобы следующие цели их
+        переиспользовали — и отправка повторяется по ссылке. Скачиваются фото только
+        при запрете пересылки в источнике: тогда отправка идет файлами.
+        """
         try:
-            logger.info("📤 Отправка изображения...")
+            return await send()
+        except REFERENCE_ERRORS as e:
+            error = e
+            if not isinstance(error, ChatForwardsRestrictedError):
+                if not await self._refresh_references(job, error):
+                    raise
+                try:
+                    return await send()
+                except ChatForwardsRestrictedError as retry_error:
+                    error = retry_error
             
+            pending = [idx for idx, item in enumerate(job.media) if not isinstance(item, bytes)]
+            if not pending:
+                raise error
+            logger.warning(f"⚠️ Источник запрещает пересылку ({error.__class__.__name__}), отправляем файлами")
+            self.metrics.inc('reference_fallbacks')
+            self._no_reference_sources.add(job.first_msg.chat_id)
+            for idx in pending:
+                async with self._download_slots:
+                    job.media[idx] = await self.client.download_media(job.media[idx], bytes)
+            return await send()
+    
+    async def _refresh_references(self, job: PostJob, error: Exception) -> bool:
+        """
+        Свежие ссылки на фото из заново запрошенных сообщений источника
+        
+        Returns:
+            False, если в job.media нет фото по ссылке (обновлять нечего)
+        """
+        pending = [idx for idx, item in enumerate(job.media) if not isinstance(item, bytes)]
+        if not pending:
+            return False
+        logger.warning(f"⚠️ Telegram не принял фото по ссылке ({error.__class__.__name__}), обновляем ссылки")
+        self.metrics.inc('reference_refreshes')
+        
+        fresh = await self.client.get_messages(job.first_msg.chat_id, ids=[job.photo_ids[idx] for idx in pending])
+        for idx, msg in zip(pending, fresh):
+            photo = getattr(msg, 'photo', None)
+            if photo is None:
+                raise RuntimeError(f"Сообщение ID {job.photo_ids[idx]} больше не содержит фото") from error
+            job.media[idx] = photo
+        return True
+    
+    async def _upload_file(self, photo, stem: str = "photo", key=None):
+        """
+        Файл для send_file: хендл загрузки из кеша (по ключу) или новая загрузка
+        
+        Telegram Photo (отправка по ссылке) возвращается как есть. Хендл переиспользуется
+        всеми целями и повторами после FloodWait — мегабайты не грузятся заново.
+        """
+        if not isinstance(photo, bytes):
+            return photo
+        
+        async def upload():
             # Создаем BytesIO с правильным именем файла и расширением
-            bio = BytesIO(photo_bytes)
-            bio.name = "photo.jpg"  # ВАЖНО: добавляем имя с расширением!
+            bio = BytesIO(photo)
+            bio.name = image_filename(photo, stem)  # ВАЖНО: имя с расширением по формату!
             bio.seek(0)  # Позиционируемся в начало
-            
-            await self.client.send_file(
-                self.target_entity,
-                bio,
+            return await self.client.upload_file(bio)
+        
+        if key is None:
+            return await upload()
+        return await self.uploads.get_or_upload(key, upload)
+    
+    async def _send_uploaded(self, send, keys: list):
+        """send() с одной повторной загрузкой, если хендл из кеша истек"""
+        try:
+            return await send()
+        except UPLOAD_EXPIRED_ERRORS as e:
+            logger.warning(f"⚠️ Загруженный файл истек ({e.__class__.__name__}), загружаем заново")
+            self.metrics.inc('upload_cache_expired')
+            self.uploads.discard(key for key in keys if key is not None)
+            return await send()
+    
+    async def _copy_single_photo(self, target, photo, text: str, key=None):
+        """Копирование одного изображения с подписью (повторы — в publish_lanes)"""
+        logger.info("📤 Отправка изображения...")
+        
+        async def send():
+            return await self.client.send_file(
+                target,
+                await self._upload_file(photo, key=key),
                 caption=text if text else None
             )
-            
-        except FloodWaitError as e:
-            logger.warning(f"⏳ Flood wait: ожидание {e.seconds} секунд")
-            await asyncio.sleep(e.seconds)
-            await self._copy_single_photo(photo_bytes, text)  # Retry
-        except Exception as e:
-            logger.error(f"❌ Ошибка при отправке изображения: {e}", exc_info=True)
-            raise
+        
+        return await self._send_uploaded(send, [key])
     
-    async def _copy_media_album(self, media_list: list, text: str):
+    async def _copy_media_album(self, target, media_list: list, text: str, keys: Optional[list] = None):
         """
-        Копирование альбома (несколько изображений одним сообщением)
+        Копирование альбома (несколько изображений одним сообщением, повторы — в publish_lanes)
         
         Args:
-            media_list: List[bytes] - список байтов изображений
+            target: Целевой канал
+            media_list: список байтов изображений или Telegram Photo (отправка по ссылке)
             text: str - подпись к альбому
+            keys: ключи кеша загрузок для media_list (None — без кеша)
         """
-        try:
-            logger.info(f"📤 Отправка альбома ({len(media_list)} изображений)...")
-            
-            # Подготавливаем файлы с правильными именами и расширениями
-            files = []
-            for idx, photo_bytes in enumerate(media_list):
-                bio = BytesIO(photo_bytes)
-                bio.name = f"photo_{idx + 1}.jpg"  # ВАЖНО: имя с расширением!
-                bio.seek(0)  # Позиционируемся в начало
-                files.append(bio)
+        logger.info(f"📤 Отправка альбома ({len(media_list)} изображений)...")
+        keys = keys or [None] * len(media_list)
+        
+        async def send():
+            # Загружаем файлы (или берем хендлы из кеша) параллельно, с именами по формату
+            files = await asyncio.gather(*(
+                self._upload_file(photo, f"photo_{idx + 1}", key)
+                for idx, (photo, key) in enumerate(zip(media_list, keys))
+            ))
             
             # Отправляем как альбом (один вызов send_file с массивом)
-            await self.client.send_file(
-                self.target_entity,
-                files,
+            return await self.client.send_file(
+                target,
+                list(files),
                 caption=text if text else None
             )
-            
-            logger.info(f"✅ Альбом отправлен ({len(media_list)} фото)")
-            
-        except FloodWaitError as e:
-            logger.warning(f"⏳ Flood wait: ожидание {e.seconds} секунд")
-            await asyncio.sleep(e.seconds)
-            await self._copy_media_album(media_list, text)  # Retry
-        except Exception as e:
-            logger.error(f"❌ Ошибка при отправке альбома: {e}", exc_info=True)
-            raise
+        
+        sent = await self._send_uploaded(send, keys)
+        
+        logger.info(f"✅ Альбом отправлен ({len(media_list)} фото)")
+        return sent
     
-    async def _copy_text_message(self, text: str):
-        """Копирование текстового сообщения"""
-        try:
-            if not text or len(text.strip()) < 3:
-                logger.warning("⚠️ Текст слишком короткий, пропускаем")
-                return
-            
-            logger.info("📤 Отправка текста...")
-            
-            await self.client.send_message(self.target_entity, text)
-            
-        except FloodWaitError as e:
-            logger.warning(f"⏳ Flood wait: ожидание {e.seconds} секунд")
-            await asyncio.sleep(e.seconds)
-            await self._copy_text_message(text)  # Retry
-        except Exception as e:
-            logger.error(f"❌ Ошибка при отправке текста: {e}", exc_info=True)
-            raise
+    async def _copy_text_message(self, target, text: str):
+        """Копирование текстового сообщения (повторы — в publish_lanes)"""
+        logger.info("📤 Отправка текста...")
+        return await self.client.send_message(target, text)
     
     async def run_forever(self):
         """Запуск event-based мониторинга (работает бесконечно)"""
@@ -355,10 +954,29 @@ class TelegramPostCopier:
         logger.info("🛑 Остановка TelegramPostCopier...")
         self.is_running = False
         
-        # Отменяем все активные таймеры
-        for timer in self.group_timers.values():
-            timer.cancel()
+        # Отменяем все активные таймеры и предзагрузку
+        self.albums.cancel_all()
+        self.uploads.clear()
+        for task in self._prefetched.values():
+            task.cancel()
+        self._prefetched.clear()
+        if self._metrics_task:
+            self._metrics_task.cancel()
+        for task in (self._catchup_task, self._gap_task):
+            if task:
+                task.cancel()
+        self._catchup_done.set()
+        
+        # Даем пайплайну дообработать уже принятые посты
+        await self.pipeline.stop(drain_timeout=Config.PIPELINE_DRAIN_TIMEOUT)
+        # ...и отправить уже поставленное в очереди целевых каналов
+        await self.publish_lanes.stop(drain_timeout=Config.PIPELINE_DRAIN_TIMEOUT)
+        if self._publish_tasks:
+            await asyncio.gather(*self._publish_tasks, return_exceptions=True)
         
+        await self.llm_client.aclose()
+        self.image_processor.shutdown()
+        self.metrics.log_summary()
         await self.client.disconnect()
         logger.info("👋 Отключено от Telegram")
 
@@ -371,8 +989,11 @@ async def main():
     logger.info("=" * 60)
     logger.info(f"📅 Запуск: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info(f"🤖 LLM Provider: {Config.LLM_PROVIDER}")
-    logger.info(f"📡 Source: {Config.SOURCE_CHANNEL}")
-    logger.info(f"📢 Target: {Config.TARGET_CHANNEL}")
+    if Config.ROUTES or Config.ROUTES_FILE:
+        logger.info(f"🧭 Routes: {'ROUTES' if Config.ROUTES else Config.ROUTES_FILE}")
+    else:
+        logger.info(f"📡 Source: {Config.SOURCE_CHANNEL}")
+        logger.info(f"📢 Target: {Config.TARGET_CHANNEL}")
     logger.info("=" * 60)
     
     copier = TelegramPostCopier()
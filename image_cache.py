@@ -0,0 +1,299 @@
+"""
+🧬 Image Cache - Кеш обработанных изображений по перцептивному хешу (dHash)
+Повторяющиеся баннеры и скриншоты не проходят OCR заново
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils import calculate_text_hash
+
+logger = logging.getLogger(__name__)
+
+
+def dhash_from_gray(gray: np.ndarray) -> int:
+    """
+    64-битный difference hash: сравнение соседних пикселей уменьшенного изображения 9x8
+    
+    Args:
+        gray: Изображение в оттенках серого (любого размера)
+    
+    Returns:
+        Хеш как int (0..2^64-1)
+    """
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), 'big')
+
+
+def compute_dhash(image_bytes: bytes) -> Optional[int]:
+    """dHash прямо из байтов (JPEG декодируется сразу в 1/4 размера — быстро)"""
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    gray = cv2.imdecode(nparr, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        return None
+    return dhash_from_gray(gray)
+
+
+def scale_links(links: List[Dict[str, Any]], from_size: Tuple[int, int], to_size: Tuple[int, int]) -> List[Dict[str, Any]]:
+    """Пересчет координат найденных ссылок на другой размер изображения"""
+    if tuple(from_size) == tuple(to_size):
+        return [dict(link) for link in links]
+    
+    sx = to_size[0] / from_size[0]
+    sy = to_size[1] / from_size[1]
+    return [
+        {
+            'text': link['text'],
+            'x': int(round(link['x'] * sx)),
+            'y': int(round(link['y'] * sy)),
+            'w': int(round(link['w'] * sx)),
+            'h': int(round(link['h'] * sy)),
+        }
+        for link in links
+    ]
+
+
+class ImageHashCache:
+    """
+    Индекс near-duplicate изображений
+    
+    Хеши хранятся в NumPy массиве uint64, поиск — векторный XOR + popcount
+    по всему индексу. Для каждого хеша запоминаются найденные OCR боксы,
+    sha256 исходных байтов и (если изображение менялось) готовые результаты
+    на диске — по одному на подставленную ссылку, чтобы маршруты одного
+    источника с разными ссылками не вытесняли друг друга. Результат отдается
+    только для побайтно того же исходника.
+    
+    store() меняет только память; файлы результатов и index.json пишет
+    flush() — его вызывают вне event loop (в потоке) и при остановке.
+    """
+    
+    def __init__(self, directory: str, signature: str, max_distance: int = 4, max_entries: int = 1000):
+        self.directory = directory
+        self.signature = calculate_text_hash(signature)[:16]
+        self.max_distance = max_distance
+        self.max_entries = max(1, max_entries)
+        self.index_path = os.path.join(directory, 'index.json')
+        
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()  # память индекса (event loop и поток flush)
+        self._flush_lock = threading.Lock()  # flush выполняется по одному
+        self._pending_outputs: Dict[str, bytes] = {}  # файл → байты, еще не записанные на диск
+        self._pending_removals: List[str] = []
+        self._dirty = False
+        
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+    
+    def lookup(self, image_hash: int) -> Optional[Tuple[Dict[str, Any], int]]:
+        """
+        Ближайшая запись в пределах max_distance бит
+        
+        Returns:
+            (запись, расстояние Хэмминга) или None
+        """
+        with self._lock:
+            if not self._entries:
+                return None
+            
+            xor = self._hashes ^ np.uint64(image_hash)
+            distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+            best = int(np.argmin(distances))
+            distance = int(distances[best])
+            if distance > self.max_distance:
+                return None
+            
+            entry = self._entries[best]
+            entry['last_hit'] = time.time()
+            return entry, distance
+    
+    def read_output(self, entry: Dict[str, Any], link: str) -> Optional[bytes]:
+        """Готовый результат обработки для ссылки link (None, если его нет или файл пропал)"""
+        with self._lock:
+            file_name = entry.get('outputs', {}).get(link)
+            if not file_name:
+                return None
+            pending = self._pending_outputs.get(file_name)
+        if pending is not None:
+            return pending
+        try:
+            with open(os.path.join(self.directory, file_name), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def store(
+        self,
+        image_hash: int,
+        digest: str,
+        size: Tuple[int, int],
+        links: List[Dict[str, Any]],
+        output_bytes: Optional[bytes],
+        link: Optional[str] = None
+    ):
+        """
+        Запоминает результат обработки (только в памяти, на диск — flush)
+        
+        Args:
+            image_hash: dHash исходного изображения
+            digest: sha256 исходных байтов (готовый результат — только для них)
+            size: (ширина, высота) исходного изображения
+            links: Найденные OCR боксы ссылок
+            output_bytes: Результат, если изображение было изменено
+            link: Подставленная ссылка (готовый результат годится только для нее)
+        """
+        hash_hex = f"{image_hash:016x}"
+        file_name = None
+        if output_bytes is not None and link:
+            file_name = f"{digest[:32]}_{calculate_text_hash(link)[:8]}.bin"
+        
+        entry = {
+            'hash': hash_hex,
+            'sha256': digest,
+            'size': list(size),
+            'links': links,
+            'outputs': {},  # ссылка → файл результата
+            'created_at': time.time(),
+            'last_hit': time.time(),
+        }
+        
+        with self._lock:
+            # Тот же хеш перезаписываем, иначе добавляем. Результаты для других
+            # ссылок сохраняются, только если исходник тот же
+            existing = [i for i, e in enumerate(self._entries) if e['hash'] == hash_hex]
+            if existing:
+                old = self._entries[existing[0]]
+                for old_link, old_file in old.get('outputs', {}).items():
+                    if old.get('sha256') == digest and old_link != link:
+                        entry['outputs'][old_link] = old_file
+                    elif old_file != file_name:
+                        self._forget_file(old_file)
+            
+            if file_name is not None:
+                entry['outputs'][link] = file_name
+                self._pending_outputs[file_name] = output_bytes
+                if file_name in self._pending_removals:
+                    self._pending_removals.remove(file_name)
+            
+            if existing:
+                self._entries[existing[0]] = entry
+            else:
+                self._entries.append(entry)
+                self._hashes = np.append(self._hashes, np.uint64(image_hash))
+            
+            self._evict()
+            self._dirty = True
+    
+    @property
+    def has_pending(self) -> bool:
+        """Есть изменения, еще не записанные на диск"""
+        return self._dirty
+    
+    def flush(self):
+        """Запись новых результатов и индекса на диск (блокирующая: вызывать вне event loop)"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                outputs = dict(self._pending_outputs)  # остаются доступны read_output до записи
+                removals, self._pending_removals = self._pending_removals, []
+                payload = json.dumps({'signature': self.signature, 'entries': self._entries}, ensure_ascii=False)
+                self._dirty = False
+            
+            for file_name in removals:
+                self._remove_file(file_name)
+            for file_name, data in outputs.items():
+                try:
+                    with open(os.path.join(self.directory, file_name), 'wb') as f:
+                        f.write(data)
+                except OSError as e:
+                    logger.warning(f"⚠️ Не удалось сохранить результат в кеш изображений: {e}")
+            self._save(payload)
+            
+            with self._lock:
+                for file_name, data in outputs.items():
+                    if self._pending_outputs.get(file_name) is data:
+                        del self._pending_outputs[file_name]
+    
+    def _evict(self):
+        """LRU-вытеснение по last_hit сверх max_entries (под self._lock)"""
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        
+        order = sorted(range(len(self._entries)), key=lambda i: self._entries[i]['last_hit'])
+        drop = set(order[:excess])
+        for i in drop:
+            for file_name in self._entry_files(self._entries[i]):
+                self._forget_file(file_name)
+        
+        keep = [i for i in range(len(self._entries)) if i not in drop]
+        self._entries = [self._entries[i] for i in keep]
+        self._hashes = self._hashes[keep]
+    
+    def _forget_file(self, file_name: str):
+        """Файл результата больше не нужен: не записывать, а записанный — удалить при flush"""
+        self._pending_outputs.pop(file_name, None)
+        if file_name not in self._pending_removals:
+            self._pending_removals.append(file_name)
+    
+    @staticmethod
+    def _entry_files(entry: Dict[str, Any]) -> List[str]:
+        """Файлы результатов записи (включая формат до результатов по ссылкам: 'file')"""
+        files = list(entry.get('outputs', {}).values())
+        if entry.get('file'):
+            files.append(entry['file'])
+        return files
+    
+    def _remove_file(self, file_name: str):
+        try:
+            os.remove(os.path.join(self.directory, file_name))
+        except OSError:
+            pass
+    
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('signature') != self.signature:
+                # Сменился паттерн ссылок/язык OCR: старые боксы недействительны
+                logger.info("🧬 Кеш изображений сброшен (изменились настройки OCR)")
+                for entry in data.get('entries', []):
+                    for file_name in self._entry_files(entry):
+                        self._remove_file(file_name)
+                return
+            self._entries = data.get('entries', [])
+            for entry in self._entries:
+                if 'outputs' not in entry:
+                    # Формат с одним результатом на хеш: переносим его под свою ссылку
+                    file_name, link = entry.pop('file', None), entry.pop('link', None)
+                    entry['outputs'] = {link: file_name} if file_name and link else {}
+                    self._dirty = True
+                    if file_name and not link:
+                        self._pending_removals.append(file_name)
+            self._hashes = np.array([int(e['hash'], 16) for e in self._entries], dtype=np.uint64)
+            logger.info(f"🧬 Кеш изображений: загружено {len(self._entries)} записей")
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить кеш изображений: {e}")
+            self._entries = []
+            self._hashes = np.zeros(0, dtype=np.uint64)
+    
+    def _save(self, payload: str):
+        try:
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось сохранить кеш изображений: {e}")
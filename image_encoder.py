@@ -0,0 +1,121 @@
+"""
+💾 Image Encoder - Кодирование обработанного изображения в формат и качество источника
+JPEG остается JPEG с качеством, оцененным по таблицам квантования исходника, вместо PNG на мегабайты
+"""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils import detect_image_format
+
+# Стандартная таблица квантования яркости JPEG (ITU T.81, Annex K), в порядке zigzag
+_STD_LUMINANCE_ZIGZAG = (
+    16, 11, 12, 14, 12, 10, 16, 14, 13, 14, 18, 17, 16, 19, 24, 40,
+    26, 24, 22, 22, 24, 49, 35, 37, 29, 40, 58, 51, 61, 60, 57, 51,
+    56, 55, 64, 72, 92, 78, 64, 68, 87, 69, 55, 56, 80, 109, 81, 87,
+    95, 98, 103, 104, 103, 62, 77, 113, 121, 112, 100, 120, 92, 101, 103, 99,
+)
+
+
+def _luminance_table(data: bytes) -> Optional[Tuple[int, ...]]:
+    """Таблица квантования яркости (id 0) из сегментов DQT, в порядке zigzag, как записана в файле"""
+    pos = 2  # после SOI
+    length = len(data)
+    while pos + 4 <= length:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # заполняющие байты
+            pos += 1
+            continue
+        if marker == 0xDA or marker == 0xD9:  # SOS / EOI — дальше сжатые данные
+            return None
+        segment_length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        segment_end = pos + 2 + segment_length
+        
+        if marker == 0xDB:
+            offset = pos + 4
+            while offset < segment_end:
+                precision, table_id = data[offset] >> 4, data[offset] & 0x0F
+                size = 128 if precision else 64
+                values = data[offset + 1:offset + 1 + size]
+                if precision:
+                    table = tuple(int.from_bytes(values[i:i + 2], 'big') for i in range(0, 128, 2))
+                else:
+                    table = tuple(values)
+                if table_id == 0 and len(table) == 64:
+                    return table
+                offset += 1 + size
+        
+        pos = segment_end
+    return None
+
+
+def estimate_jpeg_quality(data: bytes) -> Optional[int]:
+    """
+    Качество JPEG (1..100 по шкале libjpeg/IJG), которым был сохранен файл
+    
+    Таблица квантования яркости сравнивается со стандартной: libjpeg масштабирует
+    ее коэффициентом 5000/q (q < 50) или 200 - 2q (q >= 50), в процентах.
+    
+    Returns:
+        Оценка качества или None (не JPEG / нет DQT)
+    """
+    if detect_image_format(data) != 'jpeg':
+        return None
+    table = _luminance_table(data)
+    if table is None:
+        return None
+    
+    scale = sum(q * 100.0 / std for q, std in zip(table, _STD_LUMINANCE_ZIGZAG)) / 64.0
+    if scale <= 0:
+        return None
+    quality = (200.0 - scale) / 2.0 if scale <= 100.0 else 5000.0 / scale
+    return int(min(100, max(1, round(quality))))
+
+
+def limit_size(img: np.ndarray, max_side: int) -> np.ndarray:
+    """Уменьшение до max_side по большей стороне (0 — без ограничения)"""
+    height, width = img.shape[:2]
+    if max_side <= 0 or max(height, width) <= max_side:
+        return img
+    scale = max_side / float(max(height, width))
+    return cv2.resize(img, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+
+
+def encode_like_source(
+    img: np.ndarray,
+    source: bytes,
+    max_side: int = 0,
+    default_quality: int = 87
+) -> Tuple[Optional[bytes], str]:
+    """
+    Кодирование изображения в формат исходника
+    
+    JPEG — с качеством исходника (по таблицам квантования), PNG остается PNG,
+    остальное (WebP, GIF...) — JPEG, т.к. Telegram все равно пережимает фото в JPEG.
+    
+    Args:
+        img: Обработанное изображение (BGR)
+        source: Байты исходного изображения
+        max_side: Ограничение большей стороны в пикселях (0 — без ограничения)
+        default_quality: Качество JPEG, если оценить не удалось
+    
+    Returns:
+        (байты или None при ошибке кодирования, описание для лога)
+    """
+    img = limit_size(img, max_side)
+    
+    if detect_image_format(source) == 'png':
+        success, buffer = cv2.imencode('.png', img, [cv2.IMWRITE_PNG_COMPRESSION, 3])
+        description = 'png'
+    else:
+        quality = estimate_jpeg_quality(source) or default_quality
+        success, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        description = f"jpeg q={quality}"
+    
+    if not success:
+        return None, description
+    return buffer.tobytes(), description
@@ -3,18 +3,128 @@
 Работа с изображениями из постов Telegram
 """
 
+import asyncio
+import difflib
+import functools
+import hashlib
+import multiprocessing
+import os
+import time
 import cv2
-import pytesseract
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
 import re
 import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional, Tuple
 from config import Config
+from image_cache import ImageHashCache, compute_dhash, scale_links
+from text_regions import find_text_regions, merge_boxes, region_coverage
+from ocr_backend import get_ocr_backend
+from image_encoder import encode_like_source
+from metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 
+# Быстрый проход two_pass: разреженный текст, только символы, из которых состоят ссылки
+# (включая _ в username и ?=&%#+~ в параметрах URL)
+FAST_OCR_CONFIG = (
+    '--psm 11 -c tessedit_char_whitelist='
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._/:-@?=&%#+~'
+)
+# Радиус inpaint (cv2.INPAINT_TELEA): от него зависит, сколько окрестности нужно вокруг ссылки
+INPAINT_RADIUS = 3
+LINK_LIKE = re.compile(r'[./]\S{2,}|\S{2,}[./]')
+
+
+def _init_worker():
+    """Инициализация воркера пула: создаем обработчик заранее (проверка Tesseract один раз)"""
+    get_image_processor()
+
+
+@functools.lru_cache(maxsize=64)
+def load_font(font_size: int):
+    """Шрифт нужного размера (первый доступный из системных, иначе встроенный); загружается один раз на размер"""
+    try:
+        # Попытка использовать разные шрифты
+        font_paths = [
+            '/System/Library/Fonts/Helvetica.ttc',  # macOS
+            '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',  # Linux
+            'C:\\Windows\\Fonts\\arial.ttf',  # Windows
+            '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf'  # Linux alt
+        ]
+        
+        for font_path in font_paths:
+            try:
+                return ImageFont.truetype(font_path, font_size)
+            except OSError:
+                continue
+        
+    except Exception as e:
+        logger.warning(f"Не удалось загрузить шрифт: {e}")
+    return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=128)
+def render_text_sprite(text: str, font_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Надпись с обводкой, отрендеренная один раз (белый текст, черная обводка 1px)
+    
+    Рендер идет в RGBA-холст; в кеше лежит готовое к наложению представление:
+    (цвет BGR, умноженный на альфу, float32 HxWx3; 1 - альфа, float32 HxWx1).
+    Точка (0, 0) спрайта соответствует (x - 1, y - 1) для draw.text((x, y)).
+    """
+    font = load_font(font_size)
+    left, top, right, bottom = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((1, 1), text, font=font)
+    # Текст рисуется со смещением (1, 1), обводка выходит за него еще на 1px со всех сторон
+    canvas = Image.new('RGBA', (max(1, right + 2), max(1, bottom + 2)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(canvas)
+    
+    # Обводка
+    for offset_x in [-1, 0, 1]:
+        for offset_y in [-1, 0, 1]:
+            draw.text((1 + offset_x, 1 + offset_y), text, fill=(0, 0, 0, 255), font=font)
+    
+    # Основной текст
+    draw.text((1, 1), text, fill=(255, 255, 255, 255), font=font)
+    
+    rgba = np.asarray(canvas, dtype=np.float32) / 255.0
+    alpha = rgba[:, :, 3:4]
+    premultiplied = rgba[:, :, 2::-1] * alpha * 255.0  # RGB → BGR
+    inverse_alpha = 1.0 - alpha
+    premultiplied.setflags(write=False)
+    inverse_alpha.setflags(write=False)
+    return premultiplied, inverse_alpha
+
+
+def blend_sprite(img: np.ndarray, sprite: Tuple[np.ndarray, np.ndarray], x: int, y: int):
+    """Наложение спрайта на BGR изображение на месте (с обрезкой по краям изображения)"""
+    premultiplied, inverse_alpha = sprite
+    height, width = img.shape[:2]
+    x1, y1 = max(0, x), max(0, y)
+    x2, y2 = min(width, x + premultiplied.shape[1]), min(height, y + premultiplied.shape[0])
+    if x1 >= x2 or y1 >= y2:
+        return
+    
+    sy, sx = slice(y1 - y, y2 - y), slice(x1 - x, x2 - x)
+    roi = img[y1:y2, x1:x2]
+    roi[:] = np.clip(roi * inverse_alpha[sy, sx] + premultiplied[sy, sx] + 0.5, 0, 255).astype(np.uint8)
+
+
+def _process_image_in_worker(
+    image_bytes: bytes,
+    known: Optional[tuple] = None,
+    new_link: Optional[str] = None
+) -> Tuple[bytes, bool, list, Optional[Tuple[int, int]]]:
+    """Точка входа для воркера пула (на уровне модуля, чтобы сериализоваться через pickle)"""
+    return get_image_processor()._process(image_bytes, known, new_link)
+
+
+def _needs_processing_in_worker(image_bytes: bytes) -> bool:
+    return get_image_processor().needs_processing(image_bytes)
+
 
 class ImageProcessor:
     """Обработчик изображений для замены текста/ссылок"""
@@ -23,36 +133,65 @@ class ImageProcessor:
         self.old_link_pattern = Config.OLD_LINK_PATTERN
         self.new_link = Config.YOUR_LINK
         self.ocr_language = Config.OCR_LANGUAGE
+        self.ocr_strategy = Config.OCR_STRATEGY
+        self._link_hints = [alt.replace('\\', '').lower() for alt in self.old_link_pattern.split('|') if alt]
         
-        # Настройка Tesseract (путь может отличаться)
-        try:
-            pytesseract.get_tesseract_version()
-        except Exception:
-            # Попытка установить стандартные пути
-            possible_paths = [
-                '/usr/bin/tesseract',
-                '/usr/local/bin/tesseract',
-                'C:\\Program Files\\Tesseract-OCR\\tesseract.exe',
-                '/opt/homebrew/bin/tesseract'
-            ]
-            for path in possible_paths:
-                try:
-                    pytesseract.pytesseract.tesseract_cmd = path
-                    pytesseract.get_tesseract_version()
-                    break
-                except:
-                    continue
+        # Пул исполнения (создается лениво при первом process_image_async)
+        self.executor_mode = Config.IMAGE_EXECUTOR
+        self.max_workers = max(1, Config.IMAGE_WORKERS)
+        self.queue_size = max(0, Config.IMAGE_QUEUE_SIZE)
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        
+        # Кеш по перцептивному хешу (создается лениво в основном процессе)
+        self._hash_cache: Optional[ImageHashCache] = None
+        self._cache_flush: Optional[asyncio.Future] = None  # запись кеша на диск в потоке
+        self.metrics = get_metrics()
+        
+        # OCR бэкенд (OCR_BACKEND: tesserocr держит модели загруженными в процессе)
+        self.ocr = get_ocr_backend()
     
-    def process_image(self, image_bytes: bytes) -> Tuple[bytes, bool]:
+    def process_image(self, image_bytes: bytes, new_link: Optional[str] = None) -> Tuple[bytes, bool]:
         """
         Обрабатывает изображение: ищет старые ссылки и заменяет на новые
         
         Args:
             image_bytes: Байты изображения
+            new_link: Ссылка для подстановки (по умолчанию YOUR_LINK; задается маршрутом)
             
         Returns:
             Tuple[bytes, bool]: (обработанное изображение, был ли изменен)
         """
+        new_link = new_link or self.new_link
+        image_key, cached, known = self._cache_lookup(image_bytes, new_link)
+        if cached is not None:
+            return cached
+        
+        output, was_modified, links, size = self._process(image_bytes, known, new_link)
+        self._cache_store(image_key, size, links, output if was_modified else None, new_link)
+        if self._hash_cache is not None:
+            self._hash_cache.flush()
+        self._count_bytes(image_bytes, output, was_modified)
+        return output, was_modified
+    
+    def _process(
+        self,
+        image_bytes: bytes,
+        known: Optional[Tuple[list, Tuple[int, int]]] = None,
+        new_link: Optional[str] = None
+    ) -> Tuple[bytes, bool, list, Optional[Tuple[int, int]]]:
+        """
+        Полная обработка (OCR + замена)
+        
+        Args:
+            image_bytes: Байты изображения
+            known: (боксы ссылок, размер) из кеша похожего изображения — OCR пропускается
+            new_link: Ссылка для подстановки (по умолчанию YOUR_LINK)
+            
+        Returns:
+            (результат, был ли изменен, найденные ссылки, (ширина, высота) или None при ошибке)
+        """
         try:
             # Конвертация в OpenCV формат
             nparr = np.frombuffer(image_bytes, np.uint8)
@@ -60,34 +199,295 @@ class ImageProcessor:
             
             if img is None:
                 logger.error("Не удалось декодировать изображение")
-                return image_bytes, False
+                return image_bytes, False, [], None
             
-            # Поиск текста на изображении
-            found_links = self._find_links_in_image(img)
+            size = (img.shape[1], img.shape[0])
+            
+            # Поиск текста на изображении (или боксы похожего изображения из кеша)
+            if known is not None:
+                found_links = scale_links(known[0], known[1], size)
+            else:
+                found_links = self._find_links_in_image(img)
             
             if not found_links:
                 logger.info("Ссылки не найдены на изображении")
-                return image_bytes, False
+                return image_bytes, False, [], size
             
             # Замена найденных ссылок
-            modified_img = self._replace_links_in_image(img, found_links)
+            modified_img = self._replace_links_in_image(img, found_links, new_link or self.new_link)
             
-            # Конвертация обратно в байты
-            success, buffer = cv2.imencode('.png', modified_img)
-            if not success:
+            # Конвертация обратно в байты: формат и качество исходника (не PNG на мегабайты)
+            output, encoding = encode_like_source(
+                modified_img, image_bytes, Config.IMAGE_MAX_SIDE, Config.JPEG_DEFAULT_QUALITY
+            )
+            if output is None:
                 logger.error("Не удалось закодировать изображение")
-                return image_bytes, False
+                return image_bytes, False, [], None
             
-            return buffer.tobytes(), True
+            logger.info(f"💾 Кодирование ({encoding}): {len(image_bytes) // 1024} KB → {len(output) // 1024} KB")
+            return output, True, found_links, size
             
         except Exception as e:
             logger.error(f"Ошибка при обработке изображения: {e}")
+            return image_bytes, False, [], None
+    
+    async def process_image_async(self, image_bytes: bytes, new_link: Optional[str] = None) -> Tuple[bytes, bool]:
+        """
+        Асинхронная обработка изображения в пуле воркеров (не блокирует event loop)
+        
+        Одновременно в пуле находится не больше IMAGE_WORKERS + IMAGE_QUEUE_SIZE задач,
+        остальные вызовы ждут свободного слота (backpressure).
+        
+        Args:
+            image_bytes: Байты изображения
+            new_link: Ссылка для подстановки (по умолчанию YOUR_LINK; задается маршрутом)
+            
+        Returns:
+            Tuple[bytes, bool]: (обработанное изображение, был ли изменен)
+        """
+        new_link = new_link or self.new_link
+        # dHash, sha256 и чтение готового результата — в потоке, не в event loop
+        # (кеш создается здесь, чтобы поток не создал его повторно)
+        if self._get_hash_cache() is not None:
+            image_key, cached, known = await asyncio.to_thread(self._cache_lookup, image_bytes, new_link)
+        else:
+            image_key, cached, known = None, None, None
+        if cached is not None:
+            return cached
+        
+        try:
+            result = await self._run_in_pool(_process_image_in_worker, image_bytes, known, new_link)
+        except BrokenProcessPool:
             return image_bytes, False
+        
+        output, was_modified, links, size = result
+        self._cache_store(image_key, size, links, output if was_modified else None, new_link)
+        self._schedule_cache_flush()
+        self._count_bytes(image_bytes, output, was_modified)
+        return output, was_modified
     
-    def _find_links_in_image(self, img: np.ndarray) -> list:
+    def needs_processing(self, image_bytes: bytes) -> bool:
+        """
+        Дешевая проверка по превью: может ли на изображении быть старая ссылка
+        
+        Только быстрый проход OCR (см. _scan_for_link_areas). Ошибка или
+        нечитаемое превью — True: лучше лишний раз обработать оригинал.
+        """
+        try:
+            gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                return True
+            return bool(self._scan_for_link_areas(gray))
+        except Exception as e:
+            logger.error(f"Ошибка быстрой проверки изображения: {e}")
+            return True
+    
+    async def needs_processing_async(self, image_bytes: bytes) -> bool:
+        """needs_processing в пуле воркеров"""
+        try:
+            return await self._run_in_pool(_needs_processing_in_worker, image_bytes)
+        except BrokenProcessPool:
+            return True
+    
+    async def _run_in_pool(self, fn, *args):
+        """
+        Выполнение fn(*args) в пуле (или inline)
+        
+        Одновременно в пуле не больше IMAGE_WORKERS + IMAGE_QUEUE_SIZE задач.
+        Упавший пул пересоздается, а BrokenProcessPool пробрасывается вызывающему.
+        """
+        if self.executor_mode == 'inline':
+            return fn(*args)
+        
+        slots = self._get_slots()
+        if slots.locked():
+            logger.info(f"⏳ Пул обработки изображений занят ({self._in_flight} задач), ожидание слота...")
+        
+        async with slots:
+            self._in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_executor(), fn, *args)
+            except BrokenProcessPool as e:
+                logger.error(f"❌ Пул обработки изображений упал, пересоздаем: {e}")
+                self._reset_executor()
+                raise
+            finally:
+                self._in_flight -= 1
+    
+    def _count_bytes(self, image_bytes: bytes, output: bytes, was_modified: bool):
+        """Размер до/после перекодирования (метрики считаются в основном процессе, не в воркерах)"""
+        if was_modified:
+            self.metrics.inc('image_bytes_in', len(image_bytes))
+            self.metrics.inc('image_bytes_out', len(output))
+    
+    @property
+    def signature(self) -> str:
+        """Версия обработки: настройки, от которых зависит результат"""
+        signature = f"{self.old_link_pattern}|{self.ocr_language}|{self.ocr_strategy}"
+        if self.ocr_strategy == 'two_pass':
+            signature += f"|{FAST_OCR_CONFIG}"  # боксы быстрого прохода зависят от whitelist
+        return signature
+    
+    def _get_hash_cache(self) -> Optional[ImageHashCache]:
+        """Кеш по перцептивному хешу (только в основном процессе, воркеры его не трогают)"""
+        if self._hash_cache is None and Config.IMAGE_CACHE_ENABLED:
+            try:
+                self._hash_cache = ImageHashCache(
+                    os.path.join(Config.PROCESSED_DIR, 'cache'),
+                    signature=self.signature,
+                    max_distance=Config.IMAGE_HASH_MAX_DISTANCE,
+                    max_entries=Config.IMAGE_CACHE_MAX_ENTRIES
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Кеш изображений недоступен: {e}")
+                Config.IMAGE_CACHE_ENABLED = False
+        return self._hash_cache
+    
+    def _cache_lookup(
+        self,
+        image_bytes: bytes,
+        new_link: str
+    ) -> Tuple[Optional[Tuple[int, str]], Optional[Tuple[bytes, bool]], Optional[Tuple[list, Tuple[int, int]]]]:
+        """
+        Поиск изображения в кеше
+        
+        Готовый результат (или «ссылок нет») берется только для побайтно того же
+        исходника (sha256): у разных картинок dHash может совпасть. Похожее
+        изображение со ссылками дает только OCR боксы; похожее без ссылок не
+        дает ничего — новая картинка могла получить ссылку, OCR обязателен.
+        
+        Returns:
+            ((dHash, sha256), готовый результат или None, (боксы, размер) для пропуска OCR или None)
+        """
+        cache = self._get_hash_cache()
+        if cache is None:
+            return None, None, None
+        
+        started = time.monotonic()
+        try:
+            image_hash = compute_dhash(image_bytes)
+            digest = hashlib.sha256(image_bytes).hexdigest()
+            hit = cache.lookup(image_hash) if image_hash is not None else None
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка поиска в кеше изображений: {e}")
+            return None, None, None
+        
+        image_key = (image_hash, digest) if image_hash is not None else None
+        if hit is None:
+            self.metrics.inc('image_cache_misses')
+            return image_key, None, None
+        
+        entry, distance = hit
+        elapsed_ms = (time.monotonic() - started) * 1000
+        
+        if entry.get('sha256') == digest:
+            # Тот же файл без ссылок — изображение не меняется, OCR не нужен
+            if not entry['links']:
+                self.metrics.inc('image_cache_hits')
+                logger.info(f"🧬 Кеш изображений: попадание (без ссылок) за {elapsed_ms:.1f}мс")
+                return image_key, (image_bytes, False), None
+            
+            # Тот же файл и готовый результат для этой ссылки
+            output = cache.read_output(entry, new_link)
+            if output is not None:
+                self.metrics.inc('image_cache_hits')
+                logger.info(f"🧬 Кеш изображений: попадание (готовый результат) за {elapsed_ms:.1f}мс")
+                return image_key, (output, True), None
+        
+        if not entry['links']:
+            self.metrics.inc('image_cache_misses')
+            return image_key, None, None
+        
+        # Похожее изображение со ссылками — берем его OCR боксы, заменяем заново
+        self.metrics.inc('image_cache_near_hits')
+        logger.info(f"🧬 Кеш изображений: похожее изображение (d={distance}), OCR пропускается")
+        return image_key, None, (entry['links'], tuple(entry['size']))
+    
+    def _cache_store(
+        self,
+        image_key: Optional[Tuple[int, str]],
+        size: Optional[Tuple[int, int]],
+        links: list,
+        output: Optional[bytes],
+        new_link: str
+    ):
+        """Запись результата в кеш (в памяти; на диск — _schedule_cache_flush / flush)"""
+        cache = self._get_hash_cache()
+        if cache is None or image_key is None or size is None:
+            return
+        try:
+            image_hash, digest = image_key
+            cache.store(image_hash, digest, size, links, output, new_link)
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка записи в кеш изображений: {e}")
+    
+    def _schedule_cache_flush(self):
+        """
+        Запись кеша на диск в потоке (не блокирует event loop)
+        
+        Одновременно идет одна запись; данные, добавленные во время нее,
+        записываются следующей сразу после завершения.
+        """
+        cache = self._hash_cache
+        if cache is None or not cache.has_pending:
+            return
+        if self._cache_flush is not None and not self._cache_flush.done():
+            return
+        self._cache_flush = asyncio.get_running_loop().run_in_executor(None, cache.flush)
+        self._cache_flush.add_done_callback(self._on_cache_flushed)
+    
+    def _on_cache_flushed(self, future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"⚠️ Ошибка записи кеша изображений: {future.exception()}")
+            return
+        self._schedule_cache_flush()
+    
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.queue_size)
+        return self._slots
+    
+    def _get_executor(self) -> Executor:
+        """Ленивое создание пула (process или thread)"""
+        if self._executor is None:
+            if self.executor_mode == 'thread':
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='image-worker'
+                )
+            else:
+                # spawn: безопасно при наличии потоков в родительском процессе (Telethon, to_thread)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+            logger.info(f"🧵 Пул обработки изображений: {self.executor_mode}, воркеров: {self.max_workers}")
+        return self._executor
+    
+    def _reset_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def shutdown(self):
+        """Остановка пула воркеров и запись кеша изображений на диск"""
+        self._reset_executor()
+        if self._hash_cache is not None:
+            self._hash_cache.flush()
+    
+    def _find_links_in_image(self, img: np.ndarray, strategy: Optional[str] = None) -> list:
         """
         Находит ссылки на изображении с помощью OCR
         
+        OCR_STRATEGY=two_pass: быстрый проход по уменьшенной копии отвечает, где может
+        быть старая ссылка; полный OCR — только в этих местах (см. _find_links_two_pass).
+        OCR_STRATEGY=regions: Tesseract запускается только на областях, похожих на
+        строки текста (text_regions), координаты переводятся обратно в координаты
+        изображения. Если областей нет или они покрывают большую часть картинки,
+        один проход по всему кадру дешевле. OCR_STRATEGY=full — всегда весь кадр.
+        
         Returns:
             List of dicts with link info: {'text': str, 'x': int, 'y': int, 'w': int, 'h': int}
         """
@@ -95,146 +495,188 @@ class ImageProcessor:
             # Конвертация в grayscale для лучшего OCR
             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
             
-            # Улучшение контраста
-            gray = cv2.convertScaleAbs(gray, alpha=1.5, beta=30)
-            
-            # OCR
-            data = pytesseract.image_to_data(
-                gray,
-                lang=self.ocr_language,
-                output_type=pytesseract.Output.DICT
-            )
+            strategy = strategy or self.ocr_strategy
+            if strategy == 'two_pass':
+                return self._find_links_two_pass(gray)
             
-            found_links = []
-            n_boxes = len(data['text'])
+            if strategy == 'regions':
+                regions = find_text_regions(gray)
+                size = (gray.shape[1], gray.shape[0])
+                if regions and region_coverage(regions, size) <= Config.OCR_REGIONS_MAX_COVERAGE:
+                    found_links = []
+                    for x, y, w, h in regions:
+                        found_links.extend(self._ocr_links(gray[y:y + h, x:x + w], x, y))
+                    return found_links
             
-            for i in range(n_boxes):
-                text = data['text'][i].strip()
-                
-                # Проверка на наличие паттерна ссылки
-                if re.search(self.old_link_pattern, text, re.IGNORECASE):
-                    x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
-                    
-                    # Фильтруем слишком маленькие области
-                    if w > 10 and h > 5:
-                        found_links.append({
-                            'text': text,
-                            'x': x,
-                            'y': y,
-                            'w': w,
-                            'h': h
-                        })
-                        logger.info(f"Найдена ссылка: {text} на позиции ({x}, {y})")
-            
-            return found_links
+            return self._ocr_links(gray)
             
         except Exception as e:
             logger.error(f"Ошибка OCR: {e}")
             return []
     
-    def _replace_links_in_image(self, img: np.ndarray, links: list) -> np.ndarray:
+    def _find_links_two_pass(self, gray: np.ndarray) -> list:
+        """
+        Двухпроходный OCR
+        
+        Первый проход (уменьшенная копия, psm 11, whitelist символов ссылок) ищет
+        слова, похожие на OLD_LINK_PATTERN, и неуверенно распознанные слова,
+        похожие на ссылку. Второй — полный OCR в полном разрешении только вокруг
+        них. Изображение без кандидатов завершается после первого прохода.
+        """
+        found_links = []
+        for x, y, w, h in self._scan_for_link_areas(gray):
+            found_links.extend(self._ocr_links(gray[y:y + h, x:x + w], x, y))
+        return found_links
+    
+    def _scan_for_link_areas(self, gray: np.ndarray) -> list:
+        """Быстрый проход: области (x, y, w, h) в полном разрешении, где может быть старая ссылка"""
+        height, width = gray.shape[:2]
+        scale = min(1.0, Config.OCR_FAST_MAX_WIDTH / float(width))
+        small = gray
+        if scale < 1.0:
+            small = cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        
+        data = self.ocr.image_to_data(small, lang=Config.OCR_FAST_LANGUAGE, config=FAST_OCR_CONFIG)
+        
+        boxes = []
+        for i, text in enumerate(data['text']):
+            text = text.strip()
+            if not text:
+                continue
+            
+            confidence = float(data['conf'][i])
+            uncertain = 0 <= confidence < Config.OCR_FAST_MIN_CONFIDENCE and LINK_LIKE.search(text)
+            if not (uncertain or self._looks_like_old_link(text)):
+                continue
+            
+            x, y = int(data['left'][i] / scale), int(data['top'][i] / scale)
+            w, h = int(data['width'][i] / scale), int(data['height'][i] / scale)
+            # Запас по ширине: на уменьшенной копии ссылка могла распасться на части
+            margin_x, margin_y = 2 * h, max(4, h // 2)
+            boxes.append((
+                max(0, x - margin_x),
+                max(0, y - margin_y),
+                min(width, x + w + margin_x),
+                min(height, y + h + margin_y)
+            ))
+        
+        return [(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in merge_boxes(boxes)]
+    
+    def _looks_like_old_link(self, text: str) -> bool:
+        """Слово совпадает с OLD_LINK_PATTERN или похоже на одну из его ссылок (ошибки OCR на малом разрешении)"""
+        if re.search(self.old_link_pattern, text, re.IGNORECASE):
+            return True
+        text = text.lower()
+        if 't.me' in text or 'tme/' in text:
+            return True
+        return any(difflib.SequenceMatcher(None, text, hint).ratio() >= 0.6 for hint in self._link_hints)
+    
+    def _ocr_links(self, gray: np.ndarray, offset_x: int = 0, offset_y: int = 0) -> list:
+        """OCR фрагмента и отбор ссылок по OLD_LINK_PATTERN (координаты со сдвигом фрагмента)"""
+        # Улучшение контраста
+        gray = cv2.convertScaleAbs(gray, alpha=1.5, beta=30)
+        
+        # OCR
+        data = self.ocr.image_to_data(gray, lang=self.ocr_language)
+        
+        found_links = []
+        n_boxes = len(data['text'])
+        
+        for i in range(n_boxes):
+            text = data['text'][i].strip()
+            
+            # Проверка на наличие паттерна ссылки
+            if re.search(self.old_link_pattern, text, re.IGNORECASE):
+                x, y, w, h = data['left'][i] + offset_x, data['top'][i] + offset_y, data['width'][i], data['height'][i]
+                
+                # Фильтруем слишком маленькие области
+                if w > 10 and h > 5:
+                    found_links.append({
+                        'text': text,
+                        'x': x,
+                        'y': y,
+                        'w': w,
+                        'h': h
+                    })
+                    logger.info(f"Найдена ссылка: {text} на позиции ({x}, {y})")
+        
+        return found_links
+    
+    def _replace_links_in_image(self, img: np.ndarray, links: list, new_link: Optional[str] = None) -> np.ndarray:
         """
         Заменяет найденные ссылки на новые
         
+        Все области ссылок собираются в одну маску, inpainting выполняется только
+        на вырезках вокруг них (с запасом под радиус inpaint), новый текст
+        накладывается кешированными спрайтами прямо в массив OpenCV.
+        
         Args:
             img: OpenCV изображение
             links: Список найденных ссылок с координатами
+            new_link: Ссылка для подстановки (по умолчанию YOUR_LINK)
             
         Returns:
             Модифицированное изображение
         """
         try:
             result_img = img.copy()
+            height, width = result_img.shape[:2]
             
+            # Увеличиваем области для лучшего покрытия
+            padding = 5
+            boxes = []
             for link in links:
-                x, y, w, h = link['x'], link['y'], link['w'], link['h']
-                
-                # Увеличиваем область для лучшего покрытия
-                padding = 5
-                x = max(0, x - padding)
-                y = max(0, y - padding)
-                w = w + 2 * padding
-                h = h + 2 * padding
-                
-                # Создаем маску для inpainting
-                mask = np.zeros(result_img.shape[:2], np.uint8)
-                cv2.rectangle(mask, (x, y), (x + w, y + h), 255, -1)
-                
-                # Inpainting - удаление старого текста
-                result_img = cv2.inpaint(result_img, mask, 3, cv2.INPAINT_TELEA)
-                
-                # Добавление нового текста с Pillow
-                result_img = self._add_text_to_image(result_img, self.new_link, x, y, h)
+                x = max(0, link['x'] - padding)
+                y = max(0, link['y'] - padding)
+                boxes.append((x, y, min(width, x + link['w'] + 2 * padding), min(height, y + link['h'] + 2 * padding)))
             
-            return result_img
+            # Одна маска для всех ссылок
+            mask = np.zeros((height, width), np.uint8)
+            for x1, y1, x2, y2 in boxes:
+                mask[y1:y2, x1:x2] = 255
+            
+            # Inpainting - удаление старого текста только в окрестности ссылок
+            # (пересекающиеся окрестности объединяются, чтобы не обрабатывать пиксели дважды)
+            margin = 4 * INPAINT_RADIUS
+            rois = merge_boxes([
+                (max(0, x1 - margin), max(0, y1 - margin), min(width, x2 + margin), min(height, y2 + margin))
+                for x1, y1, x2, y2 in boxes
+            ])
+            for x1, y1, x2, y2 in rois:
+                result_img[y1:y2, x1:x2] = cv2.inpaint(
+                    result_img[y1:y2, x1:x2], mask[y1:y2, x1:x2], INPAINT_RADIUS, cv2.INPAINT_TELEA
+                )
+            
+            # Новый текст: готовые спрайты надписи по альфа-каналу, без конвертации в PIL
+            text = new_link or self.new_link
+            return self._add_texts_to_image(result_img, [(text, x1, y1, y2 - y1) for x1, y1, x2, y2 in boxes])
             
         except Exception as e:
             logger.error(f"Ошибка при замене ссылок: {e}")
             return img
     
-    def _add_text_to_image(
-        self,
-        img: np.ndarray,
-        text: str,
-        x: int,
-        y: int,
-        height: int
-    ) -> np.ndarray:
+    def _add_texts_to_image(self, img: np.ndarray, items: list) -> np.ndarray:
         """
-        Добавляет текст на изображение
+        Добавляет несколько надписей прямо в массив OpenCV (без конвертации в PIL)
+        
+        Надпись с обводкой рендерится один раз на (текст, размер шрифта) и
+        дальше только накладывается по альфа-каналу (см. render_text_sprite).
         
         Args:
             img: OpenCV изображение
-            text: Текст для добавления
-            x, y: Координаты
-            height: Высота текста (для выбора размера шрифта)
+            items: [(текст, x, y, высота области)]
             
         Returns:
             Изображение с текстом
         """
         try:
-            # Конвертация в PIL
-            pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-            draw = ImageDraw.Draw(pil_img)
-            
-            # Выбор размера шрифта пропорционально высоте
-            font_size = max(12, int(height * 0.7))
-            
-            try:
-                # Попытка использовать разные шрифты
-                font = None
-                font_paths = [
-                    '/System/Library/Fonts/Helvetica.ttc',  # macOS
-                    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',  # Linux
-                    'C:\\Windows\\Fonts\\arial.ttf',  # Windows
-                    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf'  # Linux alt
-                ]
-                
-                for font_path in font_paths:
-                    try:
-                        font = ImageFont.truetype(font_path, font_size)
-                        break
-                    except:
-                        continue
-                
-                if font is None:
-                    font = ImageFont.load_default()
-                    
-            except Exception as e:
-                logger.warning(f"Не удалось загрузить шрифт: {e}")
-                font = ImageFont.load_default()
-            
-            # Рисуем текст (белый с черной обводкой для читаемости)
-            # Обводка
-            for offset_x in [-1, 0, 1]:
-                for offset_y in [-1, 0, 1]:
-                    draw.text((x + offset_x, y + offset_y), text, fill=(0, 0, 0), font=font)
-            
-            # Основной текст
-            draw.text((x, y), text, fill=(255, 255, 255), font=font)
-            
-            # Конвертация обратно в OpenCV
-            return cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+            result_img = img.copy()
+            for text, x, y, height in items:
+                # Выбор размера шрифта пропорционально высоте
+                sprite = render_text_sprite(text, max(12, int(height * 0.7)))
+                # Спрайт включает 1px обводки слева и сверху
+                blend_sprite(result_img, sprite, x - 1, y - 1)
+            return result_img
             
         except Exception as e:
             logger.error(f"Ошибка при добавлении текста: {e}")
@@ -258,7 +700,7 @@ class ImageProcessor:
                 return False
             
             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            text = pytesseract.image_to_string(gray, lang=self.ocr_language)
+            text = self.ocr.image_to_string(gray, lang=self.ocr_language)
             
             return len(text.strip()) > 5
             
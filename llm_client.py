@@ -3,26 +3,89 @@
 Поддержка: OpenAI, DeepSeek, xAI Grok, Google Gemini, Cohere, HuggingFace
 """
 
+import asyncio
+import copy
+import re
+import time
 import requests
-from typing import Optional, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional, List, Dict, Any, Tuple
 from config import Config
+from metrics import get_metrics
+from provider_health import ProbeCache, ProviderHealthRegistry
+from rewrite_cache import RewriteCache
+from routes import Branding
+from utils import LINK_PATTERN, extract_links
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Версия промптов: увеличивать при изменении текстов промптов (инвалидирует кеш переписывания)
+REWRITE_PROMPT_VERSION = 2
+
+# Telegram лимит подписи к фото/альбому
+CAPTION_LIMIT = 1024
+
+# Последняя строка ответа переписывания: модель сама сообщает, упомянут ли бренд
+BRAND_MARKER = re.compile(r'^\s*BRAND\s*:\s*(да|нет|yes|no)\s*$', re.IGNORECASE | re.MULTILINE)
+
+# Проверки результата (validate_rewrite)
+CHECK_OLD_LINKS = 'old_links'
+CHECK_MISSING_LINK = 'missing_link'
+CHECK_TOO_LONG = 'too_long'
+CHECK_LOW_UNIQUENESS = 'low_uniqueness'
+
+# Уровни моделей для переписывания (см. LLMClient.classify_tier)
+TIER_TRIVIAL = 'trivial'  # без LLM
+TIER_FAST = 'fast'
+TIER_STRONG = 'strong'
+
+def parse_models(spec: str) -> Dict[str, str]:
+    """Разбор "провайдер:модель,провайдер:модель" (LLM_FAST_MODELS / LLM_STRONG_MODELS)"""
+    models = {}
+    for item in spec.split(','):
+        key, _, model = item.strip().partition(':')
+        if key and model:
+            models[key.strip().lower()] = model.strip()
+    return models
+
+
+REWRITE_SYSTEM_PROMPT = "Ты - профессиональный SMM-специалист, который умеет переписывать посты на любые темы, сохраняя смысл, но делая их уникальными и авторскими. Всегда следуй инструкциям точно, шаг за шагом, чтобы результат был предсказуемым даже для простых моделей."
+
 
 class LLMProvider:
     """Базовый класс для LLM провайдера"""
     
     def __init__(self, name: str, api_key: str, model: str):
         self.name = name
+        self.key = name.split()[0].lower()  # ключ в настройках: groq, google, huggingface, deepseek, xai
         self.api_key = api_key
         self.model = model
         self.is_available = bool(api_key)
     
+    def with_model(self, model: str, name: str) -> 'LLMProvider':
+        """Копия провайдера с другой моделью (тот же ключ и клиент, свое имя для статистики)"""
+        clone = copy.copy(self)
+        clone.name = name
+        clone.model = model
+        return clone
+    
     def generate(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, max_tokens: int = 1000) -> Optional[str]:
         """Генерация текста (должен быть переопределен в наследниках)"""
         raise NotImplementedError
+    
+    async def agenerate(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, max_tokens: int = 1000) -> Optional[str]:
+        """
+        Асинхронная генерация текста
+        
+        По умолчанию выполняет синхронный generate() в отдельном потоке,
+        чтобы не блокировать event loop. Наследники с нативным async API переопределяют.
+        """
+        return await asyncio.to_thread(self.generate, prompt, system_prompt, temperature, max_tokens)
+    
+    async def aclose(self):
+        """Закрытие асинхронных соединений провайдера"""
+        pass
 
 
 class OpenAIProvider(LLMProvider):
@@ -33,7 +96,7 @@ class OpenAIProvider(LLMProvider):
         self.base_url = base_url
         if self.is_available:
             try:
-                from openai import OpenAI
+                from openai import OpenAI, AsyncOpenAI
                 # ИСПРАВЛЕНИЕ: Правильная инициализация с base_url
                 if base_url:
                     self.client = OpenAI(
@@ -41,32 +104,62 @@ class OpenAIProvider(LLMProvider):
                         base_url=base_url,
                         timeout=30.0  # Добавляем таймаут
                     )
+                    self.async_client = AsyncOpenAI(
+                        api_key=api_key,
+                        base_url=base_url,
+                        timeout=30.0
+                    )
                 else:
                     self.client = OpenAI(
                         api_key=api_key,
                         timeout=30.0
                     )
+                    self.async_client = AsyncOpenAI(
+                        api_key=api_key,
+                        timeout=30.0
+                    )
             except Exception as e:
                 logger.warning(f"⚠️ {name}: Не удалось инициализировать клиент: {e}")
                 self.is_available = False
     
+    def _build_messages(self, prompt: str, system_prompt: str) -> List[Dict[str, str]]:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
     def generate(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, max_tokens: int = 1000) -> Optional[str]:
         try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=self._build_messages(prompt, system_prompt),
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name}: Ошибка генерации: {e}")
+            return None
+    
+    async def agenerate(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, max_tokens: int = 1000) -> Optional[str]:
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(prompt, system_prompt),
                 temperature=temperature,
                 max_tokens=max_tokens
             )
             return response.choices[0].message.content.strip()
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.warning(f"⚠️ {self.name}: Ошибка генерации: {e}")
             return None
+    
+    async def aclose(self):
+        if getattr(self, 'async_client', None) is not None:
+            await self.async_client.close()
 
 
 class GoogleGeminiProvider(LLMProvider):
@@ -88,26 +181,40 @@ class GoogleGeminiProvider(LLMProvider):
                 logger.warning(f"⚠️ {name}: Не удалось инициализировать клиент: {e}")
                 self.is_available = False
     
+    def _model_with_config(self, temperature: float, max_tokens: int):
+        # ИСПРАВЛЕНИЕ: Создаем модель с generation_config при каждом вызове
+        return self.genai.GenerativeModel(
+            model_name=self.model,
+            generation_config={
+                "temperature": temperature,
+                "max_output_tokens": max_tokens,
+            }
+        )
+    
     def generate(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, max_tokens: int = 1000) -> Optional[str]:
         try:
             # Gemini не поддерживает отдельный system prompt, комбинируем
             full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
             
-            # ИСПРАВЛЕНИЕ: Создаем модель с generation_config при каждом вызове
-            model_with_config = self.genai.GenerativeModel(
-                model_name=self.model,
-                generation_config={
-                    "temperature": temperature,
-                    "max_output_tokens": max_tokens,
-                }
-            )
-            
             # Вызываем generate_content БЕЗ generation_config
-            response = model_with_config.generate_content(full_prompt)
+            response = self._model_with_config(temperature, max_tokens).generate_content(full_prompt)
             return response.text.strip()
         except Exception as e:
             logger.warning(f"⚠️ {self.name}: Ошибка генерации: {e}")
             return None
+    
+    async def agenerate(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, max_tokens: int = 1000) -> Optional[str]:
+        try:
+            full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+            
+            # Нативный async API google-generativeai
+            response = await self._model_with_config(temperature, max_tokens).generate_content_async(full_prompt)
+            return response.text.strip()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name}: Ошибка генерации: {e}")
+            return None
 
 
 class CohereProvider(LLMProvider):
@@ -119,6 +226,7 @@ class CohereProvider(LLMProvider):
             try:
                 import cohere
                 self.client = cohere.Client(api_key)
+                self.async_client = cohere.AsyncClient(api_key)
             except Exception as e:
                 logger.warning(f"⚠️ {name}: Не удалось инициализировать клиент: {e}")
                 self.is_available = False
@@ -139,6 +247,22 @@ class CohereProvider(LLMProvider):
         except Exception as e:
             logger.warning(f"⚠️ {self.name}: Ошибка генерации: {e}")
             return None
+    
+    async def agenerate(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, max_tokens: int = 1000) -> Optional[str]:
+        try:
+            response = await self.async_client.chat(
+                message=prompt,
+                preamble=system_prompt if system_prompt else None,
+                model=self.model,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            return response.text.strip()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name}: Ошибка генерации: {e}")
+            return None
 
 
 class HuggingFaceProvider(LLMProvider):
@@ -152,51 +276,85 @@ class HuggingFaceProvider(LLMProvider):
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        self._async_http = None  # httpx.AsyncClient, создается лениво внутри event loop
+    
+    def with_model(self, model: str, name: str) -> 'LLMProvider':
+        clone = super().with_model(model, name)
+        clone.api_url = f"https://api-inference.huggingface.co/models/{model}"
+        clone._async_http = None
+        return clone
+    
+    def _build_payload(self, prompt: str, system_prompt: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
+        # ИСПРАВЛЕНИЕ: Форматируем промпт как строку (inputs должен быть строкой, не массивом)
+        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        
+        return {
+            "inputs": full_prompt,  # Убедимся что это строка
+            "parameters": {
+                "temperature": temperature,
+                "max_new_tokens": max_tokens,
+                "return_full_text": False,
+                "do_sample": True  # Добавляем для лучшей генерации
+            }
+        }
+    
+    def _parse_response(self, status_code: int, result: Any, raw_text: str) -> Optional[str]:
+        """Разбор ответа Inference API (общий для sync и async)"""
+        if status_code == 200:
+            # ИСПРАВЛЕНИЕ: Проверяем разные форматы ответа
+            if isinstance(result, list) and len(result) > 0:
+                # Формат: [{"generated_text": "..."}]
+                generated = result[0].get("generated_text", "").strip()
+                if generated:
+                    return generated
+                logger.warning(f"⚠️ {self.name}: Пустой generated_text в ответе")
+            elif isinstance(result, dict) and "generated_text" in result:
+                # Альтернативный формат: {"generated_text": "..."}
+                generated = result["generated_text"].strip()
+                if generated:
+                    return generated
+            else:
+                logger.warning(f"⚠️ {self.name}: Некорректный формат ответа: {result}")
+        else:
+            logger.warning(f"⚠️ {self.name}: HTTP {status_code}: {raw_text[:200]}")
+        return None
     
     def generate(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, max_tokens: int = 1000) -> Optional[str]:
         try:
-            # ИСПРАВЛЕНИЕ: Форматируем промпт как строку (inputs должен быть строкой, не массивом)
-            full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
-            
-            payload = {
-                "inputs": full_prompt,  # Убедимся что это строка
-                "parameters": {
-                    "temperature": temperature,
-                    "max_new_tokens": max_tokens,
-                    "return_full_text": False,
-                    "do_sample": True  # Добавляем для лучшей генерации
-                }
-            }
-            
             response = requests.post(
                 self.api_url,
                 headers=self.headers,
-                json=payload,
+                json=self._build_payload(prompt, system_prompt, temperature, max_tokens),
                 timeout=30
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                # ИСПРАВЛЕНИЕ: Проверяем разные форматы ответа
-                if isinstance(result, list) and len(result) > 0:
-                    # Формат: [{"generated_text": "..."}]
-                    generated = result[0].get("generated_text", "").strip()
-                    if generated:
-                        return generated
-                    logger.warning(f"⚠️ {self.name}: Пустой generated_text в ответе")
-                elif isinstance(result, dict) and "generated_text" in result:
-                    # Альтернативный формат: {"generated_text": "..."}
-                    generated = result["generated_text"].strip()
-                    if generated:
-                        return generated
-                else:
-                    logger.warning(f"⚠️ {self.name}: Некорректный формат ответа: {result}")
-            else:
-                logger.warning(f"⚠️ {self.name}: HTTP {response.status_code}: {response.text[:200]}")
+            result = response.json() if response.status_code == 200 else None
+            return self._parse_response(response.status_code, result, response.text)
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name}: Ошибка генерации: {e}")
             return None
+    
+    async def agenerate(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, max_tokens: int = 1000) -> Optional[str]:
+        try:
+            if self._async_http is None:
+                import httpx
+                self._async_http = httpx.AsyncClient(headers=self.headers, timeout=30.0)
+            
+            response = await self._async_http.post(
+                self.api_url,
+                json=self._build_payload(prompt, system_prompt, temperature, max_tokens)
+            )
+            result = response.json() if response.status_code == 200 else None
+            return self._parse_response(response.status_code, result, response.text)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.warning(f"⚠️ {self.name}: Ошибка генерации: {e}")
             return None
+    
+    async def aclose(self):
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
 
 
 class LLMClient:
@@ -207,17 +365,42 @@ class LLMClient:
         self.providers: List[LLMProvider] = []
         self.current_provider_index = 0
         
-        # Инициализация всех доступных провайдеров
-        self._initialize_providers()
+        # Здоровье провайдеров: EWMA задержки, ошибки, circuit breaker (переживает перезапуск)
+        self.health = ProviderHealthRegistry(
+            Config.PROVIDER_HEALTH_FILE,
+            alpha=Config.PROVIDER_HEALTH_ALPHA,
+            failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=Config.CIRCUIT_RESET_TIMEOUT
+        )
+        
+        self.probe_cache = ProbeCache(Config.LLM_PROBE_CACHE_FILE, Config.LLM_PROBE_CACHE_TTL)
+        self.metrics = get_metrics()
         
-        # Фильтруем только доступные
-        self.providers = [p for p in self.providers if p.is_available]
+        # Персистентный кеш результатов (повторы постов не тратят LLM)
+        self.cache: Optional[RewriteCache] = None
+        if Config.REWRITE_CACHE_ENABLED:
+            try:
+                self.cache = RewriteCache(
+                    Config.REWRITE_CACHE_PATH,
+                    ttl=Config.REWRITE_CACHE_TTL,
+                    max_entries=Config.REWRITE_CACHE_MAX_ENTRIES
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Кеш переписывания недоступен: {e}")
+        
+        # Инициализация и проверка всех доступных провайдеров
+        self._initialize_providers()
+        self.strong_providers = self._build_strong_providers()
+        self.tier_max_tokens = {TIER_FAST: Config.LLM_FAST_MAX_TOKENS, TIER_STRONG: Config.LLM_STRONG_MAX_TOKENS}
         
         if not self.providers:
             logger.warning("⚠️ Ни один LLM провайдер не настроен. Бот будет копировать посты БЕЗ AI обработки.")
             logger.warning("⚠️ Для AI обработки пополните DeepSeek: https://platform.deepseek.com")
         else:
             logger.info(f"✅ Доступные LLM провайдеры: {[p.name for p in self.providers]}")
+            logger.info(f"📊 Маршрутизация LLM: {[p.name for p in self._route()]}")
+            if Config.LLM_TIERING and Config.LLM_STRONG_MODELS:
+                logger.info(f"🎚️ Сильные модели: {[f'{p.name}: {p.model}' for p in self.strong_providers]}")
     
     def _initialize_providers(self):
         """Инициализация всех провайдеров"""
@@ -230,46 +413,132 @@ class LLMClient:
             "huggingface": "google/flan-t5-base",  # Стабильная бесплатная модель Google
             "xai": "grok-beta"  # xAI Grok модель
         }
+        default_models.update(parse_models(Config.LLM_FAST_MODELS))
         
         use_custom_model = Config.LLM_MODEL != 'auto' and Config.LLM_PROVIDER != 'auto'
+        candidates: List[LLMProvider] = []
         
         # GROQ - БЕСПЛАТНО, быстро! (groq.com)
         if hasattr(Config, 'GROQ_API_KEY') and Config.GROQ_API_KEY:
             model = Config.LLM_MODEL if (use_custom_model and Config.LLM_PROVIDER == 'groq') else default_models["groq"]
             # ИСПРАВЛЕНИЕ: Правильный base_url для Groq
             provider = OpenAIProvider("Groq", Config.GROQ_API_KEY, model, "https://api.groq.com/openai/v1")
-            if self._test_provider(provider):
-                self.providers.append(provider)
+            candidates.append(provider)
         
         # Google Gemini - БЕСПЛАТНО 60 req/min
         if hasattr(Config, 'GOOGLE_API_KEY') and Config.GOOGLE_API_KEY:
             model = Config.LLM_MODEL if (use_custom_model and Config.LLM_PROVIDER == 'google') else default_models["google"]
             provider = GoogleGeminiProvider("Google Gemini", Config.GOOGLE_API_KEY, model)
-            if self._test_provider(provider):
-                self.providers.append(provider)
+            candidates.append(provider)
         
         # HuggingFace - БЕСПЛАТНО
         if hasattr(Config, 'HUGGINGFACE_API_KEY') and Config.HUGGINGFACE_API_KEY:
             model = Config.LLM_MODEL if (use_custom_model and Config.LLM_PROVIDER == 'huggingface') else default_models["huggingface"]
             provider = HuggingFaceProvider("HuggingFace", Config.HUGGINGFACE_API_KEY, model)
-            if self._test_provider(provider):
-                self.providers.append(provider)
+            candidates.append(provider)
         
         # DeepSeek - дешево ($0.14/1M), если есть баланс
         if hasattr(Config, 'DEEPSEEK_API_KEY') and Config.DEEPSEEK_API_KEY:
             model = Config.LLM_MODEL if (use_custom_model and Config.LLM_PROVIDER == 'deepseek') else default_models["deepseek"]
             # ИСПРАВЛЕНИЕ: Правильный base_url для DeepSeek (с /v1)
             provider = OpenAIProvider("DeepSeek", Config.DEEPSEEK_API_KEY, model, "https://api.deepseek.com/v1")
-            if self._test_provider(provider):
-                self.providers.append(provider)
+            candidates.append(provider)
         
         # xAI Grok - платно, если есть баланс
         if hasattr(Config, 'XAI_API_KEY') and Config.XAI_API_KEY:
             model = Config.LLM_MODEL if (use_custom_model and Config.LLM_PROVIDER == 'xai') else default_models["xai"]
             # ИСПРАВЛЕНИЕ: Правильный base_url для xAI
             provider = OpenAIProvider("xAI Grok", Config.XAI_API_KEY, model, "https://api.x.ai/v1")
-            if self._test_provider(provider):
-                self.providers.append(provider)
+            candidates.append(provider)
+        
+        self.providers = self._probe_providers([p for p in candidates if p.is_available])
+    
+    def _probe_providers(self, candidates: List[LLMProvider]) -> List[LLMProvider]:
+        """
+        Проверка провайдеров при старте (LLM_PROBE_MODE)
+        
+        eager — параллельные тесты с общим дедлайном, свежие успешные результаты берутся из кеша;
+        background — все провайдеры сразу в ротации, тесты идут в фоне;
+        lazy — без тестов, первый реальный запрос и circuit breaker отсеют нерабочих.
+        
+        Не прошедший тест провайдер остается в списке с открытым размыкателем:
+        после CIRCUIT_RESET_TIMEOUT он получит пробный запрос (half-open).
+        """
+        mode = Config.LLM_PROBE_MODE
+        if not candidates or mode == 'lazy':
+            if candidates:
+                logger.info(f"💤 Проверка провайдеров отложена до первого запроса: {[p.name for p in candidates]}")
+            return candidates
+        
+        started = time.monotonic()
+        cached = {p.name: self.probe_cache.get(p) for p in candidates}
+        to_probe = [p for p in candidates if cached[p.name] is None]
+        
+        for provider in candidates:
+            if cached[provider.name]:
+                logger.info(f"🗂️ {provider.name}: РАБОТАЕТ (из кеша проверок)")
+        
+        if mode == 'background':
+            if to_probe:
+                executor = ThreadPoolExecutor(max_workers=len(to_probe), thread_name_prefix='llm-probe')
+                for provider in to_probe:
+                    executor.submit(self._probe_in_background, provider)
+                executor.shutdown(wait=False)
+            return candidates
+        
+        results = self._run_probes(to_probe)
+        for provider in to_probe:
+            ok, latency = results.get(provider.name, (False, None))
+            self._apply_probe(provider, ok, latency)
+        self.probe_cache.save()
+        self.health.save()
+        
+        logger.info(f"⏱️ Проверка провайдеров заняла {time.monotonic() - started:.1f}с ({len(to_probe)} запросов)")
+        return candidates
+    
+    def _run_probes(self, providers: List[LLMProvider]) -> Dict[str, Tuple[bool, Optional[float]]]:
+        """Параллельные тесты с общим дедлайном LLM_PROBE_TIMEOUT"""
+        if not providers:
+            return {}
+        
+        executor = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix='llm-probe')
+        futures = {executor.submit(self._timed_test, p): p for p in providers}
+        done, not_done = wait(futures, timeout=Config.LLM_PROBE_TIMEOUT)
+        # Не ждем зависшие запросы: их результат больше не нужен
+        executor.shutdown(wait=False, cancel_futures=True)
+        
+        results = {}
+        for future in done:
+            results[futures[future].name] = future.result()
+        for future in not_done:
+            logger.warning(f"❌ {futures[future].name}: не ответил за {Config.LLM_PROBE_TIMEOUT:.1f}с")
+            results[futures[future].name] = (False, None)
+        return results
+    
+    def _timed_test(self, provider: LLMProvider) -> Tuple[bool, Optional[float]]:
+        started = time.monotonic()
+        ok = self._test_provider(provider)
+        return ok, time.monotonic() - started
+    
+    def _probe_in_background(self, provider: LLMProvider):
+        ok, latency = self._timed_test(provider)
+        self._apply_probe(provider, ok, latency)
+        self.probe_cache.save()
+    
+    def _apply_probe(self, provider: LLMProvider, ok: bool, latency: Optional[float]):
+        """
+        Результат теста — первый замер для маршрутизации
+        
+        Кешируется только успех: разовый сбой при старте не должен отключать
+        провайдера на LLM_PROBE_CACHE_TTL. Не прошедший тест провайдер отключает
+        размыкатель — до пробного запроса через CIRCUIT_RESET_TIMEOUT.
+        """
+        if ok:
+            self.probe_cache.put(provider, True)
+            self.health.record_success(provider.name, latency)
+        else:
+            logger.warning(f"🔌 {provider.name}: отключен размыкателем до повторной проверки")
+            self.health.trip(provider.name)
     
     def _test_provider(self, provider: LLMProvider) -> bool:
         """Тестирование провайдера простым запросом"""
@@ -291,35 +560,199 @@ class LLMClient:
             logger.warning(f"❌ {provider.name}: не прошел тест ({str(e)[:100]})")
             return False
     
-    def _generate_with_fallback(self, prompt: str, system_prompt: str = "", temperature: float = None, max_tokens: int = 1000) -> Optional[str]:
-        """Генерация с автоматическим переключением между провайдерами"""
+    def _build_strong_providers(self) -> List[LLMProvider]:
+        """
+        Провайдеры сильного уровня: рабочие провайдеры с моделью из LLM_STRONG_MODELS
+        
+        Сильные модели включаются только явно: копии не проверяются при старте,
+        доступность как у провайдера, ошибки отсеивает circuit breaker.
+        Провайдер без сильной модели (и все, если LLM_STRONG_MODELS пуст) остается как есть.
+        """
+        models = parse_models(Config.LLM_STRONG_MODELS)
+        
+        strong = []
+        for provider in self.providers:
+            model = models.get(provider.key)
+            if model and model != provider.model:
+                strong.append(provider.with_model(model, f"{provider.name} ({TIER_STRONG})"))
+            else:
+                strong.append(provider)
+        return strong
+    
+    def _route(self, tier: str = TIER_FAST) -> List[LLMProvider]:
+        """
+        Провайдеры в порядке ожидаемой задержки (по данным реестра здоровья)
+        
+        Для сильного уровня — сначала сильные модели, затем быстрые как запасной вариант.
+        """
+        fast = self.health.order(self.providers)
+        if tier != TIER_STRONG:
+            return fast
+        strong = self.health.order(self.strong_providers)
+        return strong + [p for p in fast if p not in strong]
+    
+    def classify_tier(self, text: str) -> str:
+        """
+        Уровень модели для поста
+        
+        trivial — короче LLM_TRIVIAL_MAX_CHARS: без LLM, только замена ссылок;
+        strong — от LLM_STRONG_MIN_CHARS символов или от LLM_STRONG_MIN_LINKS ссылок;
+        fast — остальное (и все посты, если LLM_TIERING выключен).
+        """
+        if not Config.LLM_TIERING:
+            return TIER_FAST
+        length = len(text.strip())
+        if length < Config.LLM_TRIVIAL_MAX_CHARS:
+            return TIER_TRIVIAL
+        if length >= Config.LLM_STRONG_MIN_CHARS or len(extract_links(text)) >= Config.LLM_STRONG_MIN_LINKS:
+            return TIER_STRONG
+        return TIER_FAST
+    
+    def get_routing_state(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние маршрутизации: порядок провайдеров и их статистика"""
+        return {
+            'order': [p.name for p in self._route()],
+            'providers': self.health.snapshot()
+        }
+    
+    async def _agenerate_with_fallback(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        temperature: float = None,
+        max_tokens: int = 1000,
+        tier: str = TIER_FAST
+    ) -> Tuple[Optional[str], Optional[LLMProvider]]:
+        """Асинхронная генерация с автоматическим переключением между провайдерами: (текст, провайдер ответа)"""
         if temperature is None:
             temperature = self.temperature
         
-        # Пробуем все провайдеры по очереди
-        for i, provider in enumerate(self.providers):
+        if Config.LLM_HEDGING and len(self._route(tier)) > 1:
+            return await self._agenerate_hedged(prompt, system_prompt, temperature, max_tokens, tier)
+        
+        for provider in self._route(tier):
+            if not self.health.allow_request(provider.name):
+                logger.info(f"🔌 {provider.name}: пропущен (размыкатель открыт)")
+                continue
+            
             logger.info(f"🤖 Попытка генерации через {provider.name} (модель: {provider.model})...")
-            result = provider.generate(prompt, system_prompt, temperature, max_tokens)
+            result = await self._atimed_generate(provider, prompt, system_prompt, temperature, max_tokens)
             
             if result:
                 logger.info(f"✅ {provider.name}: Успешно сгенерирован текст")
-                # Переставляем успешный провайдер на первое место для следующего раза
-                if i > 0:
-                    self.providers[0], self.providers[i] = self.providers[i], self.providers[0]
-                return result
+                return result, provider
             else:
                 logger.warning(f"⚠️ {provider.name}: Не удалось сгенерировать, пробуем следующий...")
         
         logger.error("❌ Все LLM провайдеры недоступны!")
-        return None
+        return None, None
+    
+    async def _agenerate_hedged(
+        self,
+        prompt: str,
+        system_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        tier: str = TIER_FAST
+    ) -> Tuple[Optional[str], Optional[LLMProvider]]:
+        """
+        Хеджированная генерация: если основной провайдер не ответил за hedge delay
+        (перцентиль его недавних задержек), параллельно запускаем следующий.
+        Побеждает первый успешный ответ, остальные запросы отменяются.
+        """
+        candidates = self._route(tier)
+        max_parallel = 1 + max(0, Config.LLM_MAX_HEDGES)
+        running: Dict[asyncio.Task, LLMProvider] = {}
+        last_launched: Optional[LLMProvider] = None
+        
+        def launch() -> Optional[LLMProvider]:
+            while candidates:
+                provider = candidates.pop(0)
+                if not self.health.allow_request(provider.name):
+                    logger.info(f"🔌 {provider.name}: пропущен (размыкатель открыт)")
+                    continue
+                task = asyncio.create_task(self._atimed_generate(provider, prompt, system_prompt, temperature, max_tokens))
+                running[task] = provider
+                return provider
+            return None
+        
+        try:
+            while running or candidates:
+                if not running:
+                    # Все запущенные провайдеры ответили ошибкой — сразу следующий
+                    last_launched = launch()
+                    if last_launched is None:
+                        break
+                    logger.info(f"🤖 Попытка генерации через {last_launched.name} (модель: {last_launched.model})...")
+                
+                can_hedge = len(running) < max_parallel and bool(candidates)
+                timeout = self._hedge_delay(last_launched) if can_hedge else None
+                
+                done, _ = await asyncio.wait(running.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    waiting_for = last_launched.name
+                    hedge = launch()
+                    if hedge is not None:
+                        last_launched = hedge
+                        logger.info(f"⏱️ {waiting_for} не ответил за {timeout:.1f}с, хедж через {hedge.name}...")
+                    continue
+                
+                for task in done:
+                    provider = running.pop(task)
+                    result = task.result()
+                    if result:
+                        logger.info(f"✅ {provider.name}: Успешно сгенерирован текст (хедж: {len(running)} запросов отменено)")
+                        return result, provider
+                    logger.warning(f"⚠️ {provider.name}: Не удалось сгенерировать, пробуем следующий...")
+        finally:
+            for task in running:
+                task.cancel()
+        
+        logger.error("❌ Все LLM провайдеры недоступны!")
+        return None, None
+    
+    def _hedge_delay(self, provider: LLMProvider) -> float:
+        """Задержка перед хеджем: фиксированная из Config или выученный перцентиль провайдера"""
+        if Config.LLM_HEDGE_DELAY > 0:
+            return Config.LLM_HEDGE_DELAY
+        learned = self.health.get(provider.name).latency_percentile(Config.LLM_HEDGE_PERCENTILE)
+        return learned if learned is not None else Config.LLM_HEDGE_DEFAULT_DELAY
+    
+    async def _atimed_generate(self, provider: LLMProvider, prompt: str, system_prompt: str, temperature: float, max_tokens: int) -> Optional[str]:
+        """Вызов провайдера с записью задержки и результата в реестр здоровья"""
+        started = time.monotonic()
+        try:
+            result = await provider.agenerate(prompt, system_prompt, temperature, max_tokens)
+        except asyncio.CancelledError:
+            # Проигравший хедж: время ожидания — нижняя оценка его задержки
+            self.health.record_timeout(provider.name, time.monotonic() - started)
+            raise
+        self._record(provider, result, time.monotonic() - started)
+        return result
+    
+    def _record(self, provider: LLMProvider, result: Optional[str], latency: float):
+        if result:
+            self.health.record_success(provider.name, latency)
+        else:
+            self.health.record_failure(provider.name)
     
-    def rewrite_text(self, original_text: str, has_links: bool = True) -> str:
+    def rewrite_text(self, original_text: str, has_links: bool = True, branding: Optional[Branding] = None) -> str:
         """
-        Переписывает текст поста, делая его уникальным
+        Синхронная обертка над arewrite_text (для кода без event loop)
+        
+        Из асинхронного кода вызывайте arewrite_text напрямую.
+        """
+        return asyncio.run(self.arewrite_text(original_text, has_links, branding))
+    
+    async def arewrite_text(self, original_text: str, has_links: bool = True, branding: Optional[Branding] = None) -> str:
+        """
+        Переписывает текст поста, делая его уникальным (не блокирует event loop)
         
         Args:
             original_text: Оригинальный текст поста
             has_links: Есть ли в тексте ссылки для замены
+            branding: Бренд, ссылка и стиль маршрута (по умолчанию из настроек)
             
         Returns:
             Переписанный уникальный текст
@@ -328,35 +761,239 @@ class LLMClient:
             if not original_text or len(original_text.strip()) < 10:
                 return original_text
             
-            # Формируем промпт в зависимости от наличия ссылок
-            if has_links:
-                prompt = self._build_rewrite_prompt_with_links(original_text)
-            else:
-                prompt = self._build_rewrite_prompt_simple(original_text)
+            branding = branding or Branding.default()
+            tier = self.classify_tier(original_text)
+            self.metrics.inc(f'rewrite_tier_{tier}')
+            if tier == TIER_TRIVIAL:
+                return self._trivial_rewrite(original_text, has_links, branding)
             
-            system_prompt = "Ты - профессиональный SMM-специалист, который умеет переписывать посты на любые темы, сохраняя смысл, но делая их уникальными и авторскими. Всегда следуй инструкциям точно, шаг за шагом, чтобы результат был предсказуемым даже для простых моделей."
+            key = self._cache_key('rewrite', original_text, branding, tier, has_links=has_links)
+            cached = self._cache_lookup('rewrite', key)
+            if cached is not None:
+                return cached
             
-            # Вызов с fallback, max_tokens=600 для ограничения длины (Telegram лимит 1024 символа на caption)
-            result = self._generate_with_fallback(prompt, system_prompt, temperature=self.temperature, max_tokens=600)
+            async def generate(prompt: str) -> Tuple[Optional[str], Optional[LLMProvider]]:
+                return await self._agenerate_with_fallback(
+                    prompt, REWRITE_SYSTEM_PROMPT, temperature=self.temperature, max_tokens=self.tier_max_tokens[tier], tier=tier
+                )
             
-            if result:
-                return result
-            else:
-                # Если все провайдеры недоступны, возвращаем оригинал с простой модификацией
-                logger.warning("⚠️ Используем fallback: простая модификация текста")
-                return self._simple_text_modification(original_text)
+            # Один вызов LLM; повторный — только если локальная проверка не прошла
+            started = time.monotonic()
+            prompt = self._build_rewrite_prompt(original_text, has_links, branding)
+            result, provider = await generate(prompt)
+            check = self._check_rewrite(original_text, result, has_links, branding)
+            if self._needs_repair(check):
+                logger.info(f"🔁 Проверка переписанного текста не пройдена ({', '.join(check[2])}), повторная генерация")
+                self.metrics.inc('rewrite_repairs')
+                repaired, repair_provider = await generate(self._build_repair_prompt(original_text, check, branding))
+                better = self._better_rewrite(check, self._check_rewrite(original_text, repaired, has_links, branding))
+                if better is not check:
+                    check, provider = better, repair_provider
+            self.metrics.observe(f'rewrite_tier_{tier}_seconds', time.monotonic() - started)
+            self._record_check(check)
             
+            result = check[0]
+            self._cache_store('rewrite', key, result, provider)
+            return self._finalize_rewrite(original_text, result, branding)
+            
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Ошибка при переписывании текста: {e}")
             return original_text
     
-    def _simple_text_modification(self, text: str) -> str:
+    def validate_rewrite(self, original: str, text: str, has_links: bool, branding: Branding) -> List[str]:
+        """
+        Быстрая локальная проверка переписанного текста (без LLM)
+        
+        Returns:
+            Непройденные проверки: старые ссылки остались, нет ссылки маршрута
+            (если в оригинале были ссылки), длиннее подписи Telegram, низкая уникальность
+        """
+        problems = []
+        links = [self._normalize_link(link) for link in extract_links(text)]
+        own = self._normalize_link(branding.link)
+        if any(link != own for link in links):
+            problems.append(CHECK_OLD_LINKS)
+        if has_links and own not in links:
+            problems.append(CHECK_MISSING_LINK)
+        if len(text) > CAPTION_LIMIT:
+            problems.append(CHECK_TOO_LONG)
+        if self.check_uniqueness(original, text) < Config.REWRITE_MIN_UNIQUENESS:
+            problems.append(CHECK_LOW_UNIQUENESS)
+        return problems
+    
+    def _check_rewrite(
+        self,
+        original: str,
+        result: Optional[str],
+        has_links: bool,
+        branding: Branding
+    ) -> Tuple[Optional[str], bool, List[str]]:
+        """
+        Разбор ответа LLM и проверка: (текст, упомянут ли бренд, непройденные проверки)
+        
+        Ссылки исправляются на месте — чужие заменяются ссылкой маршрута, недостающая
+        дописывается в конец; остальные проблемы требуют повторной генерации.
+        """
+        if not result:
+            return None, False, []
+        
+        reported = BRAND_MARKER.search(result)
+        text = BRAND_MARKER.sub('', result).strip()
+        if not text:
+            return None, False, []
+        
+        problems = self.validate_rewrite(original, text, has_links, branding)
+        if CHECK_OLD_LINKS in problems or CHECK_MISSING_LINK in problems:
+            self.metrics.inc('rewrite_links_fixed')
+            text = self._replace_foreign_links(text, branding)
+            if has_links and self._normalize_link(branding.link) not in map(self._normalize_link, extract_links(text)):
+                text = f"{text}\n\n{branding.link}"
+            problems = self.validate_rewrite(original, text, has_links, branding)
+        
+        brand_included = branding.brand_name.lower() in text.lower()
+        if reported is not None:
+            brand_included = brand_included or reported.group(1).lower() in ('да', 'yes')
+        return text, brand_included, problems
+    
+    def _needs_repair(self, check: Tuple[Optional[str], bool, List[str]]) -> bool:
+        """Нужна ли повторная генерация (ссылки к этому моменту уже исправлены на месте)"""
+        text, _, problems = check
+        return bool(text and problems and Config.REWRITE_REPAIR)
+    
+    def _record_check(self, check: Tuple[Optional[str], bool, List[str]]):
+        """Метрики итогового результата переписывания (один раз на пост)"""
+        if check[1]:
+            self.metrics.inc('rewrite_brand_included')
+        for problem in check[2]:
+            self.metrics.inc(f'rewrite_check_{problem}')
+    
+    @staticmethod
+    def _better_rewrite(first: Tuple[Optional[str], bool, List[str]], second: Tuple[Optional[str], bool, List[str]]):
+        """Исправленный вариант, если он прошел больше проверок, иначе первый"""
+        if second[0] and len(second[2]) < len(first[2]):
+            return second
+        return first
+    
+    @staticmethod
+    def _normalize_link(link: str) -> str:
+        return re.sub(r'^https?://', '', link.rstrip('.,;:!?)/')).rstrip('/').lower()
+    
+    def _replace_foreign_links(self, text: str, branding: Branding) -> str:
+        """Все ссылки, кроме ссылки маршрута, — на ссылку маршрута (знаки препинания после ссылки сохраняются)"""
+        own = self._normalize_link(branding.link)
+        
+        def replace(match) -> str:
+            link = match.group(0)
+            core = link.rstrip('.,;:!?)')
+            if self._normalize_link(core) == own:
+                return link
+            return branding.link + link[len(core):]
+        
+        return re.sub(LINK_PATTERN, replace, text)
+    
+    def _build_repair_prompt(self, original: str, check: Tuple[Optional[str], bool, List[str]], branding: Branding) -> str:
+        """Промпт точечного исправления: только то, что не прошло проверку"""
+        text, brand_included, problems = check
+        fixes = []
+        if CHECK_TOO_LONG in problems:
+            fixes.append(f"Сократи текст до 800 символов, убрав несущественные части (сейчас {len(text)}).")
+        if CHECK_LOW_UNIQUENESS in problems:
+            fixes.append("Перефразируй сильнее: другие слова и порядок предложений, те же факты.")
+            if not brand_included:
+                fixes.append(f'Естественно упомяни "{branding.brand_name}", если это подходит по смыслу.')
+        fixes.append(f'Остальное не меняй. Ссылки в тексте — только "{branding.link}".')
+        fixes.append(f'Последней строкой отдельно напиши "BRAND: да", если в тексте упомянуто "{branding.brand_name}", иначе "BRAND: нет".')
+        steps = "\n".join(f"{idx}. {fix}" for idx, fix in enumerate(fixes, 1))
+        
+        return f"""Исправь переписанный текст.
+
+ОРИГИНАЛЬНЫЙ ТЕКСТ:
+{original}
+
+ПЕРЕПИСАННЫЙ ТЕКСТ:
+{text}
+
+ЧТО ИСПРАВИТЬ:
+{steps}
+
+ИСПРАВЛЕННЫЙ ТЕКСТ (начни сразу с текста, без введения):"""
+    
+    def _cache_key(self, kind: str, text: str, branding: Branding, tier: str = TIER_FAST, **params: Any) -> str:
+        """
+        Ключ кеша: текст + промпт, бренд и уровень модели
+        
+        Набор доступных провайдеров в ключ не входит: сбой теста или смена ключа
+        API не сбрасывают кеш. Модель, давшая ответ, хранится вместе со значением.
+        """
+        return RewriteCache.make_key(
+            kind,
+            text,
+            prompt_version=REWRITE_PROMPT_VERSION,
+            **branding.as_params(),
+            tier=tier,
+            temperature=self.temperature,
+            **params
+        )
+    
+    def _cache_lookup(self, kind: str, key: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        try:
+            entry = self.cache.get(key)
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка чтения кеша переписывания: {e}")
+            return None
+        
+        if entry is None:
+            self.metrics.inc(f'{kind}_cache_misses')
+            return None
+        
+        value, model = entry
+        self.metrics.inc(f'{kind}_cache_hits')
+        logger.info(f"🗂️ Кеш ({kind}): попадание (модель: {model or 'неизвестна'}), LLM не вызывается")
+        return value
+    
+    def _cache_store(self, kind: str, key: str, value: Optional[str], provider: Optional[LLMProvider] = None):
+        # Кешируем только ответы LLM, не fallback-модификации
+        if self.cache is None or not value:
+            return
+        model = f"{provider.name}:{provider.model}" if provider is not None else None
+        try:
+            self.cache.put(key, kind, value, model)
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка записи в кеш переписывания: {e}")
+    
+    def _finalize_rewrite(self, original_text: str, result: Optional[str], branding: Branding) -> str:
+        """Результат переписывания или fallback, если все провайдеры недоступны"""
+        if result:
+            return result
+        
+        # Если все провайдеры недоступны, возвращаем оригинал с простой модификацией
+        logger.warning("⚠️ Используем fallback: простая модификация текста")
+        return self._simple_text_modification(original_text, branding)
+    
+    def _build_rewrite_prompt(self, text: str, has_links: bool, branding: Optional[Branding] = None) -> str:
+        """Формирует промпт в зависимости от наличия ссылок"""
+        branding = branding or Branding.default()
+        if has_links:
+            return self._build_rewrite_prompt_with_links(text, branding)
+        return self._build_rewrite_prompt_simple(text, branding)
+    
+    def _trivial_rewrite(self, text: str, has_links: bool, branding: Branding) -> str:
+        """Короткий пост без LLM: переписывать нечего, только ссылки — на ссылку маршрута"""
+        if has_links:
+            return self._replace_foreign_links(text, branding)
+        return text
+    
+    def _simple_text_modification(self, text: str, branding: Branding) -> str:
         """Простая модификация текста если все LLM недоступны"""
         # Просто возвращаем слегка измененный текст без CTA
-        modified = f"{text}\n\n{Config.YOUR_BRAND_NAME}"
+        modified = f"{text}\n\n{branding.brand_name}"
         return modified
     
-    def _build_rewrite_prompt_with_links(self, text: str) -> str:
+    def _build_rewrite_prompt_with_links(self, text: str, branding: Branding) -> str:
         """Строит промпт для текста со ссылками"""
         return f"""Перепиши этот текст на любую тему так, чтобы он был уникальным, но сохранял весь смысл. Тема может быть любой, включая новости, события или информацию из Telegram.
 
@@ -365,19 +1002,20 @@ class LLMClient:
 
 ТРЕБОВАНИЯ (выполняй шаг за шагом):
 1. Прочитай текст и пойми основную идею, факты, детали.
-2. Замени ВСЕ ссылки (t.me/..., https://..., любые другие) на "{Config.YOUR_LINK}".
+2. Замени ВСЕ ссылки (t.me/..., https://..., любые другие) на "{branding.link}".
 3. Перефразируй каждое предложение своими словами, сохраняя все факты, детали, регионы, провайдеры, время, если они есть.
-4. Используй стиль: {Config.CHANNEL_STYLE}.
-5. Упомяни "{Config.YOUR_BRAND_NAME}" естественно как часть текста, если оно подходит по смыслу.
+4. Используй стиль: {branding.style}.
+5. Упомяни "{branding.brand_name}" естественно как часть текста, если оно подходит по смыслу.
 6. Сделай текст живым и информативным, но не добавляй срочности, если её нет в оригинале.
 7. НЕ используй фразы типа "по данным мониторинга" - пиши от своего лица.
 8. НЕ добавляй призывы к действию или дополнительные предложения в конце.
 9. Сохрани структуру: если есть списки или абзацы, сохрани их.
 10. ⚠️ КРИТИЧЕСКИ ВАЖНО: Текст должен быть КОРОТКИМ - максимум 800 символов! Если оригинал длиннее, сократи несущественные части.
+11. Последней строкой отдельно напиши "BRAND: да", если упомянул "{branding.brand_name}", иначе "BRAND: нет".
 
 ПЕРЕПИСАННЫЙ ТЕКСТ (начни сразу с текста, без введения):"""
     
-    def _build_rewrite_prompt_simple(self, text: str) -> str:
+    def _build_rewrite_prompt_simple(self, text: str, branding: Branding) -> str:
         """Строит промпт для текста без ссылок"""
         return f"""Перепиши этот текст на любую тему так, чтобы он был уникальным, но сохранял весь смысл. Тема может быть любой, включая новости, события или информацию из Telegram.
 
@@ -388,12 +1026,13 @@ class LLMClient:
 1. Прочитай текст и пойми основную идею, факты, детали.
 2. Перефразируй каждое предложение своими словами, сохраняя все факты, детали, регионы, провайдеры, время, если они есть.
 3. Слегка измени формулировки для уникальности.
-4. Используй стиль: {Config.CHANNEL_STYLE}.
-5. Упомяни "{Config.YOUR_BRAND_NAME}" естественно как часть текста, если оно подходит по смыслу.
+4. Используй стиль: {branding.style}.
+5. Упомяни "{branding.brand_name}" естественно как часть текста, если оно подходит по смыслу.
 6. Сделай текст немного более живым и информативным.
 7. НЕ добавляй призывы к действию или дополнительные предложения в конце.
 8. Сохрани структуру: если есть списки или абзацы, сохрани их.
 9. ⚠️ КРИТИЧЕСКИ ВАЖНО: Текст должен быть КОРОТКИМ - максимум 800 символов! Если оригинал длиннее, сократи несущественные части.
+10. Последней строкой отдельно напиши "BRAND: да", если упомянул "{branding.brand_name}", иначе "BRAND: нет".
 
 ПЕРЕПИСАННЫЙ ТЕКСТ (начни сразу с текста, без введения):"""
     
@@ -416,42 +1055,25 @@ class LLMClient:
         
         return min(uniqueness, 100.0)
     
-    def enhance_with_cta(self, text: str) -> str:
-        """
-        Добавляет упоминание бренда если его нет (без CTA)
-        
-        Args:
-            text: Текст поста
-            
-        Returns:
-            Текст с упоминанием
-        """
-        try:
-            prompt = f"""Добавь естественное упоминание "{Config.YOUR_BRAND_NAME}" в этот текст, если оно подходит по смыслу:
-
-ТЕКСТ:
-{text}
-
-ТРЕБОВАНИЯ:
-1. Упомяни "{Config.YOUR_BRAND_NAME}" только если оно логично вписывается.
-2. НЕ добавляй призывы к действию.
-3. НЕ добавляй ссылки, если их нет.
-4. Максимум 1 предложение изменения.
-5. Естественно вписывается в текст.
-
-ТЕКСТ С УПОМИНАНИЕМ:"""
-            
-            result = self._generate_with_fallback(prompt, "", 0.5, 500)
-            
-            if result:
-                return result
-            else:
-                # Простое упоминание вручную, если подходит
-                return f"{text} (с {Config.YOUR_BRAND_NAME})" if "VPN" in text or "защита" in text else text
-            
-        except Exception as e:
-            logger.error(f"Ошибка при добавлении упоминания: {e}")
-            return text
+    async def aclose(self):
+        """Закрытие асинхронных клиентов всех провайдеров"""
+        self.health.save()
+        if self.cache is not None:
+            self.cache.close()
+        # Копии сильного уровня делят клиент с исходным провайдером (кроме HuggingFace):
+        # общий клиент закрываем один раз
+        clones = [p for p in self.strong_providers if p not in self.providers]
+        closed = set()
+        for provider in self.providers + clones:
+            client = getattr(provider, 'async_client', None)
+            if client is not None:
+                if id(client) in closed:
+                    continue
+                closed.add(id(client))
+            try:
+                await provider.aclose()
+            except Exception as e:
+                logger.warning(f"⚠️ {provider.name}: Ошибка при закрытии клиента: {e}")
 
 # Singleton instance
 _llm_client = None
@@ -0,0 +1,155 @@
+"""
+🗃️ Message Index - Журнал уже опубликованных постов (идемпотентное копирование)
+Исходный чат + ID сообщения / grouped_id → ID сообщений в целевом канале
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MessageIndex:
+    """
+    Персистентный индекс обработанных сообщений
+    
+    На диске — append-only JSONL (одна запись на опубликованный пост),
+    в памяти — словари для O(1) проверки по ID сообщения и grouped_id.
+    Когда в журнале накапливается много устаревших строк, он переписывается
+    заново (compaction) с последними max_entries записями.
+    """
+    
+    def __init__(self, path: str, max_entries: int = 50000):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        
+        self._entries: Dict[str, Dict[str, Any]] = {}  # ключ поста → запись
+        self._by_message: Dict[str, str] = {}  # "chat:msg_id" → ключ поста
+        self._last_ids: Dict[int, int] = {}  # chat → максимальный обработанный ID
+        self._lines = 0
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._load()
+    
+    @staticmethod
+    def post_key(chat_id: int, messages: list) -> str:
+        """Ключ поста: grouped_id для альбома, иначе ID сообщения"""
+        first = messages[0]
+        if first.grouped_id:
+            return f"{chat_id}:g{first.grouped_id}"
+        return f"{chat_id}:m{first.id}"
+    
+    def lookup(self, chat_id: int, messages: list) -> Optional[Dict[str, Any]]:
+        """Запись о публикации, если пост (или любое его сообщение) уже был скопирован"""
+        entry = self._entries.get(self.post_key(chat_id, messages))
+        if entry is not None:
+            return entry
+        
+        for msg in messages:
+            key = self._by_message.get(f"{chat_id}:{msg.id}")
+            if key is not None:
+                return self._entries.get(key)
+        return None
+    
+    def record(self, chat_id: int, messages: list, target_ids: List[int], content_hash: str):
+        """Запоминает опубликованный пост (сразу дописывается в журнал на диске)"""
+        entry = {
+            'key': self.post_key(chat_id, messages),
+            'chat': chat_id,
+            'source_ids': [msg.id for msg in messages],
+            'grouped_id': messages[0].grouped_id,
+            'target_ids': list(target_ids),
+            'content_hash': content_hash,
+            'ts': time.time(),
+        }
+        
+        with self._lock:
+            self._add(entry)
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                self._lines += 1
+            except OSError as e:
+                logger.warning(f"⚠️ Не удалось записать в индекс сообщений: {e}")
+            
+            # Сжатие с запасом, чтобы не переписывать файл на каждой записи
+            slack = max(100, self.max_entries // 10)
+            if self._lines > max(1000, 2 * len(self._entries)) or len(self._entries) > self.max_entries + slack:
+                self._compact()
+    
+    def last_message_id(self, chat_id: int) -> int:
+        """Максимальный обработанный ID сообщения в чате (0, если ничего не было)"""
+        return self._last_ids.get(chat_id, 0)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _add(self, entry: Dict[str, Any]):
+        key = entry['key']
+        chat_id = entry['chat']
+        
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._forget(previous)
+        
+        self._entries[key] = entry
+        for msg_id in entry['source_ids']:
+            self._by_message[f"{chat_id}:{msg_id}"] = key
+        
+        if entry['source_ids']:
+            self._last_ids[chat_id] = max(self._last_ids.get(chat_id, 0), max(entry['source_ids']))
+    
+    def _forget(self, entry: Dict[str, Any]):
+        for msg_id in entry['source_ids']:
+            self._by_message.pop(f"{entry['chat']}:{msg_id}", None)
+    
+    def _compact(self):
+        """Переписывает журнал: без дублей, только последние max_entries записей"""
+        excess = len(self._entries) - self.max_entries
+        if excess > 0:
+            # dict хранит порядок вставки — первыми идут самые старые
+            for key in list(self._entries)[:excess]:
+                self._forget(self._entries.pop(key))
+        
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
+            self._lines = len(self._entries)
+            logger.info(f"🗃️ Индекс сообщений сжат: {len(self._entries)} записей")
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сжать индекс сообщений: {e}")
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        
+        broken = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._add(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    # Оборванная последняя строка после аварийной остановки
+                    broken += 1
+                self._lines += 1
+        
+        if broken:
+            logger.warning(f"⚠️ Индекс сообщений: пропущено поврежденных строк: {broken}")
+        logger.info(f"🗃️ Индекс сообщений: загружено {len(self._entries)} записей")
+        
+        if broken or len(self._entries) > self.max_entries:
+            self._compact()
@@ -0,0 +1,65 @@
+"""
+📊 Metrics - Простые счетчики и замеры времени в памяти процесса
+Периодически выводятся в лог копировщиком
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """Счетчики (inc) и распределения (observe: count/sum/max)"""
+    
+    def __init__(self):
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+    
+    def observe(self, name: str, value: float):
+        with self._lock:
+            stat = self.timings.get(name)
+            if stat is None:
+                stat = self.timings[name] = {'count': 0, 'sum': 0.0, 'max': 0.0}
+            stat['count'] += 1
+            stat['sum'] += value
+            stat['max'] = max(stat['max'], value)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            timings = {
+                name: {
+                    'count': stat['count'],
+                    'avg': round(stat['sum'] / stat['count'], 3) if stat['count'] else 0.0,
+                    'max': round(stat['max'], 3),
+                }
+                for name, stat in self.timings.items()
+            }
+            return {'counters': dict(self.counters), 'timings': timings}
+    
+    def log_summary(self):
+        snapshot = self.snapshot()
+        if not snapshot['counters'] and not snapshot['timings']:
+            return
+        counters = ", ".join(f"{k}={v:g}" for k, v in sorted(snapshot['counters'].items()))
+        logger.info(f"📊 Метрики: {counters}")
+        for name, stat in sorted(snapshot['timings'].items()):
+            logger.info(f"📊   {name}: n={stat['count']} avg={stat['avg']} max={stat['max']}")
+
+
+# Singleton instance
+_metrics = None
+
+def get_metrics() -> Metrics:
+    """Получить глобальный экземпляр метрик"""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
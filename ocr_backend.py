@@ -0,0 +1,190 @@
+"""
+🔤 OCR Backend - Распознавание текста: pytesseract (процесс tesseract на вызов) или tesserocr (в процессе)
+Оба бэкенда отдают одинаковый формат: словарь как у pytesseract.image_to_data(output_type=DICT)
+"""
+
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+OcrData = Dict[str, list]  # text, left, top, width, height, conf (по слову на индекс)
+
+
+class OcrBackend:
+    """Общий интерфейс OCR"""
+    
+    name = 'base'
+    
+    def image_to_data(self, image: np.ndarray, lang: str, config: str = '') -> OcrData:
+        """Слова с координатами и уверенностью (формат pytesseract.Output.DICT, только нужные ключи)"""
+        raise NotImplementedError
+    
+    def image_to_string(self, image: np.ndarray, lang: str, config: str = '') -> str:
+        raise NotImplementedError
+
+
+class PytesseractBackend(OcrBackend):
+    """
+    pytesseract: на каждый вызов запускается процесс tesseract
+    (временные файлы, загрузка моделей языка, разбор TSV)
+    """
+    
+    name = 'pytesseract'
+    
+    def __init__(self):
+        import pytesseract
+        self._pytesseract = pytesseract
+        
+        # Настройка Tesseract (путь может отличаться)
+        try:
+            pytesseract.get_tesseract_version()
+        except Exception:
+            # Попытка установить стандартные пути
+            possible_paths = [
+                '/usr/bin/tesseract',
+                '/usr/local/bin/tesseract',
+                'C:\\Program Files\\Tesseract-OCR\\tesseract.exe',
+                '/opt/homebrew/bin/tesseract'
+            ]
+            for path in possible_paths:
+                try:
+                    pytesseract.pytesseract.tesseract_cmd = path
+                    pytesseract.get_tesseract_version()
+                    break
+                except Exception:
+                    continue
+    
+    def image_to_data(self, image: np.ndarray, lang: str, config: str = '') -> OcrData:
+        return self._pytesseract.image_to_data(
+            image,
+            lang=lang,
+            config=config,
+            output_type=self._pytesseract.Output.DICT
+        )
+    
+    def image_to_string(self, image: np.ndarray, lang: str, config: str = '') -> str:
+        return self._pytesseract.image_to_string(image, lang=lang, config=config)
+
+
+class TesserocrBackend(OcrBackend):
+    """
+    tesserocr: API Tesseract внутри процесса
+    
+    Хендл на каждую пару (язык, настройки) создается один раз и живет, пока жив
+    процесс (воркер пула), — модели rus+eng загружаются однократно.
+    Хендл не потокобезопасен, поэтому в режиме IMAGE_EXECUTOR=thread у каждого
+    потока свои хендлы.
+    """
+    
+    name = 'tesserocr'
+    
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._local = threading.local()
+    
+    @staticmethod
+    def _parse_config(config: str) -> Tuple[Optional[int], List[Tuple[str, str]]]:
+        """Разбор строки настроек в формате pytesseract: --psm N и -c имя=значение"""
+        psm = re.search(r'--psm\s+(\d+)', config)
+        variables = re.findall(r'-c\s+(\w+)=(\S+)', config)
+        return (int(psm.group(1)) if psm else None), variables
+    
+    def check(self, lang: str):
+        """Пробная инициализация Tesseract (RuntimeError, если нет tessdata или моделей языка)"""
+        self._tesserocr.PyTessBaseAPI(lang=lang).End()
+    
+    def _api(self, lang: str, config: str):
+        apis: Optional[Dict[Tuple[str, str], object]] = getattr(self._local, 'apis', None)
+        if apis is None:
+            apis = self._local.apis = {}
+        
+        key = (lang, config)
+        if key not in apis:
+            psm, variables = self._parse_config(config)
+            api = self._tesserocr.PyTessBaseAPI(lang=lang)
+            if psm is not None:
+                api.SetPageSegMode(psm)
+            for name, value in variables:
+                api.SetVariable(name, value)
+            apis[key] = api
+            logger.info(f"🔤 tesserocr: загружены модели {lang} ({config or 'по умолчанию'})")
+        return apis[key]
+    
+    def image_to_data(self, image: np.ndarray, lang: str, config: str = '') -> OcrData:
+        tesserocr = self._tesserocr
+        api = self._api(lang, config)
+        data: OcrData = {'text': [], 'left': [], 'top': [], 'width': [], 'height': [], 'conf': []}
+        
+        api.SetImage(Image.fromarray(image))
+        try:
+            api.Recognize()
+            level = tesserocr.RIL.WORD
+            for word in tesserocr.iterate_level(api.GetIterator(), level):
+                box = word.BoundingBox(level)
+                if box is None:
+                    continue
+                x1, y1, x2, y2 = box
+                data['text'].append(word.GetUTF8Text(level) or '')
+                data['left'].append(x1)
+                data['top'].append(y1)
+                data['width'].append(x2 - x1)
+                data['height'].append(y2 - y1)
+                data['conf'].append(word.Confidence(level))
+        finally:
+            api.Clear()
+        
+        return data
+    
+    def image_to_string(self, image: np.ndarray, lang: str, config: str = '') -> str:
+        api = self._api(lang, config)
+        api.SetImage(Image.fromarray(image))
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+
+def create_ocr_backend(name: Optional[str] = None) -> OcrBackend:
+    """
+    Бэкенд по OCR_BACKEND
+    
+    auto — tesserocr, если он установлен и инициализируется с OCR_LANGUAGE,
+    иначе pytesseract. Явно заданный, но недоступный tesserocr тоже
+    откатывается на pytesseract.
+    """
+    name = (name or Config.OCR_BACKEND).lower()
+    if name in ('auto', 'tesserocr'):
+        try:
+            backend = TesserocrBackend()
+            backend.check(Config.OCR_LANGUAGE)
+            return backend
+        except ImportError:
+            if name == 'tesserocr':
+                logger.warning("⚠️ OCR_BACKEND=tesserocr, но tesserocr не установлен — используется pytesseract")
+        except Exception as e:
+            # Например, tessdata не найдена или нет моделей языка
+            logger.warning(f"⚠️ tesserocr не инициализировался ({Config.OCR_LANGUAGE}): {e} — используется pytesseract")
+    elif name != 'pytesseract':
+        logger.warning(f"⚠️ Неизвестный OCR_BACKEND={name}, используется pytesseract")
+    return PytesseractBackend()
+
+
+# Singleton instance (по одному на процесс: в каждом воркере пула свой)
+_ocr_backend = None
+
+def get_ocr_backend() -> OcrBackend:
+    """Получить экземпляр OCR бэкенда текущего процесса"""
+    global _ocr_backend
+    if _ocr_backend is None:
+        _ocr_backend = create_ocr_backend()
+        logger.info(f"🔤 OCR бэкенд: {_ocr_backend.name}")
+    return _ocr_backend
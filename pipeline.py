@@ -0,0 +1,238 @@
+"""
+🏭 Pipeline - Стадийная обработка постов с ограниченными очередями
+ingest → download → rewrite → transform → publish
+
+Каждая стадия имеет свою очередь (bounded) и свое число воркеров.
+Если очередь следующей стадии заполнена, воркер предыдущей ждет —
+так давление (backpressure) доходит до обработчика событий Telegram.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PostJob:
+    """Пост (одиночное сообщение или альбом), проходящий через стадии пайплайна"""
+    
+    def __init__(self, seq: int, messages: list, route: Any = None):
+        self.seq = seq
+        self.messages = messages
+        self.route = route  # маршрут (источник → цели, брендинг)
+        self.created_at = time.monotonic()
+        
+        # Заполняются стадиями
+        self.original_text = ""
+        self.has_links = False
+        self.rewritten_text = ""
+        self.photos: List[Optional[bytes]] = []  # скачанные изображения (в порядке message id; None — не скачивалось)
+        self.photo_ids: List[int] = []  # ID сообщений, из которых скачаны photos
+        self.photo_refs: list = []  # Telegram Photo для отправки по ссылке (None — только файлом)
+        self.photo_sources: list = []  # ID исходных фото (msg.photo.id) — ключ кеша загрузок
+        self.media: list = []  # обработанные изображения (байты) или Telegram Photo без изменений
+        self.media_keys: list = []  # (ID исходного фото, версия обработки) для каждого media
+        
+        # Идемпотентность (индекс обработанных сообщений)
+        self.key: Optional[str] = None  # ключ поста, если этот job его захватил
+        self.content_hash = ""
+        self.target_ids: List[int] = []  # ID опубликованных сообщений в целевом канале
+    
+    @property
+    def first_msg(self):
+        return self.messages[0]
+    
+    @property
+    def is_album(self) -> bool:
+        return len(self.messages) > 1
+    
+    def describe(self) -> str:
+        if self.is_album:
+            return f"альбом {self.first_msg.grouped_id} ({len(self.messages)} медиа)"
+        return f"пост ID {self.first_msg.id}"
+
+
+StageHandler = Callable[[PostJob], Awaitable[Optional[PostJob]]]
+
+
+class Stage:
+    """Стадия пайплайна: обработчик + очередь + воркеры"""
+    
+    def __init__(self, name: str, handler: StageHandler, workers: int, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.queue: Optional[asyncio.Queue] = None
+        self.processed = 0
+        self.failed = 0
+    
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+
+class Pipeline:
+    """
+    Набор последовательных стадий с ограниченными очередями
+    
+    Обработчик стадии возвращает job для передачи дальше или None,
+    если пост нужно отбросить (пропуск, ошибка). При ordered=True посты
+    попадают на последнюю стадию строго в порядке поступления.
+    """
+    
+    def __init__(
+        self,
+        ordered: bool = True,
+        high_watermark: float = 0.8,
+        on_finish: Optional[Callable[[PostJob], None]] = None
+    ):
+        self.ordered = ordered
+        self.high_watermark = high_watermark
+        self.on_finish = on_finish  # вызывается для каждого поста, покинувшего пайплайн (успех или отброс)
+        self.stages: List[Stage] = []
+        self._workers: List[asyncio.Task] = []
+        self._seq = 0
+        self._in_flight = 0
+        self._idle: Optional[asyncio.Event] = None
+        
+        # Буфер переупорядочивания перед последней стадией
+        self._reorder: Dict[int, Tuple[PostJob, bool]] = {}
+        self._next_seq = 0
+        self._reorder_lock: Optional[asyncio.Lock] = None
+    
+    def add_stage(self, name: str, handler: StageHandler, workers: int = 1, queue_size: int = 32) -> 'Pipeline':
+        self.stages.append(Stage(name, handler, workers, queue_size))
+        return self
+    
+    async def start(self):
+        """Создание очередей и запуск воркеров всех стадий"""
+        if not self.stages:
+            raise ValueError("Пайплайн без стадий")
+        
+        self._reorder_lock = asyncio.Lock()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        for index, stage in enumerate(self.stages):
+            stage.queue = asyncio.Queue(maxsize=stage.queue_size)
+            for n in range(stage.workers):
+                task = asyncio.create_task(self._worker(index, stage), name=f"pipeline-{stage.name}-{n}")
+                self._workers.append(task)
+        
+        layout = " → ".join(f"{s.name}[{s.workers}]" for s in self.stages)
+        logger.info(f"🏭 Пайплайн запущен: {layout}")
+    
+    async def submit(self, messages: list, route: Any = None) -> PostJob:
+        """
+        Постановка поста в очередь первой стадии
+        
+        Ждет, если очередь заполнена (backpressure на источник событий).
+        """
+        job = PostJob(self._seq, messages, route)
+        self._seq += 1
+        self._in_flight += 1
+        self._idle.clear()
+        
+        first = self.stages[0]
+        self._warn_if_congested(first)
+        await first.queue.put(job)
+        return job
+    
+    async def _worker(self, index: int, stage: Stage):
+        is_last = index == len(self.stages) - 1
+        
+        while True:
+            job = await stage.queue.get()
+            try:
+                result = None
+                try:
+                    result = await stage.handler(job)
+                    stage.processed += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    stage.failed += 1
+                    logger.error(f"❌ Стадия {stage.name}: ошибка ({job.describe()}): {e}", exc_info=True)
+                
+                if is_last:
+                    self._done(job)
+                elif index + 1 == len(self.stages) - 1 and self.ordered:
+                    await self._release(job, forward=result is not None)
+                elif result is not None:
+                    await self._forward(index + 1, result)
+                elif self.ordered:
+                    await self._release(job, forward=False)
+                else:
+                    self._done(job)
+            finally:
+                stage.queue.task_done()
+    
+    async def _forward(self, index: int, job: PostJob):
+        stage = self.stages[index]
+        self._warn_if_congested(stage)
+        await stage.queue.put(job)
+    
+    async def _release(self, job: PostJob, forward: bool):
+        """Передача на последнюю стадию в порядке seq (отброшенные посты освобождают очередь)"""
+        self._reorder[job.seq] = (job, forward)
+        
+        async with self._reorder_lock:
+            while self._next_seq in self._reorder:
+                ready, ready_forward = self._reorder.pop(self._next_seq)
+                self._next_seq += 1
+                if ready_forward:
+                    await self._forward(len(self.stages) - 1, ready)
+                else:
+                    self._done(ready)
+    
+    def _done(self, job: PostJob):
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception as e:
+                logger.error(f"❌ Ошибка в on_finish ({job.describe()}): {e}")
+        self._in_flight -= 1
+        if self._in_flight <= 0:
+            self._in_flight = 0
+            self._idle.set()
+    
+    def _warn_if_congested(self, stage: Stage):
+        if stage.depth >= stage.queue_size * self.high_watermark:
+            logger.warning(f"🚦 Очередь стадии {stage.name} почти заполнена ({stage.depth}/{stage.queue_size})")
+    
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Глубина очередей и счетчики по стадиям"""
+        stats = {
+            stage.name: {
+                'depth': stage.depth,
+                'workers': stage.workers,
+                'processed': stage.processed,
+                'failed': stage.failed,
+            }
+            for stage in self.stages
+        }
+        stats['pipeline'] = {'in_flight': self._in_flight, 'reorder_buffer': len(self._reorder)}
+        return stats
+    
+    async def join(self):
+        """Ожидание обработки всех поставленных постов"""
+        await self._idle.wait()
+    
+    async def stop(self, drain_timeout: float = 0.0):
+        """Остановка воркеров (с попыткой дообработать очереди в течение drain_timeout)"""
+        if drain_timeout > 0 and self._workers and self._in_flight:
+            try:
+                await asyncio.wait_for(self.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Пайплайн не успел обработать очереди за {drain_timeout}с: {self.stats()}")
+        
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
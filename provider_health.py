@@ -0,0 +1,337 @@
+"""
+🩺 Provider Health - Здоровье LLM провайдеров и circuit breaker
+EWMA задержки, частота ошибок, подряд идущие ошибки, сохранение между перезапусками
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Состояния размыкателя
+CLOSED = 'closed'  # провайдер работает, запросы идут
+OPEN = 'open'  # провайдер отключен до истечения reset_timeout
+HALF_OPEN = 'half_open'  # пробный запрос после reset_timeout
+
+
+class ProviderHealth:
+    """Статистика и состояние размыкателя одного провайдера"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0  # EWMA доли ошибок (0..1)
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0  # time.time(), чтобы переживать перезапуск
+        self.probe_in_flight = False
+        self.latencies = deque(maxlen=50)  # последние успешные задержки (секунды)
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Перцентиль задержки по недавним успешным запросам (None, если данных мало)"""
+        if len(self.latencies) < 5:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'ewma_latency': self.ewma_latency,
+            'error_rate': round(self.error_rate, 4),
+            'consecutive_failures': self.consecutive_failures,
+            'successes': self.successes,
+            'failures': self.failures,
+            'state': self.state,
+            'opened_at': self.opened_at,
+            'latencies': [round(x, 3) for x in self.latencies],
+        }
+    
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> 'ProviderHealth':
+        health = cls(name)
+        health.ewma_latency = data.get('ewma_latency')
+        health.error_rate = float(data.get('error_rate', 0.0))
+        health.consecutive_failures = int(data.get('consecutive_failures', 0))
+        health.successes = int(data.get('successes', 0))
+        health.failures = int(data.get('failures', 0))
+        health.state = data.get('state', CLOSED)
+        health.opened_at = float(data.get('opened_at', 0.0))
+        health.latencies.extend(data.get('latencies', []))
+        # Незавершенный пробный запрос до перезапуска считаем неудачным
+        if health.state == HALF_OPEN:
+            health.state = OPEN
+        return health
+
+
+class ProviderHealthRegistry:
+    """
+    Реестр здоровья провайдеров
+    
+    Упорядочивает провайдеров по ожидаемому времени до успешного ответа
+    (EWMA задержки с поправкой на частоту ошибок) и отключает провайдеров,
+    которые ошибаются подряд, до истечения reset_timeout (circuit breaker).
+    """
+    
+    def __init__(
+        self,
+        path: Optional[str],
+        alpha: float = 0.3,
+        failure_threshold: int = 3,
+        reset_timeout: float = 300.0,
+        default_latency: float = 0.0,
+        save_interval: float = 30.0
+    ):
+        self.path = path
+        self.alpha = alpha
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.default_latency = default_latency
+        self.save_interval = save_interval
+        self.providers: Dict[str, ProviderHealth] = {}
+        self._last_save = 0.0
+        self._dirty = False
+        self._save_lock = threading.Lock()
+        self._lock = threading.RLock()  # реестр меняют и event loop, и потоки проверок провайдеров
+        self.load()
+    
+    def get(self, name: str) -> ProviderHealth:
+        with self._lock:
+            if name not in self.providers:
+                self.providers[name] = ProviderHealth(name)
+            return self.providers[name]
+    
+    def allow_request(self, name: str) -> bool:
+        """Можно ли отправить запрос провайдеру (переводит open → half_open по таймауту)"""
+        with self._lock:
+            health = self.get(name)
+            
+            if health.state == CLOSED:
+                return True
+            
+            if health.state == OPEN:
+                if time.time() - health.opened_at < self.reset_timeout:
+                    return False
+                health.state = HALF_OPEN
+                health.probe_in_flight = False
+                logger.info(f"🔌 {name}: размыкатель в half-open, пробный запрос")
+            
+            # HALF_OPEN: пропускаем только один пробный запрос за раз
+            if health.probe_in_flight:
+                return False
+            health.probe_in_flight = True
+            return True
+    
+    def record_success(self, name: str, latency: float):
+        with self._lock:
+            health = self.get(name)
+            
+            if health.ewma_latency is None:
+                health.ewma_latency = latency
+            else:
+                health.ewma_latency = self.alpha * latency + (1 - self.alpha) * health.ewma_latency
+            health.error_rate *= (1 - self.alpha)
+            health.latencies.append(latency)
+            health.consecutive_failures = 0
+            health.successes += 1
+            health.probe_in_flight = False
+            
+            if health.state != CLOSED:
+                logger.info(f"🔌 {name}: размыкатель закрыт, провайдер снова в ротации")
+                health.state = CLOSED
+            
+            self._touch()
+    
+    def record_failure(self, name: str):
+        with self._lock:
+            health = self.get(name)
+            
+            health.error_rate = self.alpha + (1 - self.alpha) * health.error_rate
+            health.consecutive_failures += 1
+            health.failures += 1
+            health.probe_in_flight = False
+            
+            if health.state == HALF_OPEN or (
+                health.state == CLOSED and health.consecutive_failures >= self.failure_threshold
+            ):
+                health.state = OPEN
+                health.opened_at = time.time()
+                logger.warning(
+                    f"🔌 {name}: размыкатель открыт после {health.consecutive_failures} ошибок подряд, "
+                    f"пауза {self.reset_timeout:.0f}с"
+                )
+            
+            self._touch()
+    
+    def trip(self, name: str):
+        """Принудительно отключить провайдера (например, не прошел тест при старте)"""
+        with self._lock:
+            health = self.get(name)
+            health.state = OPEN
+            health.opened_at = time.time()
+            health.probe_in_flight = False
+            self._touch()
+    
+    def record_timeout(self, name: str, elapsed: float):
+        """
+        Запрос отменен через elapsed секунд без ответа (проигравший хедж)
+        
+        Ответ занял бы не меньше elapsed: если это дольше EWMA, оценка растет,
+        и медленный провайдер уходит из начала маршрута. Ошибкой не считается.
+        """
+        with self._lock:
+            health = self.get(name)
+            health.probe_in_flight = False
+            if health.ewma_latency is None:
+                health.ewma_latency = elapsed
+            elif elapsed > health.ewma_latency:
+                health.ewma_latency = self.alpha * elapsed + (1 - self.alpha) * health.ewma_latency
+            else:
+                return
+            self._touch()
+    
+    def expected_latency(self, name: str) -> float:
+        """
+        Ожидаемое время до успешного ответа: EWMA задержки / доля успехов
+        
+        Провайдер без статистики получает default_latency (по умолчанию 0),
+        чтобы получить хотя бы один запрос и набрать замеры.
+        """
+        with self._lock:
+            health = self.get(name)
+            latency = health.ewma_latency if health.ewma_latency is not None else self.default_latency
+            return latency / max(0.05, 1.0 - health.error_rate)
+    
+    def order(self, providers: List[Any]) -> List[Any]:
+        """Провайдеры по возрастанию ожидаемой задержки (отключенные размыкателем — в конце)"""
+        def rank(provider) -> tuple:
+            health = self.get(provider.name)
+            is_open = health.state == OPEN and time.time() - health.opened_at < self.reset_timeout
+            return (is_open, self.expected_latency(provider.name))
+        
+        with self._lock:
+            return sorted(providers, key=rank)
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Текущее состояние маршрутизации (для логов и отладки)"""
+        with self._lock:
+            return {
+                name: {
+                    'state': health.state,
+                    'ewma_latency': round(health.ewma_latency, 3) if health.ewma_latency is not None else None,
+                    'error_rate': round(health.error_rate, 3),
+                    'consecutive_failures': health.consecutive_failures,
+                    'expected_latency': round(self.expected_latency(name), 3),
+                    'successes': health.successes,
+                    'failures': health.failures,
+                }
+                for name, health in self.providers.items()
+            }
+    
+    def _touch(self):
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+    
+    def load(self):
+        """Загрузка состояния с диска (если файл есть)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for name, item in data.get('providers', {}).items():
+                self.providers[name] = ProviderHealth.from_dict(name, item)
+            logger.info(f"🩺 Загружено состояние провайдеров: {list(self.providers)}")
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить состояние провайдеров: {e}")
+    
+    def save(self):
+        """Атомарное сохранение состояния на диск"""
+        self._last_save = time.monotonic()
+        if not self.path or not self._dirty:
+            return
+        with self._save_lock:
+            self._write()
+    
+    def _write(self):
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with self._lock:
+                providers = {n: h.to_dict() for n, h in self.providers.items()}
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(
+                    {'saved_at': time.time(), 'providers': providers},
+                    f,
+                    ensure_ascii=False,
+                    indent=2
+                )
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось сохранить состояние провайдеров: {e}")
+
+
+class ProbeCache:
+    """
+    Кеш результатов тестов провайдеров на диске с TTL
+    
+    Ключ включает имя, модель и отпечаток API ключа, так что смена ключа
+    или модели сбрасывает кеш. Быстрый перезапуск берет результаты отсюда.
+    Хранятся только успешные тесты: неудачный проверяется заново.
+    """
+    
+    def __init__(self, path: Optional[str], ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.load()
+    
+    @staticmethod
+    def _key(provider: Any) -> str:
+        key_fingerprint = hashlib.sha256(provider.api_key.encode('utf-8')).hexdigest()[:12]
+        return f"{provider.name}|{provider.model}|{key_fingerprint}"
+    
+    def get(self, provider: Any) -> Optional[bool]:
+        """True, если провайдер прошел тест не раньше TTL назад, иначе None"""
+        if self.ttl <= 0:
+            return None
+        entry = self.entries.get(self._key(provider))
+        # Записи ok=False из старых версий кеша игнорируются
+        if not entry or not entry['ok'] or time.time() - entry['checked_at'] > self.ttl:
+            return None
+        return True
+    
+    def put(self, provider: Any, ok: bool):
+        with self._lock:
+            self.entries[self._key(provider)] = {'ok': ok, 'checked_at': time.time()}
+    
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить кеш проверок провайдеров: {e}")
+    
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            try:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.entries, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось сохранить кеш проверок провайдеров: {e}")
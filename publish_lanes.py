@@ -0,0 +1,176 @@
+"""
+🛣️ Publish Lanes - Очереди отправки по целевым каналам с повторами и FloodWait
+FloodWait паркует только очередь своей цели, остальные цели продолжают публиковать
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from telethon.errors import FloodWaitError, ServerError
+
+from metrics import get_metrics
+from publish_scheduler import MESSAGE, PublishScheduler
+
+logger = logging.getLogger(__name__)
+
+# Временные ошибки сети/сервера: повторяем с экспоненциальной паузой
+TRANSIENT_ERRORS = (ConnectionError, asyncio.TimeoutError, ServerError)
+
+SendFn = Callable[[], Awaitable[Any]]
+
+
+class SendRequest:
+    """Отложенная отправка: функция отправки + future с результатом"""
+    
+    def __init__(self, send: SendFn, kind: str, messages: int, label: str):
+        self.send = send
+        self.kind = kind
+        self.messages = messages
+        self.label = label
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class Lane:
+    """Очередь отправок одного целевого канала (FIFO, свой воркер)"""
+    
+    def __init__(self, target_id: int, size: int):
+        self.target_id = target_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, size))
+        self.parked_until = 0.0  # time.monotonic(), до которого цель на паузе после FloodWait
+        self.task: Optional[asyncio.Task] = None
+
+
+class PublishLanes:
+    """
+    Центральные повторы отправки
+    
+    Каждый целевой канал получает свою очередь. Перед каждой попыткой отправка
+    ждет окончания FloodWait своей цели и токен у планировщика; при FloodWait
+    цель паркуется до дедлайна, при временной ошибке — пауза 2^n секунд.
+    Больше MAX_RETRIES повторов — future завершается ошибкой.
+    """
+    
+    def __init__(self, scheduler: PublishScheduler, max_retries: int = 3, lane_size: int = 50):
+        self.scheduler = scheduler
+        self.max_retries = max(0, max_retries)
+        self.lane_size = lane_size
+        self.metrics = get_metrics()
+        self._lanes: Dict[int, Lane] = {}
+    
+    async def submit(
+        self,
+        target_id: int,
+        send: SendFn,
+        kind: str = MESSAGE,
+        messages: int = 1,
+        label: str = ""
+    ) -> asyncio.Future:
+        """
+        Ставит отправку в очередь цели и сразу возвращает future с результатом send()
+        
+        Ждет только если очередь цели заполнена (backpressure).
+        """
+        lane = self._lanes.get(target_id)
+        if lane is None:
+            lane = self._lanes[target_id] = Lane(target_id, self.lane_size)
+            lane.task = asyncio.create_task(self._worker(lane), name=f"publish-lane-{target_id}")
+        
+        request = SendRequest(send, kind, messages, label)
+        if lane.queue.full():
+            logger.warning(f"🚦 Очередь отправки в {target_id} заполнена ({lane.queue.qsize()}), ожидание...")
+        await lane.queue.put(request)
+        return request.future
+    
+    async def _worker(self, lane: Lane):
+        while True:
+            request = await lane.queue.get()
+            try:
+                result = await self._send_with_retries(lane, request)
+                if not request.future.done():
+                    request.future.set_result(result)
+            except asyncio.CancelledError:
+                if not request.future.done():
+                    request.future.cancel()
+                raise
+            except Exception as e:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            finally:
+                lane.queue.task_done()
+    
+    async def _send_with_retries(self, lane: Lane, request: SendRequest) -> Any:
+        attempt = 0
+        while True:
+            parked = lane.parked_until - time.monotonic()
+            if parked > 0:
+                await asyncio.sleep(parked)
+            await self.scheduler.acquire(lane.target_id, request.kind, request.messages)
+            
+            try:
+                return await request.send()
+            except FloodWaitError as e:
+                self._park(lane, request.kind, e.seconds)
+                error, delay = e, None
+            except TRANSIENT_ERRORS as e:
+                error, delay = e, 2 ** attempt
+            
+            attempt += 1
+            self.metrics.inc('publish_retries')
+            if attempt > self.max_retries:
+                logger.error(f"❌ {request.label}: отправка в {lane.target_id} не удалась после {self.max_retries} повторов: {error}")
+                self.metrics.inc('publish_gave_up')
+                raise error
+            
+            if delay is not None:
+                logger.warning(f"⚠️ {request.label}: ошибка отправки ({error}), повтор {attempt}/{self.max_retries} через {delay}с")
+                await asyncio.sleep(delay)
+            else:
+                logger.info(f"🔁 {request.label}: повтор {attempt}/{self.max_retries} после FloodWait")
+    
+    def _park(self, lane: Lane, kind: str, seconds: float):
+        """FloodWait: пауза только для этой цели, учет в метриках"""
+        lane.parked_until = max(lane.parked_until, time.monotonic() + seconds)
+        self.scheduler.penalize(lane.target_id, kind, seconds)
+        self.metrics.inc('flood_wait_seconds', seconds)
+        self.metrics.inc('flood_waits')
+        logger.warning(
+            f"⏳ Flood wait: цель {lane.target_id} на паузе {seconds}с "
+            f"(в очереди: {lane.queue.qsize()}), остальные цели продолжают"
+        )
+    
+    def stats(self) -> Dict[int, Dict[str, float]]:
+        """Глубина очередей и оставшаяся пауза по целям"""
+        now = time.monotonic()
+        return {
+            target_id: {
+                'depth': lane.queue.qsize(),
+                'parked_for': round(max(0.0, lane.parked_until - now), 1),
+            }
+            for target_id, lane in self._lanes.items()
+        }
+    
+    async def stop(self, drain_timeout: float = 0.0):
+        """Остановка воркеров (с попыткой отправить очереди в течение drain_timeout)"""
+        lanes = list(self._lanes.values())
+        if drain_timeout > 0 and lanes:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(lane.queue.join() for lane in lanes)),
+                    timeout=drain_timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Не все отправки выполнены за {drain_timeout}с: {self.stats()}")
+        
+        for lane in lanes:
+            if lane.task:
+                lane.task.cancel()
+        await asyncio.gather(*(lane.task for lane in lanes if lane.task), return_exceptions=True)
+        
+        # Неотправленное: отменяем future, чтобы ожидающие не зависли
+        for lane in lanes:
+            while not lane.queue.empty():
+                request = lane.queue.get_nowait()
+                request.future.cancel()
+        self._lanes.clear()
@@ -0,0 +1,113 @@
+"""
+🚦 Publish Scheduler - Антифлуд публикаций на token bucket'ах
+Общий лимит на аккаунт + отдельные бюджеты на каждый целевой канал для альбомов и сообщений
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Tuple
+
+from config import Config
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Виды публикаций с отдельными бюджетами
+ALBUM = 'album'  # send_file со списком файлов
+MESSAGE = 'message'  # send_message и send_file с одним файлом
+
+
+class TokenBucket:
+    """
+    Token bucket с резервированием
+    
+    reserve() за O(1) списывает токены (баланс может уйти в минус — это очередь
+    уже зарезервированных публикаций) и возвращает, сколько ждать до момента,
+    когда резерв покроется пополнением. Ожидающие не опрашивают bucket в цикле.
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(rate, 1e-6)  # токенов в секунду
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+    
+    def reserve(self, cost: float = 1.0) -> float:
+        """Резервирует cost токенов и возвращает время ожидания (секунды)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        
+        self.tokens -= cost
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+    
+    def penalize(self, seconds: float):
+        """Опустошает bucket на seconds вперед (после FloodWait от Telegram)"""
+        self.reserve(0)
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class PublishScheduler:
+    """
+    Планировщик публикаций: глобальный bucket + bucket на (цель, вид публикации)
+    
+    Публикация ждет ровно до момента, когда во всех затронутых bucket'ах
+    появятся токены, — так отправка идет на максимально допустимой скорости
+    без фиксированных пауз между постами.
+    """
+    
+    def __init__(self):
+        self.metrics = get_metrics()
+        self.global_bucket = TokenBucket(
+            Config.PUBLISH_GLOBAL_PER_MINUTE / 60.0,
+            Config.PUBLISH_GLOBAL_BURST
+        )
+        self.budgets = {
+            ALBUM: (Config.PUBLISH_ALBUMS_PER_MINUTE / 60.0, Config.PUBLISH_ALBUM_BURST),
+            MESSAGE: (Config.PUBLISH_MESSAGES_PER_MINUTE / 60.0, Config.PUBLISH_MESSAGE_BURST),
+        }
+        self._buckets: Dict[Tuple[int, str], TokenBucket] = {}
+    
+    def _bucket(self, target_id: int, kind: str) -> TokenBucket:
+        key = (target_id, kind)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate, burst = self.budgets[kind]
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+        return bucket
+    
+    async def acquire(self, target_id: int, kind: str = MESSAGE, messages: int = 1):
+        """
+        Ожидание права на публикацию
+        
+        Args:
+            target_id: ID целевого чата
+            kind: ALBUM или MESSAGE
+            messages: Сколько сообщений создаст публикация (для альбома — число файлов)
+        """
+        wait = max(
+            self._bucket(target_id, kind).reserve(1),
+            self.global_bucket.reserve(messages)
+        )
+        self.metrics.observe('publish_wait_seconds', wait)
+        if wait > 0:
+            logger.info(f"🚦 Лимит публикаций: ожидание {wait:.1f}с ({kind})")
+            await asyncio.sleep(wait)
+    
+    def penalize(self, target_id: int, kind: str, seconds: float):
+        """Telegram вернул FloodWait: следующие публикации в эту цель ждут не меньше seconds"""
+        self._bucket(target_id, kind).penalize(seconds)
+
+
+# Singleton instance
+_scheduler = None
+
+def get_publish_scheduler() -> PublishScheduler:
+    """Получить глобальный экземпляр планировщика публикаций"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PublishScheduler()
+    return _scheduler
@@ -0,0 +1,122 @@
+"""
+🗂️ Rewrite Cache - Персистентный кеш результатов LLM (SQLite)
+Ключ — хеш нормализованного текста + версии промпта, бренда, стиля и уровня модели
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+from utils import calculate_text_hash, clean_text
+
+logger = logging.getLogger(__name__)
+
+
+class RewriteCache:
+    """
+    Content-addressed кеш переписанных текстов
+    
+    Записи живут не дольше ttl секунд; при превышении max_entries
+    вытесняются давно не использованные (LRU по accessed_at).
+    Рядом со значением хранится модель, которая его сгенерировала: смена
+    набора доступных провайдеров кеш не сбрасывает.
+    """
+    
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            '''CREATE TABLE IF NOT EXISTS rewrites (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                model TEXT
+            )'''
+        )
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(rewrites)')]
+        if 'model' not in columns:
+            # База от предыдущей версии: модель для старых записей неизвестна
+            self._conn.execute('ALTER TABLE rewrites ADD COLUMN model TEXT')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_rewrites_accessed ON rewrites (accessed_at)')
+        self._conn.commit()
+        self.evict()
+    
+    @staticmethod
+    def make_key(kind: str, text: str, **params: Any) -> str:
+        """Ключ кеша: хеш нормализованного текста и всех параметров, влияющих на результат"""
+        payload = json.dumps(
+            {'kind': kind, 'text': clean_text(text), 'params': params},
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return calculate_text_hash(payload)
+    
+    def get(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(значение, модель, которая его сгенерировала) или None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created_at, model FROM rewrites WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            value, created_at, model = row
+            if self.ttl > 0 and now - created_at > self.ttl:
+                self._conn.execute('DELETE FROM rewrites WHERE key = ?', (key,))
+                self._conn.commit()
+                return None
+            
+            self._conn.execute('UPDATE rewrites SET accessed_at = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            return value, model
+    
+    def put(self, key: str, kind: str, value: str, model: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO rewrites (key, kind, value, created_at, accessed_at, model) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, kind, value, now, now, model)
+            )
+            self._conn.commit()
+            self._puts_since_evict += 1
+            should_evict = self._puts_since_evict >= 100
+        if should_evict:
+            self.evict()
+    
+    def evict(self):
+        """Удаление просроченных записей и LRU-вытеснение сверх max_entries"""
+        with self._lock:
+            self._puts_since_evict = 0
+            if self.ttl > 0:
+                self._conn.execute('DELETE FROM rewrites WHERE created_at < ?', (time.time() - self.ttl,))
+            count = self._conn.execute('SELECT COUNT(*) FROM rewrites').fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    'DELETE FROM rewrites WHERE key IN (SELECT key FROM rewrites ORDER BY accessed_at ASC LIMIT ?)',
+                    (excess,)
+                )
+                logger.info(f"🗂️ Кеш переписывания: вытеснено {excess} записей")
+            self._conn.commit()
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,132 @@
+"""
+🧭 Routes - Таблица маршрутов источник → цели с брендингом на маршрут
+Один процесс обслуживает все маршруты, пулы LLM и обработки изображений общие
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTE = 'default'
+
+
+class Branding:
+    """Ссылка, бренд и стиль, подставляемые при переписывании текста и замене ссылок на фото"""
+    
+    __slots__ = ('brand_name', 'link', 'style')
+    
+    def __init__(self, brand_name: str, link: str, style: str):
+        self.brand_name = brand_name
+        self.link = link
+        self.style = style
+    
+    @classmethod
+    def default(cls) -> 'Branding':
+        """Брендинг из глобальных настроек (YOUR_BRAND_NAME, YOUR_LINK, CHANNEL_STYLE)"""
+        return cls(Config.YOUR_BRAND_NAME, Config.YOUR_LINK, Config.CHANNEL_STYLE)
+    
+    def as_params(self) -> Dict[str, str]:
+        return {'brand': self.brand_name, 'link': self.link, 'style': self.style}
+
+
+class Route:
+    """
+    Маршрут: посты из sources переписываются с брендингом маршрута и публикуются во все targets
+    
+    Сущности Telegram (source_ids, target_entities) заполняются копировщиком при старте.
+    """
+    
+    def __init__(self, name: str, sources: List[Union[str, int]], targets: List[Union[str, int]], branding: Branding):
+        self.name = name
+        self.sources = sources
+        self.targets = targets
+        self.branding = branding
+        
+        self.source_ids: List[int] = []
+        self.target_entities: List[Any] = []
+    
+    def index_scope(self, chat_id: int) -> Union[int, str]:
+        """
+        Пространство ключей в индексе сообщений
+        
+        Маршрут по умолчанию использует голый ID чата (совместимо с индексом
+        до появления маршрутов), остальные — с префиксом имени маршрута.
+        """
+        if self.name == DEFAULT_ROUTE:
+            return chat_id
+        return f"{self.name}:{chat_id}"
+    
+    def __repr__(self) -> str:
+        return f"Route({self.name}: {self.sources} → {self.targets})"
+
+
+def _as_list(value: Any) -> List[Union[str, int]]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def _parse_route(index: int, item: Dict[str, Any], defaults: Branding) -> Route:
+    if not isinstance(item, dict):
+        raise ValueError(f"маршрут #{index + 1}: ожидается объект, получено {type(item).__name__}")
+    
+    name = str(item.get('name') or f"route{index + 1}")
+    sources = _as_list(item.get('sources', item.get('source')))
+    targets = _as_list(item.get('targets', item.get('target')))
+    if not sources:
+        raise ValueError(f"маршрут {name}: не указан source/sources")
+    if not targets:
+        raise ValueError(f"маршрут {name}: не указан target/targets")
+    
+    branding = Branding(
+        brand_name=item.get('brand', defaults.brand_name),
+        link=item.get('link', defaults.link),
+        style=item.get('style', defaults.style)
+    )
+    return Route(name, sources, targets, branding)
+
+
+def load_routes(raw: Optional[str] = None) -> List[Route]:
+    """
+    Таблица маршрутов из ROUTES (JSON) или ROUTES_FILE
+    
+    Без них — один маршрут по умолчанию SOURCE_CHANNEL → TARGET_CHANNEL.
+    Формат: [{"name": "...", "sources": [...], "targets": [...], "brand": "...", "link": "...", "style": "..."}]
+    (brand/link/style необязательны и по умолчанию берутся из глобальных настроек)
+    
+    Raises:
+        ValueError: Некорректная таблица маршрутов
+    """
+    if raw is None:
+        raw = Config.ROUTES
+        if not raw and Config.ROUTES_FILE:
+            with open(Config.ROUTES_FILE, 'r', encoding='utf-8') as f:
+                raw = f.read()
+    
+    defaults = Branding.default()
+    if not raw or not raw.strip():
+        return [Route(DEFAULT_ROUTE, [Config.SOURCE_CHANNEL], [Config.TARGET_CHANNEL], defaults)]
+    
+    try:
+        items = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"ROUTES: некорректный JSON: {e}")
+    if isinstance(items, dict):
+        items = [items]
+    if not items:
+        raise ValueError("ROUTES: пустая таблица маршрутов")
+    
+    routes = [_parse_route(i, item, defaults) for i, item in enumerate(items)]
+    
+    names = [route.name for route in routes]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"ROUTES: повторяющиеся имена маршрутов: {duplicates}")
+    
+    return routes
@@ -0,0 +1,67 @@
+"""
+📎 Upload Cache - Хендлы файлов, уже загруженных в Telegram
+Ключ — (ID исходного фото, версия обработки): фото грузится один раз на все цели и повторы отправки
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Tuple
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+UploadFn = Callable[[], Awaitable[Any]]
+
+
+class UploadCache:
+    """
+    Кеш загрузок в памяти (InputFile после client.upload_file)
+    
+    Загрузка ключа выполняется один раз: параллельные отправки в разные цели
+    ждут ту же задачу. Хендл живет не дольше ttl секунд — Telegram хранит
+    загруженные части ограниченное время; если он истек раньше, отправитель
+    вытесняет ключ через discard и загружает заново. Сверх max_entries
+    вытесняются давно не использованные хендлы.
+    """
+    
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.metrics = get_metrics()
+        self._entries: "OrderedDict[Hashable, Tuple[float, asyncio.Task]]" = OrderedDict()
+    
+    async def get_or_upload(self, key: Hashable, upload: UploadFn) -> Any:
+        """Хендл из кеша или результат upload() (сохраняется под key)"""
+        entry = self._entries.get(key)
+        if entry is not None and (self.ttl <= 0 or time.monotonic() - entry[0] <= self.ttl):
+            self._entries.move_to_end(key)
+            task = entry[1]
+            self.metrics.inc('upload_cache_hits')
+        else:
+            task = asyncio.create_task(upload())
+            self._entries[key] = (time.monotonic(), task)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.metrics.inc('uploads')
+        
+        try:
+            # shield: отмена одной отправки не отменяет загрузку, которую ждут другие цели
+            return await asyncio.shield(task)
+        except Exception:
+            if self._entries.get(key, (0.0, None))[1] is task:
+                del self._entries[key]
+            raise
+    
+    def discard(self, keys: Iterable[Hashable]):
+        """Вытеснение хендлов, которые Telegram больше не принимает"""
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                logger.info(f"📎 Хендл загрузки {key} истек, файл будет загружен заново")
+    
+    def clear(self):
+        for _, task in self._entries.values():
+            task.cancel()
+        self._entries.clear()
@@ -9,6 +9,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Ссылки t.me и http(s)
+LINK_PATTERN = r'(?:https?://|t\.me/)[\w\d\-._~:/?#\[\]@!$&\'()*+,;=]+'
+
 
 def extract_links(text: str) -> list[str]:
     """
@@ -20,9 +23,7 @@ def extract_links(text: str) -> list[str]:
     Returns:
         Список найденных ссылок
     """
-    # Паттерн для t.me и http(s) ссылок
-    pattern = r'(?:https?://|t\.me/)[\w\d\-._~:/?#\[\]@!$&\'()*+,;=]+'
-    links = re.findall(pattern, text)
+    links = re.findall(LINK_PATTERN, text)
     return links
 
 
@@ -173,62 +174,37 @@ def estimate_reading_time(text: str, words_per_minute: int = 200) -> int:
     return int(minutes * 60)
 
 
-class RateLimiter:
-    """Простой rate limiter для предотвращения флуда"""
-    
-    def __init__(self, max_requests: int = 20, time_window: int = 60):
-        """
-        Args:
-            max_requests: Максимум запросов
-            time_window: Временное окно в секундах
-        """
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests = []
-    
-    def is_allowed(self) -> bool:
-        """
-        Проверяет, разрешен ли запрос
-        
-        Returns:
-            True если разрешен
-        """
-        import time
-        
-        current_time = time.time()
-        
-        # Удаляем старые запросы
-        self.requests = [
-            req_time for req_time in self.requests
-            if current_time - req_time < self.time_window
-        ]
-        
-        # Проверяем лимит
-        if len(self.requests) < self.max_requests:
-            self.requests.append(current_time)
-            return True
-        
-        return False
+def detect_image_format(data: bytes) -> Optional[str]:
+    """
+    Формат изображения по сигнатуре файла
     
-    def wait_time(self) -> float:
-        """
-        Возвращает время ожидания до следующего доступного запроса
-        
-        Returns:
-            Секунды ожидания
-        """
-        import time
-        
-        if not self.requests:
-            return 0.0
-        
-        current_time = time.time()
-        oldest_request = min(self.requests)
-        wait = self.time_window - (current_time - oldest_request)
+    Args:
+        data: Байты изображения
         
-        return max(0.0, wait)
-
+    Returns:
+        'jpeg', 'png', 'webp', 'gif' или None
+    """
+    if data[:3] == b'\xff\xd8\xff':
+        return 'jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    return None
 
-# Глобальный rate limiter
-telegram_rate_limiter = RateLimiter(max_requests=20, time_window=60)
 
+def image_filename(data: bytes, stem: str = "photo") -> str:
+    """
+    Имя файла с расширением по содержимому (Telegram определяет тип загрузки по имени)
+    
+    Args:
+        data: Байты изображения
+        stem: Имя без расширения
+        
+    Returns:
+        Например "photo.jpg" или "photo_2.png" (неизвестный формат — .jpg)
+    """
+    extensions = {'jpeg': 'jpg', 'png': 'png', 'webp': 'webp', 'gif': 'gif'}
+    return f"{stem}.{extensions.get(detect_image_format(data), 'jpg')}"